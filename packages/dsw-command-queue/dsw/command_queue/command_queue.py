@@ -1,5 +1,7 @@
 import abc
+import collections.abc
 import datetime
+import json
 import logging
 import os
 import platform
@@ -80,12 +82,31 @@ class CommandWorker:
     def process_exception(self, e: BaseException):
         pass
 
+    def batch_match(self, command: PersistentCommand) -> dict | None:
+        # part of body that other commands must contain to be processed
+        # together with the given one (None = no batching)
+        return None
+
+    def work_batch(self, commands: list[PersistentCommand],
+                   completed: set[str]) -> dict[str, BaseException]:
+        # returns errors of failed commands (by UUID), UUIDs of successfully
+        # processed commands are added to completed right away so they are
+        # not marked as failed if the batch exceeds the time limit
+        errors: dict[str, BaseException] = {}
+        for command in commands:
+            try:
+                self.work(command)
+                completed.add(command.uuid)
+            except (CommandJobError, Exception) as e:
+                errors[command.uuid] = e
+        return errors
+
 
 class CommandQueue:
 
     def __init__(self, *, worker: CommandWorker, db: Database,
                  channel: str, component: str, wait_timeout: float,
-                 work_timeout: int | None = None):
+                 work_timeout: int | None = None, batch_size: int = 1):
         self.worker = worker
         self.db = db
         self.queries = CommandQueries(
@@ -94,6 +115,7 @@ class CommandQueue:
         self.component = component
         self.wait_timeout = wait_timeout
         self.work_timeout = work_timeout
+        self.batch_size = batch_size
         self._interrupted = False
 
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -107,14 +129,8 @@ class CommandQueue:
         after=tenacity.after_log(LOG, logging.INFO),
     )
     def run(self):
-        LOG.info('Preparing to listen to command queue (issuing LISTEN)')
-        queue_conn = self.db.conn_queue
-        queue_conn.connection.execute(
-            query=self.queries.query_listen().encode(),
-        )
-        queue_conn.listening = True
-        LOG.info('Listening to notifications in command queue')
-        fds = [queue_conn.connection.pgconn.socket]
+        queue_socket = self.listen()
+        fds = [queue_socket]
         if IS_LINUX:
             fds.append(_QUEUE_PIPE_R)
 
@@ -132,13 +148,35 @@ class CommandQueue:
                 LOG.info('Nothing received in this cycle (timeout %s seconds)',
                          self.wait_timeout)
             else:
-                notifications = 0
-                for notification in psycopg.generators.notifies(queue_conn.connection.pgconn):
-                    notifications += 1
-                    LOG.info('Notification received: %s', notification)
-                LOG.info('Notifications received (%s in total)', notifications)
+                self.drain_notifications()
         LOG.info('Exiting command queue')
 
+    @property
+    def interrupted(self) -> bool:
+        return self._interrupted
+
+    def interrupt(self):
+        self._interrupted = True
+
+    def listen(self) -> int:
+        # returns socket of the queue connection to wait on for notifications
+        LOG.info('Preparing to listen to command queue (issuing LISTEN)')
+        queue_conn = self.db.conn_queue
+        queue_conn.connection.execute(
+            query=self.queries.query_listen().encode(),
+        )
+        queue_conn.listening = True
+        LOG.info('Listening to notifications in command queue')
+        return queue_conn.connection.pgconn.socket
+
+    def drain_notifications(self) -> int:
+        notifications = 0
+        for notification in psycopg.generators.notifies(self.db.conn_queue.connection.pgconn):
+            notifications += 1
+            LOG.info('Notification received: %s', notification)
+        LOG.info('Notifications received (%s in total)', notifications)
+        return notifications
+
     @tenacity.retry(
         reraise=True,
         wait=tenacity.wait_exponential(multiplier=RETRY_QUEUE_MULTIPLIER),
@@ -178,7 +216,13 @@ class CommandQueue:
         LOG.info('Attempts: %s / %s', command.attempts, command.max_attempts)
         LOG.info('Last error: %s', command.last_error_message)
 
-        self._process(command)
+        similar = self._fetch_similar(cursor, command)
+        if len(similar) > 0:
+            LOG.info('Retrieved %s similar commands for processing in batch',
+                     len(similar))
+            self._process_batch([command, *similar])
+        else:
+            self._process(command)
 
         LOG.debug('Committing transaction')
         self.db.conn_query.connection.commit()
@@ -186,6 +230,178 @@ class CommandQueue:
         LOG.info('Notification processing finished')
         return True
 
+    def claim_commands(self, limit: int,
+                       exclude: collections.abc.Collection[str] = ()) -> list[PersistentCommand]:
+        # marks fetched commands as started, caller must finish each of them
+        # (commands being still processed must be excluded)
+        with self.db.conn_query.new_cursor(use_dict=True) as cursor:
+            cursor.execute(
+                query=self.queries.query_get_commands(),
+                params={
+                    'component': self.component,
+                    'exclude': list(exclude),
+                    'now': datetime.datetime.now(tz=datetime.UTC),
+                    'limit': limit,
+                },
+            )
+            commands = [PersistentCommand.from_dict_row(row) for row in cursor.fetchall()]
+        for command in commands:
+            self.db.execute_query(
+                query=self.queries.query_command_start(),
+                attempts=command.attempts + 1,
+                updated_at=datetime.datetime.now(tz=datetime.UTC),
+                uuid=command.uuid,
+            )
+        self.db.conn_query.connection.commit()
+        LOG.info('Claimed %s persistent commands', len(commands))
+        return commands
+
+    def finish_command(self, command: PersistentCommand, error: BaseException | None = None,
+                       timed_out: bool = False):
+        # records result of a claimed command (state, attempts, error)
+        attempt_number = command.attempts + 1
+        if timed_out:
+            self._mark_timed_out(command, attempt_number, error or TimeoutError())
+        elif error is None:
+            self.db.execute_query(
+                query=self.queries.query_command_done(),
+                attempts=attempt_number,
+                updated_at=datetime.datetime.now(tz=datetime.UTC),
+                uuid=command.uuid,
+            )
+        else:
+            self._mark_failed(command, attempt_number, error)
+        self.db.conn_query.connection.commit()
+
+    def update_command_body(self, command: PersistentCommand):
+        # stores progress of a command (committed with its result)
+        self.db.execute_query(
+            query=self.queries.query_command_body(),
+            body=json.dumps(command.body),
+            updated_at=datetime.datetime.now(tz=datetime.UTC),
+            uuid=command.uuid,
+        )
+
+    def _fetch_similar(self, cursor, command: PersistentCommand) -> list[PersistentCommand]:
+        if self.batch_size < 2:
+            return []
+        body_match = self.worker.batch_match(command)
+        if body_match is None:
+            return []
+        cursor.execute(
+            query=self.queries.query_get_similar_commands(),
+            params={
+                'component': self.component,
+                'function': command.function,
+                'tenant_uuid': command.tenant_uuid,
+                'uuid': command.uuid,
+                'body_match': json.dumps(body_match),
+                'now': datetime.datetime.now(tz=datetime.UTC),
+                'limit': self.batch_size - 1,
+            },
+        )
+        return [PersistentCommand.from_dict_row(row) for row in cursor.fetchall()]
+
+    def _mark_timed_out(self, command: PersistentCommand, attempt_number: int,
+                        e: BaseException):
+        msg = f'Processing exceeded time limit ({self.work_timeout} seconds)'
+        LOG.warning(msg)
+        self.worker.process_timeout(e)
+        self.db.execute_query(
+            query=self.queries.query_command_error(),
+            attempts=attempt_number,
+            error_message=msg,
+            updated_at=datetime.datetime.now(tz=datetime.UTC),
+            uuid=command.uuid,
+        )
+
+    def _mark_failed(self, command: PersistentCommand, attempt_number: int,
+                     e: BaseException):
+        if isinstance(e, CommandJobError):
+            if e.try_again and attempt_number < command.max_attempts:
+                query = self.queries.query_command_error()
+                msg = f'Failed with job error: {e.message} (will try again)'
+            else:
+                query = self.queries.query_command_error_stop()
+                msg = f'Failed with job error: {e.message}'
+        else:
+            query = self.queries.query_command_error()
+            if attempt_number < command.max_attempts:
+                msg = f'Failed with exception [{type(e).__name__}]: {str(e)} (will try again)'
+            else:
+                msg = f'Failed with exception [{type(e).__name__}]: {str(e)}'
+        LOG.warning(msg)
+        self.worker.process_exception(e)
+        self.db.execute_query(
+            query=query,
+            attempts=attempt_number,
+            error_message=msg,
+            updated_at=datetime.datetime.now(tz=datetime.UTC),
+            uuid=command.uuid,
+        )
+
+    def _process_batch(self, commands: list[PersistentCommand]):
+        for command in commands:
+            self.db.execute_query(
+                query=self.queries.query_command_start(),
+                attempts=command.attempts + 1,
+                updated_at=datetime.datetime.now(tz=datetime.UTC),
+                uuid=command.uuid,
+            )
+        self.db.conn_query.connection.commit()
+
+        errors: dict[str, BaseException] = {}
+        completed: set[str] = set()
+        try:
+            if self.work_timeout is None:
+                LOG.info('Processing batch (without any timeout set)')
+                errors = self.worker.work_batch(commands, completed)
+            else:
+                LOG.info('Processing batch (with timeout set to %s seconds)',
+                         self.work_timeout)
+                errors = func_timeout.func_timeout(
+                    timeout=self.work_timeout,
+                    func=self.worker.work_batch,
+                    args=(commands, completed),
+                    kwargs=None,
+                )
+        except func_timeout.exceptions.FunctionTimedOut as e:
+            msg = f'Processing exceeded time limit ({self.work_timeout} seconds)'
+            LOG.warning('%s (%s of %s commands completed)', msg, len(completed), len(commands))
+            self.worker.process_timeout(e)
+            for command in commands:
+                if command.uuid in completed:
+                    self.db.execute_query(
+                        query=self.queries.query_command_done(),
+                        attempts=command.attempts + 1,
+                        updated_at=datetime.datetime.now(tz=datetime.UTC),
+                        uuid=command.uuid,
+                    )
+                    continue
+                self.db.execute_query(
+                    query=self.queries.query_command_error(),
+                    attempts=command.attempts + 1,
+                    error_message=msg,
+                    updated_at=datetime.datetime.now(tz=datetime.UTC),
+                    uuid=command.uuid,
+                )
+            return
+        except (CommandJobError, Exception) as e:
+            errors = {command.uuid: e for command in commands}
+
+        for command in commands:
+            if command.uuid in errors:
+                self._mark_failed(command, command.attempts + 1, errors[command.uuid])
+            else:
+                self.db.execute_query(
+                    query=self.queries.query_command_done(),
+                    attempts=command.attempts + 1,
+                    updated_at=datetime.datetime.now(tz=datetime.UTC),
+                    uuid=command.uuid,
+                )
+        LOG.info('Batch processed (%s done, %s failed)',
+                 len(commands) - len(errors), len(errors))
+
     def _process(self, command: PersistentCommand):
         attempt_number = command.attempts + 1
         try:
@@ -220,46 +436,9 @@ class CommandQueue:
                 uuid=command.uuid,
             )
         except func_timeout.exceptions.FunctionTimedOut as e:
-            msg = f'Processing exceeded time limit ({self.work_timeout} seconds)'
-            LOG.warning(msg)
-            self.worker.process_timeout(e)
-            self.db.execute_query(
-                query=self.queries.query_command_error(),
-                attempts=attempt_number,
-                error_message=msg,
-                updated_at=datetime.datetime.now(tz=datetime.UTC),
-                uuid=command.uuid,
-            )
-        except CommandJobError as e:
-            if e.try_again and attempt_number < command.max_attempts:
-                query = self.queries.query_command_error()
-                msg = f'Failed with job error: {e.message} (will try again)'
-            else:
-                query = self.queries.query_command_error_stop()
-                msg = f'Failed with job error: {e.message}'
-            LOG.warning(msg)
-            self.worker.process_exception(e)
-            self.db.execute_query(
-                query=query,
-                attempts=attempt_number,
-                error_message=msg,
-                updated_at=datetime.datetime.now(tz=datetime.UTC),
-                uuid=command.uuid,
-            )
-        except Exception as e:
-            if attempt_number < command.max_attempts:
-                msg = f'Failed with exception [{type(e).__name__}]: {str(e)} (will try again)'
-            else:
-                msg = f'Failed with exception [{type(e).__name__}]: {str(e)}'
-            LOG.warning(msg)
-            self.worker.process_exception(e)
-            self.db.execute_query(
-                query=self.queries.query_command_error(),
-                attempts=attempt_number,
-                error_message=msg,
-                updated_at=datetime.datetime.now(tz=datetime.UTC),
-                uuid=command.uuid,
-            )
+            self._mark_timed_out(command, attempt_number, e)
+        except (CommandJobError, Exception) as e:
+            self._mark_failed(command, attempt_number, e)
 
     def _signal_handler(self, recv_signal, frame):
         LOG.warning('Received interrupt signal: %s (frame: %s)',
@@ -31,6 +31,41 @@ class CommandQueries:
             LIMIT 1 FOR UPDATE SKIP LOCKED;
         """
 
+    def query_get_commands(self) -> str:
+        return """
+            SELECT *
+            FROM persistent_command
+            WHERE component = %(component)s
+              AND uuid != ALL(%(exclude)s::uuid[])
+              AND attempts < max_attempts
+              AND state != 'DonePersistentCommandState'
+              AND state != 'IgnorePersistentCommandState'
+              AND (created_at AT TIME ZONE 'UTC')
+                    <
+                  (%(now)s - (2 ^ attempts - 1) * INTERVAL '1 min')
+            ORDER BY attempts ASC, updated_at DESC
+            LIMIT %(limit)s FOR UPDATE SKIP LOCKED;
+        """
+
+    def query_get_similar_commands(self) -> str:
+        return """
+            SELECT *
+            FROM persistent_command
+            WHERE component = %(component)s
+              AND function = %(function)s
+              AND tenant_uuid = %(tenant_uuid)s
+              AND uuid != %(uuid)s
+              AND body::jsonb @> %(body_match)s::jsonb
+              AND attempts < max_attempts
+              AND state != 'DonePersistentCommandState'
+              AND state != 'IgnorePersistentCommandState'
+              AND (created_at AT TIME ZONE 'UTC')
+                    <
+                  (%(now)s - (2 ^ attempts - 1) * INTERVAL '1 min')
+            ORDER BY attempts ASC, updated_at DESC
+            LIMIT %(limit)s FOR UPDATE SKIP LOCKED;
+        """
+
     @staticmethod
     def query_command_error() -> str:
         return """
@@ -64,6 +99,15 @@ class CommandQueries:
             WHERE uuid = %(uuid)s;
         """
 
+    @staticmethod
+    def query_command_body() -> str:
+        return """
+            UPDATE persistent_command
+            SET body = %(body)s,
+                updated_at = %(updated_at)s
+            WHERE uuid = %(uuid)s;
+        """
+
     @staticmethod
     def query_command_start() -> str:
         return """
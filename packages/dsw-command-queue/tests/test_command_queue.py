@@ -0,0 +1,139 @@
+import datetime
+import threading
+import types
+
+import pytest
+
+from dsw.command_queue import CommandJobError, CommandQueue, CommandWorker
+from dsw.command_queue.query import CommandQueries
+from dsw.database.model import PersistentCommand
+
+
+QUERIES = CommandQueries(channel='test')
+STATES = {
+    QUERIES.query_command_start(): 'started',
+    QUERIES.query_command_done(): 'done',
+    QUERIES.query_command_error(): 'error',
+    QUERIES.query_command_error_stop(): 'error_stop',
+}
+
+
+def _command(uuid: str) -> PersistentCommand:
+    now = datetime.datetime.now(tz=datetime.UTC)
+    return PersistentCommand(
+        uuid=uuid,
+        state='NewPersistentCommandState',
+        component='test',
+        function='run',
+        body={'uuid': uuid},
+        last_error_message=None,
+        attempts=0,
+        max_attempts=3,
+        tenant_uuid='00000000-0000-0000-0000-000000000000',
+        created_by=None,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+class _FakeDatabase:
+    # records state changes of commands (by query) and commits
+
+    def __init__(self):
+        self.log: list[tuple] = []
+        self.conn_query = types.SimpleNamespace(
+            connection=types.SimpleNamespace(commit=lambda: self.log.append(('commit',))),
+        )
+
+    def execute_query(self, query: str, **kwargs):
+        self.log.append((STATES[query], kwargs['uuid'], kwargs.get('error_message')))
+
+    def states(self) -> dict[str, str]:
+        return {entry[1]: entry[0] for entry in self.log if entry[0] != 'commit'}
+
+
+class _FakeWorker(CommandWorker):
+    # commands fail or block by their UUID
+
+    def __init__(self):
+        self.timeouts: list[BaseException] = []
+        self.exceptions: list[BaseException] = []
+        self.release = threading.Event()
+
+    def work(self, command: PersistentCommand):
+        if command.uuid.startswith('failing'):
+            raise RuntimeError(f'Failed {command.uuid}')
+        if command.uuid.startswith('stopped'):
+            raise CommandJobError.create(command.uuid, 'Invalid', try_again=False)
+        if command.uuid.startswith('blocking'):
+            self.release.wait(timeout=10)
+
+    def process_timeout(self, e: BaseException):
+        self.timeouts.append(e)
+
+    def process_exception(self, e: BaseException):
+        self.exceptions.append(e)
+
+
+@pytest.fixture
+def queue():
+    worker = _FakeWorker()
+    yield CommandQueue(
+        worker=worker,
+        db=_FakeDatabase(),  # type: ignore
+        channel='test',
+        component='test',
+        wait_timeout=1,
+        work_timeout=1,
+        batch_size=5,
+    )
+    worker.release.set()
+
+
+def test_batch_partial_failure(queue):
+    commands = [_command('done-1'), _command('failing-1'), _command('stopped-1'),
+                _command('done-2')]
+
+    queue._process_batch(commands)
+
+    assert queue.db.log[:5] == [
+        *[('started', command.uuid, None) for command in commands],
+        ('commit',),
+    ]
+    assert queue.db.states() == {
+        'done-1': 'done',
+        'failing-1': 'error',
+        'stopped-1': 'error_stop',
+        'done-2': 'done',
+    }
+    assert [str(e) for e in queue.worker.exceptions] == ['Failed failing-1', 'Invalid']
+    assert queue.worker.timeouts == []
+
+
+def test_batch_timeout_keeps_completed(queue):
+    commands = [_command('done-1'), _command('blocking-1'), _command('done-2')]
+
+    queue._process_batch(commands)
+
+    assert queue.db.states() == {
+        'done-1': 'done',
+        'blocking-1': 'error',
+        'done-2': 'error',
+    }
+    errors = {entry[1]: entry[2] for entry in queue.db.log if entry[0] == 'error'}
+    assert errors['blocking-1'] == 'Processing exceeded time limit (1 seconds)'
+    assert len(queue.worker.timeouts) == 1
+    assert queue.worker.exceptions == []
+
+
+def test_batch_worker_error_fails_all(queue, monkeypatch):
+    def work_batch(commands, completed):
+        raise RuntimeError('Batch failed')
+
+    monkeypatch.setattr(queue.worker, 'work_batch', work_batch)
+    commands = [_command('done-1'), _command('done-2')]
+
+    queue._process_batch(commands)
+
+    assert queue.db.states() == {'done-1': 'error', 'done-2': 'error'}
+    assert len(queue.worker.exceptions) == 2
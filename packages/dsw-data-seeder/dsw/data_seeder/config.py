@@ -5,9 +5,11 @@ from dsw.config.keys import (
     ConfigKey,
     ConfigKeys,
     ConfigKeysContainer,
+    cast_bool,
     cast_dict,
     cast_int,
     cast_optional_int,
+    cast_optional_str,
     cast_str,
 )
 from dsw.config.model import (
@@ -34,6 +36,24 @@ class _SeedKeys(ConfigKeysContainer):
         default=None,
         cast=cast_dict,
     )
+    s3_workers = ConfigKey(
+        yaml_path=['seed', 's3Workers'],
+        var_names=['SEED_S3_WORKERS'],
+        default=8,
+        cast=cast_int,
+    )
+    s3_golden_prefix = ConfigKey(
+        yaml_path=['seed', 's3GoldenPrefix'],
+        var_names=['SEED_S3_GOLDEN_PREFIX'],
+        default=None,
+        cast=cast_optional_str,
+    )
+    db_two_phase_commit = ConfigKey(
+        yaml_path=['seed', 'dbTwoPhaseCommit'],
+        var_names=['SEED_DB_TWO_PHASE_COMMIT'],
+        default=False,
+        cast=cast_bool,
+    )
 
 
 class DataSeederConfigKeys(ConfigKeys):
@@ -44,6 +64,9 @@ class DataSeederConfigKeys(ConfigKeys):
 class SeedConfig(ConfigModel):
     job_timeout: int | None
     variables: dict
+    s3_workers: int
+    s3_golden_prefix: str | None
+    db_two_phase_commit: bool
 
 
 @dataclasses.dataclass
@@ -152,6 +175,9 @@ class SeederConfigParser(DSWConfigParser):
         return SeedConfig(
             job_timeout=self.get(self.keys.seed.job_timeout),
             variables=self.get(self.keys.seed.variables),
+            s3_workers=self.get(self.keys.seed.s3_workers),
+            s3_golden_prefix=self.get(self.keys.seed.s3_golden_prefix),
+            db_two_phase_commit=self.get(self.keys.seed.db_two_phase_commit),
         )
 
     @property
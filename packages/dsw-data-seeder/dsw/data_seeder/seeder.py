@@ -1,17 +1,25 @@
 import collections
+import concurrent.futures
 import contextlib
 import dataclasses
+import datetime
+import functools
+import hashlib
 import json
 import logging
 import mimetypes
 import pathlib
+import re
+import threading
 import time
 import typing
 import uuid
 
 import dateutil.parser
+import psycopg
+from psycopg import sql
 
-from dsw.command_queue import CommandQueue, CommandWorker
+from dsw.command_queue import CommandJobError, CommandQueue, CommandWorker
 from dsw.config.sentry import SentryReporter
 from dsw.database.database import Database
 from dsw.database.model import PersistentCommand
@@ -25,6 +33,15 @@ from .context import Context, ContextNotInitializedError
 
 LOG = logging.getLogger(__name__)
 
+DB_COPY_CHUNK_SIZE = 1024 * 1024
+READINESS_INITIAL_DELAY = 0.1
+READINESS_MAX_DELAY = 2.0
+READINESS_MAX_WAIT = 3.0
+TPC_GTRID_PREFIX = 'dsw-seeder-'
+TPC_STALE_AFTER = 3600
+CANCEL_WAIT = 10.0
+CANCEL_QUERY_TIMEOUT = 5.0
+
 
 def _guess_mimetype(filename: str) -> str:
     try:
@@ -34,11 +51,223 @@ def _guess_mimetype(filename: str) -> str:
         return consts.DEFAULT_MIMETYPE
 
 
+class Substitution:
+    # Finds all placeholders in a single pass over the text (longer
+    # placeholders first), replacement values are not searched again
+
+    def __init__(self, placeholders: typing.Iterable[str]):
+        ordered = sorted(
+            {placeholder for placeholder in placeholders if placeholder != ''},
+            key=lambda placeholder: len(placeholder),
+            reverse=True,
+        )
+        self._pattern: re.Pattern | None = None
+        if len(ordered) > 0:
+            self._pattern = re.compile(f'({"|".join(re.escape(p) for p in ordered)})')
+
+    def tokenize(self, text: str) -> list[str]:
+        # literal parts are at even and placeholders at odd positions
+        if self._pattern is None:
+            return [text]
+        return self._pattern.split(text)
+
+    @staticmethod
+    def fill(tokens: list[str], values: dict[str, str]) -> str:
+        parts = list(tokens)
+        parts[1::2] = [values.get(placeholder, placeholder) for placeholder in tokens[1::2]]
+        return ''.join(parts)
+
+    @staticmethod
+    def fill_chunks(tokens: list[str], values: dict[str, str],
+                    chunk_size: int) -> typing.Iterator[str]:
+        buffer: list[str] = []
+        size = 0
+        for index, token in enumerate(tokens):
+            part = values.get(token, token) if index % 2 == 1 else token
+            buffer.append(part)
+            size += len(part)
+            if size >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        if len(buffer) > 0:
+            yield ''.join(buffer)
+
+    def apply(self, text: str, values: dict[str, str]) -> str:
+        return self.fill(self.tokenize(text), values)
+
+
+def _table_identifier(table: str) -> sql.Identifier:
+    return sql.Identifier(*table.split('.'))
+
+
+@dataclasses.dataclass
+class SeedRecipeCopy:
+    # script is data loaded via COPY instead of SQL statements
+    table: str
+    columns: list[str]
+    format: str
+    header: bool
+
+    @property
+    def statement(self) -> sql.Composed:
+        columns = sql.SQL('')
+        if len(self.columns) > 0:
+            columns = sql.SQL(' ({})').format(
+                sql.SQL(', ').join(sql.Identifier(column) for column in self.columns),
+            )
+        options = sql.SQL('FORMAT text')
+        if self.format == 'csv':
+            options = sql.SQL('FORMAT csv, HEADER true') if self.header \
+                else sql.SQL('FORMAT csv')
+        return sql.SQL('COPY {table}{columns} FROM STDIN ({options})').format(
+            table=_table_identifier(self.table),
+            columns=columns,
+            options=options,
+        )
+
+    @staticmethod
+    def from_dict(data: dict | None) -> 'SeedRecipeCopy | None':
+        if data is None:
+            return None
+        copy_format = str(data.get('format', 'csv')).lower()
+        if copy_format not in ('csv', 'text'):
+            # binary format cannot have placeholders replaced
+            raise ValueError(f'Unsupported COPY format: {copy_format}')
+        return SeedRecipeCopy(
+            table=data['table'],
+            columns=data.get('columns', []),
+            format=copy_format,
+            header=data.get('header', False),
+        )
+
+
+@dataclasses.dataclass
+class SeedRecipeCloneTable:
+    table: str
+    tenant_column: str
+    remap: list[str]
+
+    @staticmethod
+    def from_dict(data: dict) -> 'SeedRecipeCloneTable':
+        return SeedRecipeCloneTable(
+            table=data['table'],
+            tenant_column=data.get('tenantColumn', 'tenant_uuid'),
+            remap=data.get('remap', []),
+        )
+
+
+@dataclasses.dataclass
+class SeedRecipeClone:
+    # rows of template tenant copied server-side, UUIDs in remap columns
+    # get new values (consistent across tables, e.g. foreign keys)
+    from_tenant: str
+    tables: list[SeedRecipeCloneTable]
+    target: str | None
+
+    GET_COLUMNS = """
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = %(table)s::regclass
+          AND attnum > 0
+          AND NOT attisdropped
+          AND attgenerated = ''
+        ORDER BY attnum;
+    """
+
+    def _map_statement(self) -> sql.Composed:
+        # mapping is a CTE (not a temporary table) to allow two-phase commit,
+        # materialized so that each old UUID gets a single new UUID
+        sources = [
+            sql.SQL(
+                'SELECT {column} FROM {table} WHERE {tenant_column} = %(from_tenant)s',
+            ).format(
+                table=_table_identifier(table.table),
+                column=sql.Identifier(column),
+                tenant_column=sql.Identifier(table.tenant_column),
+            )
+            for table in self.tables
+            for column in table.remap
+        ]
+        return sql.SQL(
+            'seeder_uuid_map AS MATERIALIZED ('
+            'SELECT src.old_uuid, gen_random_uuid() AS new_uuid FROM ({sources}) '
+            'AS src (old_uuid) WHERE src.old_uuid IS NOT NULL)',
+        ).format(sources=sql.SQL(' UNION ').join(sources))
+
+    @staticmethod
+    def _insert_statement(table: SeedRecipeCloneTable, columns: list[str]) -> sql.Composed:
+        # remapped columns are joined with the mapping (hash join instead
+        # of a lookup for each row), UUIDs not in the mapping are kept
+        values = []
+        joins = []
+        for column in columns:
+            if column == table.tenant_column:
+                values.append(sql.SQL('%(tenant_uuid)s'))
+            elif column in table.remap:
+                alias = sql.Identifier(f'm_{column}')
+                values.append(sql.SQL('COALESCE({alias}.new_uuid, src.{column})').format(
+                    alias=alias,
+                    column=sql.Identifier(column),
+                ))
+                joins.append(sql.SQL(
+                    ' LEFT JOIN seeder_uuid_map AS {alias} ON {alias}.old_uuid = src.{column}',
+                ).format(alias=alias, column=sql.Identifier(column)))
+            else:
+                values.append(sql.SQL('src.{}').format(sql.Identifier(column)))
+        return sql.SQL(
+            'INSERT INTO {table} ({columns}) SELECT {values} FROM {table} AS src{joins} '
+            'WHERE src.{tenant_column} = %(from_tenant)s',
+        ).format(
+            table=_table_identifier(table.table),
+            columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+            values=sql.SQL(', ').join(values),
+            joins=sql.SQL('').join(joins),
+            tenant_column=sql.Identifier(table.tenant_column),
+        )
+
+    def _clone_statement(self, columns: dict[str, list[str]]) -> sql.Composed:
+        # single statement, foreign keys among cloned tables are checked
+        # at its end (all inserts see the template rows only)
+        ctes = []
+        if any(len(table.remap) > 0 for table in self.tables):
+            ctes.append(self._map_statement())
+        for index, table in enumerate(self.tables):
+            ctes.append(sql.SQL('{name} AS ({insert})').format(
+                name=sql.Identifier(f'seeder_clone_{index}'),
+                insert=self._insert_statement(table, columns[table.table]),
+            ))
+        return sql.SQL('WITH {ctes} SELECT NULL').format(ctes=sql.SQL(', ').join(ctes))
+
+    def execute(self, cursor: psycopg.Cursor, tenant_uuid: str):
+        if len(self.tables) == 0:
+            return
+        params = {'from_tenant': self.from_tenant, 'tenant_uuid': tenant_uuid}
+        columns: dict[str, list[str]] = {}
+        for table in self.tables:
+            cursor.execute(query=self.GET_COLUMNS, params={'table': table.table})
+            columns[table.table] = [row[0] if isinstance(row, tuple) else row['attname']
+                                    for row in cursor.fetchall()]
+            LOG.debug(' -> Cloning table: %s', table.table)
+        cursor.execute(query=self._clone_statement(columns), params=params)
+
+    @staticmethod
+    def from_dict(data: dict | None) -> 'SeedRecipeClone | None':
+        if data is None:
+            return None
+        return SeedRecipeClone(
+            from_tenant=data['fromTenant'],
+            tables=[SeedRecipeCloneTable.from_dict(table) for table in data.get('tables', [])],
+            target=data.get('target', None),
+        )
+
+
 @dataclasses.dataclass
 class SeedRecipeDirective:
     path: pathlib.Path
     target: str | None
     order: int
+    copy: SeedRecipeCopy | None = None
 
     @property
     def id(self) -> str:
@@ -49,7 +278,11 @@ class SeedRecipeDirective:
 class SeedRecipeDB:
     scripts: dict[str, SeedRecipeDirective]
     tenant_placeholder: str
+    clone: SeedRecipeClone | None = None
     scripts_data: dict[str, str] = dataclasses.field(default_factory=collections.OrderedDict)
+    scripts_tokens: dict[str, list[str]] = dataclasses.field(
+        default_factory=collections.OrderedDict,
+    )
 
     @staticmethod
     def from_dict(data: dict, root_path: pathlib.Path) -> 'SeedRecipeDB':
@@ -58,22 +291,24 @@ class SeedRecipeDB:
         for index, script in enumerate(recipe_scripts):
             target = script.get('target', None)
             path = str(script.get('path', ''))
+            copy = SeedRecipeCopy.from_dict(script.get('copy', None))
             if path == '':
                 continue
             filepath = pathlib.Path(path)
             if '*' in path:
                 for item in sorted(root_path.glob(path)):
-                    s = SeedRecipeDirective(item, target, index)
+                    s = SeedRecipeDirective(item, target, index, copy)
                     db_scripts[s.id] = s
             elif filepath.is_absolute():
-                s = SeedRecipeDirective(filepath, target, index)
+                s = SeedRecipeDirective(filepath, target, index, copy)
                 db_scripts[s.id] = s
             else:
-                s = SeedRecipeDirective(root_path / filepath, target, index)
+                s = SeedRecipeDirective(root_path / filepath, target, index, copy)
                 db_scripts[s.id] = s
         return SeedRecipeDB(
             scripts=db_scripts,
             tenant_placeholder=data.get('tenantIdPlaceholder', consts.DEFAULT_PLACEHOLDER),
+            clone=SeedRecipeClone.from_dict(data.get('clone')),
         )
 
     def load_db_scripts(self):
@@ -82,6 +317,10 @@ class SeedRecipeDB:
                 encoding=consts.DEFAULT_ENCODING,
             )
 
+    def tokenize_db_scripts(self, substitution: Substitution):
+        for script_id, script in self.scripts_data.items():
+            self.scripts_tokens[script_id] = substitution.tokenize(script)
+
 
 @dataclasses.dataclass
 class SeedRecipeS3Object:
@@ -89,14 +328,22 @@ class SeedRecipeS3Object:
     original_object_name: str
     target: str | None
     object_name: str = dataclasses.field(default_factory=lambda: '')
+    name_tokens: list[str] = dataclasses.field(default_factory=list)
 
     def __str__(self):
         return f'{self.local_path.as_posix()} -> {self.object_name} [{self.target}]'
 
+    @functools.cached_property
+    def content_hash(self) -> str:
+        with self.local_path.open(mode='rb') as file:
+            return hashlib.file_digest(file, 'sha256').hexdigest()
+
+    def tokenize_object_name(self, substitution: Substitution):
+        self.name_tokens = substitution.tokenize(self.original_object_name)
+
     def update_object_name(self, replacements: dict[str, str]):
-        self.object_name = self.original_object_name
-        for r_from, r_to in replacements.items():
-            self.object_name = self.object_name.replace(r_from, r_to)
+        tokens = self.name_tokens or [self.original_object_name]
+        self.object_name = Substitution.fill(tokens, replacements)
 
 
 @dataclasses.dataclass
@@ -131,16 +378,16 @@ class SeedRecipeS3:
         )
 
     def load_s3_object_names(self):
+        filename_replace = Substitution(self.filename_replace.keys())
         for s3_copy in self.copy.values():
             if s3_copy.path.is_dir():
                 target = s3_copy.target
                 for s3_object_path in s3_copy.path.glob('**/*'):
                     if s3_object_path.is_file():
-                        target_object_name = str(
+                        target_object_name = filename_replace.apply(
                             s3_object_path.relative_to(s3_copy.path).as_posix(),
+                            self.filename_replace,
                         )
-                        for r_from, r_to in self.filename_replace.items():
-                            target_object_name = target_object_name.replace(r_from, r_to)
                         self.objects.append(SeedRecipeS3Object(
                             local_path=s3_object_path,
                             original_object_name=target_object_name,
@@ -174,41 +421,63 @@ class SeedRecipe:
             for key, value in variables.items()
         }
         self.init_wait = init_wait
+        self.uuids_keys: list[str] = []
+        if self.uuids_placeholder is not None:
+            self.uuids_keys = [
+                self.uuids_placeholder.replace('[n]', f'[{key}]')
+                for key in [*range(self.uuids_count), *self.uuids_names]
+            ]
+        self.loaded = False
+
+    def load(self):
+        # loads scripts and S3 objects once (reused for each seeding)
+        if self.loaded:
+            return
+        self.db.load_db_scripts()
+        self.db.tokenize_db_scripts(Substitution([
+            self.db.tenant_placeholder,
+            *self.uuids_keys,
+            *self.vars_replacement.keys(),
+        ]))
+        self.s3.load_s3_object_names()
+        s3_substitution = Substitution(self.uuids_keys)
+        for s3_object in self.s3.objects:
+            s3_object.tokenize_object_name(s3_substitution)
+        self.loaded = True
 
     def _prepare_uuids(self):
-        if self.uuids_placeholder is not None:
-            for i in range(self.uuids_count):
-                key = self.uuids_placeholder.replace('[n]', f'[{i}]')
-                self.uuids_replacement[key] = str(uuid.uuid4())
-            for name in self.uuids_names:
-                key = self.uuids_placeholder.replace('[n]', f'[{name}]')
-                self.uuids_replacement[key] = str(uuid.uuid4())
+        self.uuids_replacement = {key: str(uuid.uuid4()) for key in self.uuids_keys}
 
     def _prepare_s3_objects(self):
         for s3_object in self.s3.objects:
             s3_object.update_object_name(self.uuids_replacement)
 
     def prepare(self):
-        if self.prepared:
-            return
-        self.db.load_db_scripts()
-        self.s3.load_s3_object_names()
+        # new UUIDs are generated for each seeding
+        self.load()
         self._prepare_uuids()
         self._prepare_s3_objects()
         self.prepared = True
 
-    def _replace_db_script(self, script: str, tenant_uuid: str) -> str:
-        result = script.replace(self.db.tenant_placeholder, tenant_uuid)
-        for uuid_key, uuid_value in self.uuids_replacement.items():
-            result = result.replace(uuid_key, uuid_value)
-        for var_key, var_value in self.vars_replacement.items():
-            result = result.replace(var_key, var_value)
-        return result
+    def _db_values(self, tenant_uuid: str) -> dict[str, str]:
+        return {
+            **self.vars_replacement,
+            **self.uuids_replacement,
+            self.db.tenant_placeholder: tenant_uuid,
+        }
 
     def iterate_db_scripts(self, tenant_uuid: str):
+        values = self._db_values(tenant_uuid)
         return (
-            (script_id, self._replace_db_script(script, tenant_uuid))
-            for script_id, script in self.db.scripts_data.items()
+            (script_id, Substitution.fill(tokens, values))
+            for script_id, tokens in self.db.scripts_tokens.items()
+        )
+
+    def db_chunks(self, script_id: str, tenant_uuid: str,
+                  chunk_size: int = DB_COPY_CHUNK_SIZE) -> typing.Iterator[str]:
+        # script data in chunks (for streaming via COPY)
+        return Substitution.fill_chunks(
+            self.db.scripts_tokens[script_id], self._db_values(tenant_uuid), chunk_size,
         )
 
     def iterate_s3_objects(self):
@@ -286,6 +555,165 @@ class SeedRecipe:
         )
 
 
+class SeedRecipeCache:
+    # Recipes are reused while their files (recipe, scripts, and all files
+    # in S3 copy directories) are unchanged, i.e. loaded once per deployment
+
+    def __init__(self, recipes_dir: pathlib.Path):
+        self.recipes_dir = recipes_dir
+        self._entries: dict[pathlib.Path, tuple[tuple, SeedRecipe]] = {}
+
+    @staticmethod
+    def _stat(path: pathlib.Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _fingerprint(self, recipe_file: pathlib.Path, recipe: SeedRecipe) -> tuple:
+        paths = [
+            recipe_file,
+            *(directive.path for directive in recipe.db.scripts.values()),
+        ]
+        # nested files are included as S3 objects (and their cached content
+        # hashes) are loaded from them, directory stat covers only top level
+        for directive in recipe.s3.copy.values():
+            paths.append(directive.path)
+            if directive.path.is_dir():
+                paths.extend(sorted(directive.path.glob('**/*')))
+        return tuple((path, self._stat(path)) for path in paths)
+
+    def load(self) -> dict[str, SeedRecipe]:
+        entries: dict[pathlib.Path, tuple[tuple, SeedRecipe]] = {}
+        for recipe_file in sorted(self.recipes_dir.glob('*.seed.json')):
+            cached = self._entries.get(recipe_file)
+            if cached is not None and cached[0] == self._fingerprint(recipe_file, cached[1]):
+                entries[recipe_file] = cached
+                continue
+            LOG.debug('Loading recipe from %s', recipe_file.as_posix())
+            recipe = SeedRecipe.load_from_json(recipe_file)
+            entries[recipe_file] = (self._fingerprint(recipe_file, recipe), recipe)
+        self._entries = entries
+        return {recipe.name: recipe for _, recipe in entries.values()}
+
+    def clear(self):
+        self._entries.clear()
+
+
+class _TargetTransaction:
+    # Transaction in a target DB, with two-phase commit (gtrid set) changes
+    # are prepared in all target DBs before committing any of them
+
+    def __init__(self, target: str | None, db: Database, gtrid: str | None,
+                 stale_after: int = TPC_STALE_AFTER):
+        self.name = target or 'DEFAULT'
+        self.connection = db.conn_query.connection
+        self.gtrid = gtrid
+        self.stale_after = stale_after
+        self.began = False
+        self.finished = False
+        # rollback may come from the worker thread and from timeout handling
+        self._lock = threading.Lock()
+
+    def begin(self):
+        if self.gtrid is None:
+            return
+        # finish transaction of preceding queries (e.g. readiness check)
+        self.connection.commit()
+        self._rollback_stale()
+        self.connection.tpc_begin(f'{self.gtrid}-{self.name}')
+        self.began = True
+
+    def _rollback_stale(self):
+        # prepared transactions left behind (e.g. killed between prepare
+        # and commit) would hold locks, those older than any job are dropped
+        now = datetime.datetime.now(tz=datetime.UTC)
+        for xid in self.connection.tpc_recover():
+            if not xid.gtrid.startswith(TPC_GTRID_PREFIX) or xid.prepared is None:
+                continue
+            if xid.database != self.connection.info.dbname:
+                continue
+            if (now - xid.prepared).total_seconds() < self.stale_after:
+                continue
+            LOG.warning('%s: rolling back stale prepared transaction %s (prepared at %s)',
+                        self.name, xid.gtrid, xid.prepared.isoformat())
+            self.connection.tpc_rollback(xid)
+
+    def prepare(self):
+        if self.began:
+            self.connection.tpc_prepare()
+
+    def cancel(self):
+        # stops a statement running in another thread (if any)
+        try:
+            self.connection.cancel_safe(timeout=CANCEL_QUERY_TIMEOUT)
+        except Exception as e:
+            LOG.warning('%s failed to cancel running query: %s', self.name, str(e))
+
+    def close(self):
+        # last resort if the seeding does not stop, changes are discarded
+        with self._lock:
+            LOG.warning('%s closing connection to discard changes', self.name)
+            self.connection.close()
+            self.finished = True
+
+    def commit(self):
+        with self._lock:
+            if self.began:
+                self.connection.tpc_commit()
+            else:
+                self.connection.commit()
+            self.finished = True
+
+    def rollback(self):
+        with self._lock:
+            if self.finished:
+                return
+            conn = self.connection
+            LOG.debug('%s will roll back: %s / %s',
+                      self.name, conn.pgconn.status, conn.pgconn.transaction_status)
+            if self.began:
+                conn.tpc_rollback()
+            else:
+                conn.rollback()
+            self.finished = True
+            LOG.debug('%s rolled back: %s / %s',
+                      self.name, conn.pgconn.status, conn.pgconn.transaction_status)
+
+
+class SeedCancelledError(RuntimeError):
+
+    def __init__(self):
+        super().__init__('Seeding cancelled')
+
+
+class _SeedRun:
+    # Seeding in progress shared with its worker threads (target DBs and
+    # S3 transfers); a job timeout interrupts only the queue worker thread,
+    # others stop on the cancel flag checked between scripts
+
+    def __init__(self, transactions: list[_TargetTransaction]):
+        self.transactions = transactions
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise SeedCancelledError
+
+    def cancel(self):
+        self._cancelled.set()
+        for transaction in self.transactions:
+            transaction.cancel()
+
+    def finish(self):
+        self._finished.set()
+
+    def wait(self, timeout: float) -> bool:
+        return self._finished.wait(timeout=timeout)
+
+
 class DataSeeder(CommandWorker):
 
     def __init__(self, cfg: SeederConfig, workdir: pathlib.Path,
@@ -294,9 +722,14 @@ class DataSeeder(CommandWorker):
         self.workdir = workdir
         self._default_recipe_name = default_recipe_name
         self.recipes = {}  # type: dict[str, SeedRecipe]
+        self.recipe_cache = SeedRecipeCache(workdir)
         self.recipe = SeedRecipe.create_default()
         self.dbs = {}  # type: dict[str, Database]
         self.s3s = {}  # type: dict[str, S3Storage]
+        self._golden_objects = set()  # type: set[str]
+        self._golden_locks = collections.defaultdict(threading.Lock)  # type: dict[str, threading.Lock]
+        self._golden_lock = threading.Lock()
+        self._run = None  # type: _SeedRun | None
 
         self._init_context(workdir=workdir)
         self._init_sentry()
@@ -335,7 +768,7 @@ class DataSeeder(CommandWorker):
     def _prepare_recipe(self, recipe_name: str):
         SentryReporter.set_tags(recipe_name=recipe_name)
         LOG.info('Loading recipe "%s"', recipe_name)
-        self.recipes = SeedRecipe.load_from_dir(self.workdir)
+        self.recipes = self.recipe_cache.load()
         if recipe_name not in self.recipes:
             raise RuntimeError(f'Recipe "{recipe_name}" not found')
         LOG.info('Preparing seed recipe "%s"', recipe_name)
@@ -388,6 +821,21 @@ class DataSeeder(CommandWorker):
 
     def process_timeout(self, e: BaseException):
         LOG.error('Failed with timeout', exc_info=e)
+        # seeding threads may still run, they must stop before rolling back
+        # as the queue then uses the same connection to record the result
+        run = self._run
+        if run is None:
+            return
+        run.cancel()
+        if run.wait(timeout=CANCEL_WAIT):
+            self._rollback(run.transactions)
+            return
+        LOG.error('Seeding did not stop within %s seconds after cancel', CANCEL_WAIT)
+        for transaction in run.transactions:
+            try:
+                transaction.close()
+            except Exception as ex:
+                LOG.error('Failed to close %s: %s', transaction.name, str(ex))
 
     def process_exception(self, e: BaseException):
         LOG.error('Failed with unexpected error', exc_info=e)
@@ -406,79 +854,245 @@ class DataSeeder(CommandWorker):
     def seed(self, tenant_uuid: str, recipe_name: str, attempt: int = 0):
         LOG.info('Init seeding recipe "%s" to "%s"', recipe_name, tenant_uuid)
         self._prepare_recipe(recipe_name=recipe_name)
-        if attempt == 0 and self.recipe.init_wait > 0.01:
-            LOG.info('Waiting for %s seconds (first attempt)',
-                     self.recipe.init_wait)
-            time.sleep(self.recipe.init_wait)
+        # polling blocks the worker only briefly, the command is then
+        # retried later by the queue (other commands are processed meanwhile)
+        wait_time = min(self.recipe.init_wait, READINESS_MAX_WAIT)
+        if not self._wait_for_tenant(tenant_uuid=tenant_uuid, timeout=wait_time):
+            raise CommandJobError.create(
+                job_id=tenant_uuid,
+                message=f'Tenant {tenant_uuid} is not ready yet '
+                        f'(waited {wait_time} seconds, attempt {attempt + 1})',
+                try_again=True,
+            )
         LOG.info('Executing recipe "%s"', recipe_name)
         self._execute(tenant_uuid=tenant_uuid)
 
+    @staticmethod
+    def _wait_for_tenant(tenant_uuid: str, timeout: float) -> bool:
+        # polls with exponential backoff until the tenant exists or timeout
+        db = Context.get().app.db
+        deadline = time.monotonic() + timeout
+        delay = READINESS_INITIAL_DELAY
+        while not db.tenant_exists(tenant_uuid=tenant_uuid):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                LOG.warning('Tenant %s is not ready after %s seconds', tenant_uuid, timeout)
+                return False
+            LOG.debug('Tenant %s is not ready yet, checking again in %.2f seconds',
+                      tenant_uuid, min(delay, remaining))
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, READINESS_MAX_DELAY)
+        LOG.info('Tenant %s is ready', tenant_uuid)
+        return True
+
+    def _db(self, target: str | None) -> Database:
+        if target is not None and target in self.dbs:
+            return self.dbs[target]
+        return Context.get().app.db
+
+    def _s3_storage(self, target: str | None) -> S3Storage:
+        if target is not None and target in self.s3s:
+            return self.s3s[target]
+        return Context.get().app.s3
+
+    def _golden_object_name(self, storage: S3Storage, s3_object: SeedRecipeS3Object,
+                            content_type: str) -> str | None:
+        # golden objects (by content and content type, as copies keep the
+        # metadata of the source) are stored once in the main bucket
+        # and then copied server-side if the target is the same bucket
+        prefix = self.cfg.seed.s3_golden_prefix
+        if not prefix or storage.identification != Context.get().app.s3.identification:
+            return None
+        object_name = f'{prefix.rstrip("/")}/{s3_object.content_hash}/{content_type}'
+        with self._golden_lock:
+            object_lock = self._golden_locks[object_name]
+        with object_lock:
+            if object_name not in self._golden_objects:
+                if not storage.object_exists(tenant_uuid=None, object_name=object_name):
+                    LOG.debug(' -> Storing golden object: %s', object_name)
+                    storage.store_file(
+                        tenant_uuid=None,
+                        object_name=object_name,
+                        content_type=content_type,
+                        file_path=s3_object.local_path,
+                    )
+                self._golden_objects.add(object_name)
+        return object_name
+
+    def _transfer_s3_object(self, run: _SeedRun, tenant_uuid: str,
+                            s3_object: SeedRecipeS3Object) -> S3Storage:
+        run.check()
+        storage = self._s3_storage(s3_object.target)
+        content_type = _guess_mimetype(s3_object.local_path.name)
+        golden_name = self._golden_object_name(storage, s3_object, content_type)
+        if golden_name is not None and storage.copy_object(
+            tenant_uuid=tenant_uuid,
+            source_object_name=golden_name,
+            object_name=s3_object.object_name,
+        ):
+            LOG.debug(' -> Copied: %s -> %s [target: %s]',
+                      golden_name, s3_object.object_name, s3_object.target)
+            return storage
+        if golden_name is not None:
+            self._golden_objects.discard(golden_name)
+        LOG.debug(' -> Sending: %s -> %s [target: %s]', s3_object.local_path.as_posix(),
+                  s3_object.object_name, s3_object.target)
+        storage.store_file(
+            tenant_uuid=tenant_uuid,
+            object_name=s3_object.object_name,
+            content_type=content_type,
+            file_path=s3_object.local_path,
+        )
+        return storage
+
+    def _transfer_s3_objects(self, run: _SeedRun, tenant_uuid: str):
+        # all or nothing, objects stored before a failure (or cancel on
+        # job timeout) are removed
+        s3_objects = list(self.recipe.iterate_s3_objects())
+        workers = max(1, min(self.cfg.seed.s3_workers, len(s3_objects)))
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='seeder-s3',
+        ) as executor:
+            futures: dict[concurrent.futures.Future, SeedRecipeS3Object] = {}
+            try:
+                for s3_object in s3_objects:
+                    future = executor.submit(self._transfer_s3_object, run, tenant_uuid, s3_object)
+                    futures[future] = s3_object
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except BaseException:
+                executor.shutdown(wait=True, cancel_futures=True)
+                self._remove_s3_objects(tenant_uuid, [
+                    (future.result(), s3_object.object_name)
+                    for future, s3_object in futures.items()
+                    if not future.cancelled() and future.exception() is None
+                ])
+                raise
+        LOG.info('Transferred %s S3 objects', len(s3_objects))
+
+    @staticmethod
+    def _remove_s3_objects(tenant_uuid: str, stored: list[tuple[S3Storage, str]]):
+        by_storage: dict[str, tuple[S3Storage, list[str]]] = {}
+        for storage, object_name in stored:
+            by_storage.setdefault(storage.identification, (storage, []))[1].append(object_name)
+        for storage, object_names in by_storage.values():
+            LOG.info('Removing %s transferred S3 objects from %s',
+                     len(object_names), storage.identification)
+            try:
+                storage.remove_objects(tenant_uuid=tenant_uuid, object_names=object_names)
+            except Exception as e:
+                LOG.warning('Failed to remove transferred S3 objects: %s', str(e))
+
+    def _db_plan(self) -> dict[str | None, list[str]]:
+        # scripts grouped by target DB (None = default) in recipe order,
+        # target DBs are independent so they can be seeded concurrently
+        plan: dict[str | None, list[str]] = collections.OrderedDict()
+        clone = self.recipe.db.clone
+        if clone is not None:
+            plan[clone.target if clone.target in self.dbs else None] = []
+        for script_id, script in self.recipe.db.scripts.items():
+            target = script.target if script.target in self.dbs else None
+            plan.setdefault(target, []).append(script_id)
+        return plan
+
+    def _run_db_target(self, run: _SeedRun, tenant_uuid: str, target: str | None,
+                       script_ids: list[str]):
+        db = self._db(target)
+        clone = self.recipe.db.clone
+        run.check()
+        if clone is not None and (clone.target if clone.target in self.dbs else None) == target:
+            LOG.info('Cloning template tenant %s [target: %s]', clone.from_tenant, target)
+            with db.conn_query.new_cursor() as c:
+                clone.execute(cursor=c, tenant_uuid=tenant_uuid)
+
+        for script_id in script_ids:
+            run.check()
+            script = self.recipe.db.scripts[script_id]
+            chunks = self.recipe.db_chunks(script_id=script_id, tenant_uuid=tenant_uuid)
+            with db.conn_query.new_cursor(use_dict=True) as c:
+                if script.copy is not None:
+                    LOG.debug(' -> Copying data: %s [target: %s]',
+                              script_id, script.target)
+                    with c.copy(script.copy.statement) as copy:
+                        for chunk in chunks:
+                            run.check()
+                            copy.write(chunk)
+                else:
+                    LOG.debug(' -> Executing script: %s [target: %s]',
+                              script_id, script.target)
+                    c.execute(query=''.join(chunks))
+
+    def _run_db_plan(self, run: _SeedRun, tenant_uuid: str,
+                     plan: dict[str | None, list[str]]):
+        LOG.info('Running SQL scripts (%s target DBs)', len(plan))
+        if len(plan) < 2:
+            for target, script_ids in plan.items():
+                self._run_db_target(run, tenant_uuid, target, script_ids)
+            return
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(plan),
+            thread_name_prefix='seeder-db',
+        ) as executor:
+            futures = [
+                executor.submit(self._run_db_target, run, tenant_uuid, target, script_ids)
+                for target, script_ids in plan.items()
+            ]
+            concurrent.futures.wait(futures)
+        # all targets finished (or failed) before rolling back any of them
+        for future in futures:
+            future.result()
+
     def _execute(self, tenant_uuid: str):
         SentryReporter.set_tags(tenant_uuid=tenant_uuid)
         # Run SQL scripts
-        app_ctx = Context.get().app
         phase = 'DB'
-        used_targets = set()
+        plan = self._db_plan()
+        gtrid = f'{TPC_GTRID_PREFIX}{uuid.uuid4()}' if self.cfg.seed.db_two_phase_commit else None
+        stale_after = max(self.cfg.seed.job_timeout or 0, TPC_STALE_AFTER)
+        transactions = [
+            _TargetTransaction(target=target, db=self._db(target), gtrid=gtrid,
+                               stale_after=stale_after)
+            for target in [None, *(target for target in plan if target is not None)]
+        ]
+        run = _SeedRun(transactions)
+        self._run = run
         try:
-            LOG.info('Running SQL scripts')
-            for script_id, sql_script in self.recipe.iterate_db_scripts(tenant_uuid):
-                script = self.recipe.db.scripts[script_id]
-                LOG.debug(' -> Executing script: %s [target: %s]',
-                          script_id, script.target)
-                if script.target is not None and script.target in self.dbs:
-                    used_targets.add(script.target)
-                    with self.dbs[script.target].conn_query.new_cursor(use_dict=True) as c:
-                        c.execute(query=sql_script)
-                else:
-                    with app_ctx.db.conn_query.new_cursor(use_dict=True) as c:
-                        c.execute(query=sql_script)
+            for transaction in transactions:
+                transaction.begin()
+            self._run_db_plan(run=run, tenant_uuid=tenant_uuid, plan=plan)
 
             phase = 'S3'
             LOG.info('Transferring S3 objects')
-            for s3_object in self.recipe.iterate_s3_objects():
-                LOG.debug(' -> Reading: %s', s3_object.local_path.as_posix())
-                data = s3_object.local_path.read_bytes()
-                LOG.debug(' -> Sending: %s [target: %s]',
-                          s3_object.object_name, s3_object.target)
-                if s3_object.target is not None and s3_object.target in self.s3s:
-                    self.s3s[s3_object.target].store_object(
-                        tenant_uuid=tenant_uuid,
-                        object_name=s3_object.object_name,
-                        content_type=_guess_mimetype(s3_object.local_path.name),
-                        data=data,
-                    )
-                else:
-                    app_ctx.s3.store_object(
-                        tenant_uuid=tenant_uuid,
-                        object_name=s3_object.object_name,
-                        content_type=_guess_mimetype(s3_object.local_path.name),
-                        data=data,
-                    )
+            self._transfer_s3_objects(run=run, tenant_uuid=tenant_uuid)
+
+            phase = 'COMMIT'
+            for transaction in transactions:
+                transaction.prepare()
         except Exception as e:
             LOG.warning('Exception appeared [%s]: %s', type(e).__name__, e)
             LOG.error('Failed with unexpected error', exc_info=e)
             LOG.info('Rolling back DB changes')
-
-            LOG.debug('Used extra DBs: %s', str(used_targets))
-            conn = app_ctx.db.conn_query.connection
-            LOG.debug('DEFAULT will roll back: %s / %s',
-                      conn.pgconn.status, conn.pgconn.transaction_status)
-            conn.rollback()
-            LOG.debug('DEFAULT rolled back: %s / %s',
-                      conn.pgconn.status, conn.pgconn.transaction_status)
-            for target in used_targets:
-                conn = self.dbs[target].conn_query.connection
-                LOG.debug('%s will roll back: %s / %s',
-                          target, conn.pgconn.status, conn.pgconn.transaction_status)
-                conn.rollback()
-                LOG.debug('%s rolled back: %s / %s',
-                          target, conn.pgconn.status, conn.pgconn.transaction_status)
+            self._rollback(transactions)
             raise RuntimeError(f'{phase}: {e}') from e
+        except BaseException as e:
+            # e.g. job timeout, no (prepared) transaction may stay open
+            LOG.warning('Interrupted [%s], rolling back DB changes', type(e).__name__)
+            self._rollback(transactions)
+            raise
         else:
             LOG.info('Committing DB changes')
-            app_ctx.db.conn_query.connection.commit()
-            for target in used_targets:
-                self.dbs[target].conn_query.connection.commit()
+            for transaction in transactions:
+                transaction.commit()
         finally:
+            run.finish()
             LOG.info('Data seeding done')
             SentryReporter.set_tags(tenant_uuid='-')
+
+    @staticmethod
+    def _rollback(transactions: list[_TargetTransaction]):
+        for transaction in transactions:
+            try:
+                transaction.rollback()
+            except Exception as e:
+                LOG.error('Failed to roll back %s: %s', transaction.name, str(e))
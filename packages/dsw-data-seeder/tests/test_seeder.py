@@ -0,0 +1,319 @@
+import pathlib
+import threading
+import time
+import types
+
+import func_timeout
+import psycopg
+import pytest
+
+from dsw.command_queue import CommandJobError
+from dsw.data_seeder import seeder as seeder_module
+from dsw.data_seeder.context import Context
+from dsw.data_seeder.seeder import DataSeeder, SeedRecipeClone, SeedRecipeS3Object
+
+
+class _FakeConnection:
+    # records statements and transaction control, statements wait
+    # for the given time unless cancelled
+
+    def __init__(self, name: str, log: list, statement_time: float):
+        self.name = name
+        self.log = log
+        self.statement_time = statement_time
+        self.info = types.SimpleNamespace(dbname=name)
+        self.pgconn = types.SimpleNamespace(status=0, transaction_status=0)
+        self.closed = 0
+        self._cancelled = threading.Event()
+
+    def _record(self, action: str, *args):
+        self.log.append((self.name, action, *args))
+
+    def execute(self, query: str):
+        self._cancelled.clear()
+        self._record('execute', query)
+        if self._cancelled.wait(timeout=self.statement_time):
+            self._record('cancelled', query)
+            raise psycopg.errors.QueryCanceled('canceling statement due to user request')
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def cancel_safe(self, timeout: float):
+        self._cancelled.set()
+
+    def commit(self):
+        self._record('commit')
+
+    def rollback(self):
+        self._record('rollback')
+
+    def close(self):
+        self._record('close')
+        self.closed = 1
+
+    def tpc_recover(self):
+        return []
+
+    def tpc_begin(self, xid: str):
+        self._record('tpc_begin')
+
+    def tpc_prepare(self):
+        self._record('tpc_prepare')
+
+    def tpc_commit(self):
+        self._record('tpc_commit')
+
+    def tpc_rollback(self):
+        self._record('tpc_rollback')
+
+
+class _FakeCursor:
+
+    def __init__(self, connection: _FakeConnection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query: str):
+        self.connection.execute(query)
+
+
+def _fake_db(connection: _FakeConnection):
+    return types.SimpleNamespace(conn_query=types.SimpleNamespace(
+        connection=connection,
+        new_cursor=lambda use_dict=False: connection.cursor(),
+    ))
+
+
+class _FakeStorage:
+    # records stored and removed objects, storing takes the given time
+
+    identification = 'fake'
+
+    def __init__(self, store_time: float):
+        self.store_time = store_time
+        self.stored: list[str] = []
+        self.removed: list[str] = []
+        self._lock = threading.Lock()
+
+    def store_file(self, *, tenant_uuid: str, object_name: str, content_type: str,
+                   file_path: pathlib.Path):
+        time.sleep(self.store_time)
+        with self._lock:
+            self.stored.append(object_name)
+
+    def remove_objects(self, *, tenant_uuid: str, object_names: list[str]):
+        with self._lock:
+            self.removed.extend(object_names)
+
+
+def _recipe(scripts: dict[str, str | None], s3_objects: list | None = None):
+    return types.SimpleNamespace(
+        db=types.SimpleNamespace(
+            clone=None,
+            scripts={
+                script_id: types.SimpleNamespace(target=target, copy=None)
+                for script_id, target in scripts.items()
+            },
+        ),
+        db_chunks=lambda script_id, tenant_uuid: [script_id],
+        iterate_s3_objects=lambda: s3_objects or [],
+    )
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def seeder(monkeypatch: pytest.MonkeyPatch, log: list):
+    for method in ('_init_context', '_init_sentry', '_init_extra_connections'):
+        monkeypatch.setattr(DataSeeder, method, lambda *args, **kwargs: None)
+    monkeypatch.setattr(seeder_module, 'CANCEL_WAIT', 2.0)
+
+    def create(two_phase_commit: bool, statement_time: float,
+               s3: _FakeStorage | None = None) -> DataSeeder:
+        cfg = types.SimpleNamespace(seed=types.SimpleNamespace(
+            job_timeout=1,
+            s3_workers=2,
+            s3_golden_prefix=None,
+            db_two_phase_commit=two_phase_commit,
+        ))
+        instance = DataSeeder(
+            cfg=cfg,  # type: ignore[arg-type]
+            workdir=pathlib.Path('.'),
+            default_recipe_name='default',
+        )
+        Context.initialize(
+            db=_fake_db(_FakeConnection('default', log, statement_time)),
+            s3=s3,
+            config=cfg,
+            workdir=pathlib.Path('.'),
+        )
+        instance.dbs = {'extra': _fake_db(_FakeConnection('extra', log, statement_time))}
+        return instance
+
+    return create
+
+
+@pytest.mark.parametrize('two_phase_commit', [False, True])
+def test_timeout_stops_all_target_dbs(seeder, log: list, two_phase_commit: bool):
+    instance = seeder(two_phase_commit=two_phase_commit, statement_time=0.2)
+    instance.recipe = _recipe({
+        'default-1': None, 'default-2': None, 'default-3': None,
+        'extra-1': 'extra', 'extra-2': 'extra', 'extra-3': 'extra',
+    })
+
+    with pytest.raises(func_timeout.FunctionTimedOut) as e:
+        func_timeout.func_timeout(timeout=0.3, func=instance._execute, args=('tenant',))
+    instance.process_timeout(e.value)
+
+    # nothing runs after the timeout is processed (queue commits then)
+    processed = list(log)
+    time.sleep(0.5)
+    assert log == processed
+    for name in ('default', 'extra'):
+        actions = [entry[1:] for entry in log if entry[0] == name]
+        assert actions[-1] == (('tpc_rollback',) if two_phase_commit else ('rollback',))
+        # two-phase commit finishes preceding queries first
+        assert ('commit',) not in actions[1 if two_phase_commit else 0:]
+        assert ('tpc_commit',) not in actions
+        assert ('execute', f'{name}-3') not in actions
+
+
+def test_timeout_closes_connections_if_not_stopped(seeder, log: list,
+                                                   monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(seeder_module, 'CANCEL_WAIT', 0.1)
+    instance = seeder(two_phase_commit=False, statement_time=0.3)
+    instance.recipe = _recipe({'default-1': None, 'extra-1': 'extra'})
+    # statements cannot be cancelled
+    for connection in (Context.get().app.db.conn_query.connection,
+                       instance.dbs['extra'].conn_query.connection):
+        connection.cancel_safe = lambda timeout: None
+
+    with pytest.raises(func_timeout.FunctionTimedOut) as e:
+        func_timeout.func_timeout(timeout=0.1, func=instance._execute, args=('tenant',))
+    instance.process_timeout(e.value)
+
+    assert ('default', 'close') in log
+    assert ('extra', 'close') in log
+    time.sleep(0.5)
+    assert ('default', 'commit') not in log
+    assert ('extra', 'commit') not in log
+
+
+def test_timeout_removes_transferred_s3_objects(seeder, log: list, tmp_path: pathlib.Path):
+    storage = _FakeStorage(store_time=0.1)
+    instance = seeder(two_phase_commit=False, statement_time=0.0, s3=storage)
+    local_file = tmp_path / 'file.txt'
+    local_file.write_text('content', encoding='utf-8')
+    s3_objects = [
+        SeedRecipeS3Object(
+            local_path=local_file,
+            original_object_name=f'file-{index}.txt',
+            target=None,
+            object_name=f'file-{index}.txt',
+        )
+        for index in range(20)
+    ]
+    instance.recipe = _recipe({'default-1': None}, s3_objects)
+
+    with pytest.raises(func_timeout.FunctionTimedOut) as e:
+        func_timeout.func_timeout(timeout=0.3, func=instance._execute, args=('tenant',))
+    instance.process_timeout(e.value)
+
+    # transfer stopped, objects stored before the timeout are removed
+    # before the queue records the result
+    assert 0 < len(storage.stored) < len(s3_objects)
+    assert sorted(storage.removed) == sorted(storage.stored)
+    assert log[-1] == ('default', 'rollback')
+    stored = list(storage.stored)
+    time.sleep(0.3)
+    assert storage.stored == stored
+
+
+class _CloneCursor:
+    # returns columns of cloned tables, records executed statements
+
+    COLUMNS = {
+        'package': ['uuid', 'tenant_uuid', 'name'],
+        'package_event': ['uuid', 'tenant_uuid', 'package_uuid', 'content'],
+    }
+
+    def __init__(self):
+        self.statements: list[tuple[str, dict]] = []
+        self._table: str | None = None
+
+    def execute(self, query, params: dict):
+        if query == SeedRecipeClone.GET_COLUMNS:
+            self._table = params['table']
+            return
+        self.statements.append((query.as_string(), params))
+
+    def fetchall(self):
+        return [(column,) for column in self.COLUMNS[self._table or '']]
+
+
+def test_clone_statement():
+    clone = SeedRecipeClone.from_dict({
+        'fromTenant': 'template',
+        'tables': [
+            {'table': 'package', 'remap': ['uuid']},
+            {'table': 'package_event', 'remap': ['uuid', 'package_uuid']},
+        ],
+    })
+    assert clone is not None
+    cursor = _CloneCursor()
+    clone.execute(cursor=cursor, tenant_uuid='tenant')  # type: ignore[arg-type]
+
+    assert len(cursor.statements) == 1
+    statement, params = cursor.statements[0]
+    assert params == {'from_tenant': 'template', 'tenant_uuid': 'tenant'}
+    assert statement == (
+        'WITH seeder_uuid_map AS MATERIALIZED ('
+        'SELECT src.old_uuid, gen_random_uuid() AS new_uuid FROM ('
+        'SELECT "uuid" FROM "package" WHERE "tenant_uuid" = %(from_tenant)s UNION '
+        'SELECT "uuid" FROM "package_event" WHERE "tenant_uuid" = %(from_tenant)s UNION '
+        'SELECT "package_uuid" FROM "package_event" WHERE "tenant_uuid" = %(from_tenant)s'
+        ') AS src (old_uuid) WHERE src.old_uuid IS NOT NULL), '
+        '"seeder_clone_0" AS ('
+        'INSERT INTO "package" ("uuid", "tenant_uuid", "name") '
+        'SELECT COALESCE("m_uuid".new_uuid, src."uuid"), %(tenant_uuid)s, src."name" '
+        'FROM "package" AS src '
+        'LEFT JOIN seeder_uuid_map AS "m_uuid" ON "m_uuid".old_uuid = src."uuid" '
+        'WHERE src."tenant_uuid" = %(from_tenant)s), '
+        '"seeder_clone_1" AS ('
+        'INSERT INTO "package_event" ("uuid", "tenant_uuid", "package_uuid", "content") '
+        'SELECT COALESCE("m_uuid".new_uuid, src."uuid"), %(tenant_uuid)s, '
+        'COALESCE("m_package_uuid".new_uuid, src."package_uuid"), src."content" '
+        'FROM "package_event" AS src '
+        'LEFT JOIN seeder_uuid_map AS "m_uuid" ON "m_uuid".old_uuid = src."uuid" '
+        'LEFT JOIN seeder_uuid_map AS "m_package_uuid" '
+        'ON "m_package_uuid".old_uuid = src."package_uuid" '
+        'WHERE src."tenant_uuid" = %(from_tenant)s) '
+        'SELECT NULL'
+    )
+
+
+def test_tenant_readiness_wait_is_capped(seeder, monkeypatch: pytest.MonkeyPatch):
+    instance = seeder(two_phase_commit=False, statement_time=0.0)
+    instance.recipe = _recipe({})
+    instance.recipe.init_wait = 20
+    monkeypatch.setattr(instance, '_prepare_recipe', lambda recipe_name: None)
+    waits = []
+
+    def wait_for_tenant(tenant_uuid: str, timeout: float) -> bool:
+        waits.append(timeout)
+        return False
+
+    monkeypatch.setattr(instance, '_wait_for_tenant', wait_for_tenant)
+    with pytest.raises(CommandJobError) as e:
+        instance.seed(tenant_uuid='tenant', recipe_name='default', attempt=2)
+    assert waits == [seeder_module.READINESS_MAX_WAIT]
+    assert e.value.try_again
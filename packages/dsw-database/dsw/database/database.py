@@ -41,6 +41,7 @@ class Database:
                              'WHERE p.uuid = %s AND p.tenant_uuid = %s;')
     SELECT_TENANT_LIMIT = ('SELECT uuid, storage FROM tenant_limit_bundle '
                            'WHERE uuid = %(tenant_uuid)s LIMIT 1;')
+    CHECK_TENANT_EXISTS = 'SELECT EXISTS(SELECT 1 FROM tenant WHERE uuid = %(tenant_uuid)s);'
     UPDATE_DOCUMENT_STATE = 'UPDATE document SET state = %s, worker_log = %s WHERE uuid = %s;'
     UPDATE_DOCUMENT_RETRIEVED = 'UPDATE document SET retrieved_at = %s, state = %s WHERE uuid = %s;'
     UPDATE_DOCUMENT_FINISHED = ('UPDATE document SET finished_at = %s, state = %s, '
@@ -167,6 +168,22 @@ class Database:
                 return None
             return model.DBTenantLimits.from_dict_row(result[0])
 
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_QUERY_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_QUERY_TRIES),
+        before=tenacity.before_log(LOG, logging.DEBUG),
+        after=tenacity.after_log(LOG, logging.DEBUG),
+    )
+    def tenant_exists(self, tenant_uuid: str) -> bool:
+        with self.conn_query.new_cursor() as cursor:
+            cursor.execute(
+                query=self.CHECK_TENANT_EXISTS,
+                params={'tenant_uuid': tenant_uuid},
+            )
+            result = cursor.fetchone()
+            return result is not None and bool(result[0])
+
     @tenacity.retry(
         reraise=True,
         wait=tenacity.wait_exponential(multiplier=RETRY_QUERY_MULTIPLIER),
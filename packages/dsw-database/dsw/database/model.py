@@ -420,6 +420,7 @@ class DBLocale:
     code: str
     default_locale: bool
     enabled: bool
+    updated_at: datetime.datetime | None = None
 
     @staticmethod
     def from_dict_row(data: dict):
@@ -432,6 +433,7 @@ class DBLocale:
             code=data['code'],
             default_locale=data['default_locale'],
             enabled=data['enabled'],
+            updated_at=data.get('updated_at'),
         )
 
     @property
@@ -0,0 +1,155 @@
+import collections
+import dataclasses
+import hashlib
+import json
+import logging
+import time
+import typing
+
+from .config import CacheConfig
+from .consts import DEFAULT_ENCODING
+from .context import Context
+from .documents import DocumentFile, FileFormat
+
+
+LOG = logging.getLogger(__name__)
+
+# fields identifying a single document record (not its content)
+_DOCUMENT_IDENTITY_FIELDS = frozenset(['uuid', 'formatUuid', 'createdAt'])
+# fields different for each document record even with the same content
+_DOCUMENT_RECORD_FIELDS = frozenset(['uuid', 'createdAt'])
+
+
+def make_cache_key(**components: typing.Any) -> str:
+    data = json.dumps(components, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode(DEFAULT_ENCODING)).hexdigest()
+
+
+def hash_context(context: dict, excluded_fields: frozenset[str]) -> str:
+    # hash of the whole document context except given fields of the document
+    document = context.get('document')
+    if isinstance(document, dict):
+        context = dict(context)
+        context['document'] = {
+            k: v for k, v in document.items()
+            if k not in excluded_fields
+        }
+    return make_cache_key(context=context)
+
+
+class _ExpiringLRUCache[T]:
+
+    def __init__(self, cfg: CacheConfig):
+        self.cfg = cfg
+        self._entries: collections.OrderedDict[str, tuple[float, T]] = \
+            collections.OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg.enabled and self.cfg.max_entries > 0
+
+    def _get(self, key: str) -> T | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            LOG.debug('Cache entry %s expired', key)
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key: str, value: T):
+        self._entries[key] = (time.monotonic() + self.cfg.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.cfg.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+@dataclasses.dataclass
+class RenderCacheEntry:
+    tenant_uuid: str
+    document_uuid: str
+    file_format: FileFormat
+    encoding: str | None
+    byte_size: int
+
+
+class RenderCache(_ExpiringLRUCache[RenderCacheEntry]):
+    # Maps rendering inputs to an already stored document (pointer to S3)
+    # so the same document can be server-side copied instead of rendered
+
+    _instance = None
+
+    @classmethod
+    def get(cls) -> 'RenderCache':
+        if cls._instance is None:
+            cls._instance = RenderCache(Context.get().app.cfg.render_cache)
+        return cls._instance
+
+    @staticmethod
+    def context_hash(context: dict) -> str:
+        # templates opting in must not render UUID or creation time of the
+        # document, everything else (incl. its creator) is part of the key
+        return hash_context(context, _DOCUMENT_RECORD_FIELDS)
+
+    @staticmethod
+    def make_key(**components: typing.Any) -> str:
+        return make_cache_key(**components)
+
+    def lookup(self, key: str) -> RenderCacheEntry | None:
+        return self._get(key)
+
+    def store(self, key: str, tenant_uuid: str, document_uuid: str,
+              document_file: DocumentFile):
+        self._put(key, RenderCacheEntry(
+            tenant_uuid=tenant_uuid,
+            document_uuid=document_uuid,
+            file_format=document_file.file_format,
+            encoding=document_file.encoding,
+            byte_size=document_file.byte_size,
+        ))
+
+
+class StepCache(_ExpiringLRUCache[DocumentFile]):
+    # Keeps intermediate results of format steps (e.g. Jinja output shared
+    # by DOCX and PDF formats) for a short time across jobs
+
+    _instance = None
+
+    @classmethod
+    def get(cls) -> 'StepCache':
+        if cls._instance is None:
+            cls._instance = StepCache(Context.get().app.cfg.step_cache)
+        return cls._instance
+
+    @staticmethod
+    def context_hash(context: dict) -> str:
+        # intermediate results are shared between documents of the same
+        # content (e.g. sibling formats), not only within one document, so
+        # templates opting in must not render UUID, creation time, or
+        # format of the document in the cached steps
+        return hash_context(context, _DOCUMENT_IDENTITY_FIELDS)
+
+    @staticmethod
+    def make_key(context_hash: str, template_uuid: str, template_hash: str,
+                 steps: list[str]) -> str:
+        return make_cache_key(
+            context_hash=context_hash,
+            template_uuid=template_uuid,
+            template_hash=template_hash,
+            steps=steps,
+        )
+
+    def lookup(self, key: str) -> DocumentFile | None:
+        return self._get(key)
+
+    def store(self, key: str, document_file: DocumentFile):
+        self._put(key, document_file)
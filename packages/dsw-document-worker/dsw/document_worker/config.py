@@ -6,7 +6,10 @@ from dsw.config.keys import (
     ConfigKey,
     ConfigKeys,
     ConfigKeysContainer,
+    cast_bool,
+    cast_int,
     cast_optional_int,
+    cast_optional_str,
     cast_str,
 )
 from dsw.config.model import (
@@ -46,6 +49,75 @@ class _ExperimentalKeys(ConfigKeysContainer):
     )
 
 
+class _RenderCacheKeys(ConfigKeysContainer):
+    enabled = ConfigKey(
+        yaml_path=['cache', 'render', 'enabled'],
+        var_names=['CACHE_RENDER_ENABLED'],
+        default=False,
+        cast=cast_bool,
+    )
+    ttl = ConfigKey(
+        yaml_path=['cache', 'render', 'ttl'],
+        var_names=['CACHE_RENDER_TTL'],
+        default=3600,
+        cast=cast_int,
+    )
+    max_entries = ConfigKey(
+        yaml_path=['cache', 'render', 'maxEntries'],
+        var_names=['CACHE_RENDER_MAX_ENTRIES'],
+        default=1000,
+        cast=cast_int,
+    )
+
+
+class _StepCacheKeys(ConfigKeysContainer):
+    enabled = ConfigKey(
+        yaml_path=['cache', 'steps', 'enabled'],
+        var_names=['CACHE_STEPS_ENABLED'],
+        default=False,
+        cast=cast_bool,
+    )
+    ttl = ConfigKey(
+        yaml_path=['cache', 'steps', 'ttl'],
+        var_names=['CACHE_STEPS_TTL'],
+        default=300,
+        cast=cast_int,
+    )
+    max_entries = ConfigKey(
+        yaml_path=['cache', 'steps', 'maxEntries'],
+        var_names=['CACHE_STEPS_MAX_ENTRIES'],
+        default=20,
+        cast=cast_int,
+    )
+
+
+class _MetricsKeys(ConfigKeysContainer):
+    enabled = ConfigKey(
+        yaml_path=['metrics', 'enabled'],
+        var_names=['METRICS_ENABLED'],
+        default=False,
+        cast=cast_bool,
+    )
+    statsd_host = ConfigKey(
+        yaml_path=['metrics', 'statsd', 'host'],
+        var_names=['METRICS_STATSD_HOST'],
+        default=None,
+        cast=cast_optional_str,
+    )
+    statsd_port = ConfigKey(
+        yaml_path=['metrics', 'statsd', 'port'],
+        var_names=['METRICS_STATSD_PORT'],
+        default=8125,
+        cast=cast_int,
+    )
+    statsd_prefix = ConfigKey(
+        yaml_path=['metrics', 'statsd', 'prefix'],
+        var_names=['METRICS_STATSD_PREFIX'],
+        default='docworker',
+        cast=cast_str,
+    )
+
+
 class _DocumentContextKeys(ConfigKeysContainer):
     service_name = ConfigKey(
         yaml_path=['documentContext', 'serviceName'],
@@ -127,6 +199,9 @@ class _CommandPandocKeys(ConfigKeysContainer):
 class DocWorkerConfigKeys(ConfigKeys):
     documents = _DocumentsKeys
     experimental = _ExperimentalKeys
+    render_cache = _RenderCacheKeys
+    step_cache = _StepCacheKeys
+    metrics = _MetricsKeys
     cmd_pandoc = _CommandPandocKeys
     context = _DocumentContextKeys
 
@@ -145,6 +220,21 @@ class ExperimentalConfig(ConfigModel):
     max_doc_size: int | None
 
 
+@dataclasses.dataclass
+class CacheConfig(ConfigModel):
+    enabled: bool
+    ttl: int
+    max_entries: int
+
+
+@dataclasses.dataclass
+class MetricsConfig(ConfigModel):
+    enabled: bool
+    statsd_host: str | None
+    statsd_port: int
+    statsd_prefix: str
+
+
 @dataclasses.dataclass
 class DocumentContextConfig(ConfigModel):
     service_name: str
@@ -190,6 +280,17 @@ class TemplateConfig:
     requests: TemplateRequestsConfig
     secrets: dict[str, str]
     send_sentry: bool
+    render_cache: bool
+    step_cache: bool
+
+    @property
+    def cacheable(self) -> bool:
+        # templates doing requests may produce different results
+        return self.render_cache and not self.requests.enabled
+
+    @property
+    def step_cacheable(self) -> bool:
+        return self.step_cache and not self.requests.enabled
 
     @staticmethod
     def load(data: dict):
@@ -200,6 +301,8 @@ class TemplateConfig:
             ),
             secrets=data.get('secrets', {}),
             send_sentry=bool(data.get('sentry', False)),
+            render_cache=bool(data.get('renderCache', False)),
+            step_cache=bool(data.get('stepCache', False)),
         )
 
 
@@ -227,6 +330,9 @@ class DocumentWorkerConfig:
     sentry: SentryConfig
     general: GeneralConfig
     context: DocumentContextConfig
+    render_cache: CacheConfig
+    step_cache: CacheConfig
+    metrics: MetricsConfig
 
     def __str__(self):
         return f'DocumentWorkerConfig\n' \
@@ -240,6 +346,9 @@ class DocumentWorkerConfig:
                f'{self.sentry}' \
                f'{self.general}' \
                f'{self.context}' \
+               f'{self.render_cache}' \
+               f'{self.step_cache}' \
+               f'{self.metrics}' \
                f'Pandoc: {self.pandoc}' \
                f'====================\n'
 
@@ -281,6 +390,31 @@ class DocumentWorkerConfigParser(DSWConfigParser):
             max_doc_size=self.get(self.keys.experimental.max_doc_size),
         )
 
+    @property
+    def render_cache(self) -> CacheConfig:
+        return CacheConfig(
+            enabled=self.get(self.keys.render_cache.enabled),
+            ttl=self.get(self.keys.render_cache.ttl),
+            max_entries=self.get(self.keys.render_cache.max_entries),
+        )
+
+    @property
+    def step_cache(self) -> CacheConfig:
+        return CacheConfig(
+            enabled=self.get(self.keys.step_cache.enabled),
+            ttl=self.get(self.keys.step_cache.ttl),
+            max_entries=self.get(self.keys.step_cache.max_entries),
+        )
+
+    @property
+    def metrics(self) -> MetricsConfig:
+        return MetricsConfig(
+            enabled=self.get(self.keys.metrics.enabled),
+            statsd_host=self.get(self.keys.metrics.statsd_host),
+            statsd_port=self.get(self.keys.metrics.statsd_port),
+            statsd_prefix=self.get(self.keys.metrics.statsd_prefix),
+        )
+
     @property
     def context(self) -> DocumentContextConfig:
         return DocumentContextConfig(
@@ -309,4 +443,7 @@ class DocumentWorkerConfigParser(DSWConfigParser):
             sentry=self.sentry,
             general=self.general,
             context=self.context,
+            render_cache=self.render_cache,
+            step_cache=self.step_cache,
+            metrics=self.metrics,
         )
@@ -1,5 +1,6 @@
 import dataclasses
 import pathlib
+import typing
 
 import pluggy
 
@@ -9,6 +10,10 @@ from dsw.storage import S3Storage
 from .config import DocumentWorkerConfig
 
 
+if typing.TYPE_CHECKING:
+    from .metrics import JobMetrics
+
+
 class ContextNotInitializedError(RuntimeError):
 
     def __init__(self):
@@ -27,6 +32,7 @@ class AppContext:
 @dataclasses.dataclass
 class JobContext:
     trace_id: str
+    metrics: 'JobMetrics | None' = None
 
 
 class _Context:
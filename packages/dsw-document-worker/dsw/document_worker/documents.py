@@ -152,6 +152,15 @@ class DocumentFile:
         return self.content_type
 
 
+class StoredDocumentFile(DocumentFile):
+    # Document already stored in S3, content is not loaded
+
+    def __init__(self, file_format: FileFormat, byte_size: int,
+                 encoding: str | None = None):
+        super().__init__(file_format=file_format, content=b'', encoding=encoding)
+        self.byte_size = byte_size
+
+
 def _name_uuid(document: DBDocument) -> str:
     return document.uuid
 
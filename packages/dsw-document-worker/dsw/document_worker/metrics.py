@@ -0,0 +1,179 @@
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import re
+import socket
+import time
+import typing
+
+from .config import MetricsConfig
+from .context import Context
+
+
+LOG = logging.getLogger(__name__)
+
+_STATSD_NAME_INVALID = re.compile(r'[^a-zA-Z0-9_-]+')
+
+
+def _cpu_time() -> float:
+    # includes subprocesses (e.g. pandoc) that finished meanwhile
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _current_rss() -> int:
+    # resident pages now (not the lifetime peak), zero if /proc is missing
+    try:
+        statm = pathlib.Path('/proc/self/statm').read_text(encoding='ascii')
+        return int(statm.split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+@dataclasses.dataclass
+class Measurement:
+    name: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    rss_delta: int = 0
+    input_size: int | None = None
+    output_size: int | None = None
+    cache: str | None = None
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            'name': self.name,
+            'wallTime': round(self.wall_time, 6),
+            'cpuTime': round(self.cpu_time, 6),
+            'rssDelta': self.rss_delta,
+            'inputSize': self.input_size,
+            'outputSize': self.output_size,
+            'cache': self.cache,
+        }
+
+
+class JobMetrics:
+
+    CACHE_HIT = 'hit'
+    CACHE_MISS = 'miss'
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.phases: list[Measurement] = []
+        self.steps: list[Measurement] = []
+        self.tags: dict[str, str] = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def _measure(self, name: str,
+                 target: list[Measurement]) -> typing.Iterator[Measurement]:
+        measurement = Measurement(name=name)
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_time()
+        rss_start = _current_rss()
+        try:
+            yield measurement
+        finally:
+            measurement.wall_time = time.perf_counter() - wall_start
+            measurement.cpu_time = _cpu_time() - cpu_start
+            measurement.rss_delta = _current_rss() - rss_start
+            target.append(measurement)
+
+    def phase(self, name: str) -> typing.ContextManager[Measurement]:
+        return self._measure(name, self.phases)
+
+    def step(self, name: str) -> typing.ContextManager[Measurement]:
+        return self._measure(name, self.steps)
+
+    def skipped_step(self, name: str, output_size: int | None):
+        self.steps.append(Measurement(
+            name=name,
+            output_size=output_size,
+            cache=self.CACHE_HIT,
+        ))
+
+    def to_dict(self) -> dict[str, typing.Any]:
+        return {
+            'job': self.job_id,
+            'wallTime': round(time.perf_counter() - self._started, 6),
+            'tags': self.tags,
+            'phases': [m.to_dict() for m in self.phases],
+            'steps': [m.to_dict() for m in self.steps],
+        }
+
+
+class StatsDClient:
+
+    def __init__(self, host: str, port: int, prefix: str):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    @staticmethod
+    def _name(value: str) -> str:
+        return _STATSD_NAME_INVALID.sub('_', value)
+
+    def _send(self, metric: str, value: float, metric_type: str):
+        line = f'{self.prefix}.{metric}:{value}|{metric_type}'
+        try:
+            self.socket.sendto(line.encode('ascii'), self.address)
+        except OSError as e:
+            LOG.debug('Failed to send metric to StatsD: %s', str(e))
+
+    def _send_measurement(self, group: str, template: str, measurement: Measurement):
+        name = f'{group}.{template}.{self._name(measurement.name)}'
+        if measurement.cache is not None:
+            self._send(f'{name}.cache.{measurement.cache}', 1, 'c')
+        if measurement.cache == JobMetrics.CACHE_HIT:
+            return
+        self._send(f'{name}.wall_time', round(measurement.wall_time * 1000, 3), 'ms')
+        self._send(f'{name}.cpu_time', round(measurement.cpu_time * 1000, 3), 'ms')
+        self._send(f'{name}.rss_delta', measurement.rss_delta, 'g')
+        if measurement.input_size is not None:
+            self._send(f'{name}.input_size', measurement.input_size, 'g')
+        if measurement.output_size is not None:
+            self._send(f'{name}.output_size', measurement.output_size, 'g')
+
+    def send_job(self, metrics: JobMetrics):
+        template = self._name(metrics.tags.get('template', 'unknown'))
+        self._send('jobs', 1, 'c')
+        for measurement in metrics.phases:
+            self._send_measurement('phase', template, measurement)
+        for measurement in metrics.steps:
+            self._send_measurement('step', template, measurement)
+
+
+class MetricsReporter:
+
+    _instance = None
+
+    @classmethod
+    def get(cls) -> 'MetricsReporter':
+        if cls._instance is None:
+            cls._instance = MetricsReporter(Context.get().app.cfg.metrics)
+        return cls._instance
+
+    def __init__(self, cfg: MetricsConfig):
+        self.cfg = cfg
+        self.statsd: StatsDClient | None = None
+        if cfg.statsd_host is not None:
+            self.statsd = StatsDClient(
+                host=cfg.statsd_host,
+                port=cfg.statsd_port,
+                prefix=cfg.statsd_prefix,
+            )
+
+    def report(self, metrics: JobMetrics):
+        if not self.cfg.enabled:
+            return
+        data = metrics.to_dict()
+        LOG.info('Job metrics: %s', json.dumps(data), extra={'metrics': data})
+        if self.statsd is not None:
+            self.statsd.send_job(metrics)
+        try:
+            Context.get().app.pm.hook.report_metrics(metrics=data)
+        except Exception as e:
+            LOG.warning('Failed to report metrics via plugins: %s', str(e))
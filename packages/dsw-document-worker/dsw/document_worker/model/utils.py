@@ -1,5 +1,7 @@
+import functools
 import io
 import re
+import threading
 import typing
 
 import markdown
@@ -21,12 +23,9 @@ def unmark_element(element, stream=None):
 
 # patching Markdown
 markdown.Markdown.output_formats['plain'] = unmark_element
-__md = markdown.Markdown(output_format='plain')
-__md.stripTopLevelTags = False
 
-
-def strip_markdown(text):
-    return __md.convert(text)
+MARKDOWN_CACHE_SIZE = 4096
+MARKDOWN_CACHE_MAX_LENGTH = 10_000
 
 
 class DSWMarkdownExt(markdown.extensions.Extension):
@@ -67,12 +66,42 @@ class DSWMarkdownProcessor(markdown.preprocessors.Preprocessor):
         return new_lines
 
 
+class _MarkdownConverters(threading.local):
+    # Markdown instances are expensive to build but not thread-safe,
+    # each thread reuses own ones (reset before each conversion)
+
+    def __init__(self):
+        self.html = markdown.Markdown(extensions=[DSWMarkdownExt()])
+        self.plain = markdown.Markdown(output_format='plain')
+        self.plain.stripTopLevelTags = False
+
+
+_CONVERTERS = _MarkdownConverters()
+
+
+@functools.lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def _cached_html(md_text: str) -> str:
+    return _CONVERTERS.html.reset().convert(md_text)
+
+
+@functools.lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def _cached_plain(md_text: str) -> str:
+    return _CONVERTERS.plain.reset().convert(md_text)
+
+
+def _convert_html(md_text: str) -> str:
+    if len(md_text) > MARKDOWN_CACHE_MAX_LENGTH:
+        return _CONVERTERS.html.reset().convert(md_text)
+    return _cached_html(md_text)
+
+
+def strip_markdown(text):
+    if len(text) > MARKDOWN_CACHE_MAX_LENGTH:
+        return _CONVERTERS.plain.reset().convert(text)
+    return _cached_plain(text)
+
+
 def render_markdown(md_text: str):
     if md_text is None:
         return ''
-    return markupsafe.Markup(markdown.markdown(
-        text=md_text,
-        extensions=[
-            DSWMarkdownExt(),
-        ],
-    ))
+    return markupsafe.Markup(_convert_html(md_text))
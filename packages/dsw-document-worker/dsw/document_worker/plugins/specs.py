@@ -55,3 +55,18 @@ def enrich_jinja_env(jinja_env: jinja2.Environment, options: dict[str, str]) ->
     :param jinja_env: the Jinja environment to enrich
     :param options: the options provided to the step
     """
+
+
+@hookspec
+def report_metrics(metrics: dict) -> None:
+    """
+    Report metrics of a finished document generation job.
+
+    The plugin can forward the metrics to any monitoring system (e.g. expose them
+    for Prometheus). The metrics contain job identifier, tags (e.g. template and
+    format), and measurements of job phases and format steps; each measurement
+    has wall time and CPU time in seconds, peak RSS growth in bytes, input and
+    output sizes in bytes, and cache hit/miss where relevant.
+
+    :param metrics: the metrics of the job
+    """
@@ -1,7 +1,10 @@
 import logging
 
 from .. import consts
+from ..cache import StepCache
+from ..context import Context
 from ..documents import DocumentFile
+from ..metrics import JobMetrics
 from ..templates.steps import FormatStepError, Step, create_step
 
 
@@ -60,11 +63,69 @@ class Format:
         return any(step.requires_via_extras(requirement)
                    for step in self.steps)
 
-    def execute(self, context: dict) -> DocumentFile:
-        result = self.steps[0].execute_first(context)
-        for step in self.steps[1:]:
+    def _is_cacheable(self) -> bool:
+        if len(self.steps) < 2 or not StepCache.get().enabled:
+            return False
+        template_cfg = Context.get().app.cfg.templates.get_config(
+            self.template.coordinates,
+        )
+        return template_cfg is not None and template_cfg.step_cacheable
+
+    def _step_cache_keys(self, context: dict) -> list[str]:
+        # keys for intermediate results (all steps except the last one)
+        if not self._is_cacheable():
+            return []
+        context_hash = StepCache.context_hash(context)
+        template_hash = self.template.content_hash
+        signatures = [step.cache_signature for step in self.steps]
+        return [
+            StepCache.make_key(
+                context_hash=context_hash,
+                template_uuid=self.template.template_uuid,
+                template_hash=template_hash,
+                steps=signatures[:index + 1],
+            )
+            for index in range(len(self.steps) - 1)
+        ]
+
+    def _lookup_cached(self, cache_keys: list[str]) -> tuple[int, DocumentFile | None]:
+        for index in reversed(range(len(cache_keys))):
+            result = StepCache.get().lookup(cache_keys[index])
             if result is not None:
-                result = step.execute_follow(result, context)
-            else:
+                LOG.info('Using cached result of step #%d of format "%s"',
+                         index + 1, self.name)
+                return index + 1, result
+        return 0, None
+
+    @staticmethod
+    def _store_cached(cache_keys: list[str], index: int, result: DocumentFile):
+        if index < len(cache_keys):
+            StepCache.get().store(cache_keys[index], result)
+
+    def execute(self, context: dict) -> DocumentFile:
+        metrics = Context.get().job.metrics or JobMetrics(job_id='-')
+        cache_keys = self._step_cache_keys(context)
+        cache_state = JobMetrics.CACHE_MISS if len(cache_keys) > 0 else None
+        start, cached = self._lookup_cached(cache_keys)
+        if cached is None:
+            with metrics.step(self.steps[0].NAME) as measurement:
+                result = self.steps[0].execute_first(context)
+                measurement.output_size = result.byte_size
+                measurement.cache = cache_state
+            self._store_cached(cache_keys, 0, result)
+            start = 1
+        else:
+            for index, step in enumerate(self.steps[:start]):
+                output_size = cached.byte_size if index == start - 1 else None
+                metrics.skipped_step(step.NAME, output_size)
+            result = cached
+        for index in range(start, len(self.steps)):
+            if result is None:
                 break
+            with metrics.step(self.steps[index].NAME) as measurement:
+                measurement.input_size = result.byte_size
+                result = self.steps[index].execute_follow(result, context)
+                measurement.output_size = result.byte_size
+                measurement.cache = cache_state if index < len(cache_keys) else None
+            self._store_cached(cache_keys, index, result)
         return result
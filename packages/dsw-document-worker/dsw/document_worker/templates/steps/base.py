@@ -1,6 +1,12 @@
+import json
+
 from ...documents import DocumentFile
 
 
+def _is_true(value: str) -> bool:
+    return value.lower() == 'true'
+
+
 class FormatStepError(Exception):
 
     def __init__(self, message):
@@ -28,6 +34,11 @@ class Step:
     def requires_via_extras(self, requirement: str) -> bool:
         return requirement in self.extras
 
+    @property
+    def cache_signature(self) -> str:
+        options = json.dumps(self.options, sort_keys=True, default=str)
+        return f'{type(self).__name__}:{self.NAME}:{options}'
+
     def execute_first(self, context: dict) -> DocumentFile:
         return self.raise_exc('Called execute_follow on Step class')
 
@@ -6,11 +6,7 @@ from ... import consts
 from ...context import Context
 from ...conversions import Pandoc, RdfLibConvert
 from ...documents import DocumentFile, FileFormats
-from .base import Step, register_step
-
-
-def _is_true(value: str) -> bool:
-    return value.lower() == 'true'
+from .base import Step, _is_true, register_step
 
 
 class WeasyPrintStep(Step):
@@ -2,17 +2,20 @@ import base64
 import datetime
 import io
 import json
+import logging
 import pathlib
+import re
 import tempfile
 import typing
 
 import dateutil.parser
 import xlsxwriter
 from xlsxwriter.chart import Chart
+from xlsxwriter.utility import xl_cell_to_rowcol
 from xlsxwriter.worksheet import Worksheet
 
 from ...documents import DocumentFile, FileFormats
-from .base import FormatStepError, Step, register_step
+from .base import FormatStepError, Step, _is_true, register_step
 
 
 if typing.TYPE_CHECKING:
@@ -21,6 +24,9 @@ if typing.TYPE_CHECKING:
 
 _EMPTY_DICT: dict[str, typing.Any] = {}
 _EMPTY_LIST: list[typing.Any] = []
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+LOG = logging.getLogger(__name__)
 
 
 def _b64img2io(b64bytes: str) -> io.BytesIO:
@@ -114,6 +120,74 @@ _CELL_WRITERS = {
 }
 
 
+class _JSONStreamReader:
+    # Reads JSON document incrementally so that only the currently processed
+    # value is materialized, callers must consume value of each yielded key
+    # or item (via read_value, iter_object, or iter_array) before continuing
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def _next_char(self) -> str:
+        match = _JSON_WHITESPACE.match(self.text, self.pos)
+        self.pos = match.end() if match is not None else self.pos
+        if self.pos >= len(self.text):
+            raise ValueError('Unexpected end of JSON document')
+        return self.text[self.pos]
+
+    def _consume(self, char: str):
+        if self._next_char() != char:
+            raise ValueError(f'Expecting "{char}" at position {self.pos} of JSON document')
+        self.pos += 1
+
+    def read_value(self) -> typing.Any:
+        self._next_char()
+        value, self.pos = _JSON_DECODER.raw_decode(self.text, self.pos)
+        return value
+
+    def iter_object(self) -> typing.Iterator[str]:
+        self._consume('{')
+        if self._next_char() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(f'Expecting property name at position {self.pos}')
+            self._consume(':')
+            yield key
+            if self._next_char() == ',':
+                self.pos += 1
+                continue
+            self._consume('}')
+            return
+
+    def iter_array(self) -> typing.Iterator[int]:
+        self._consume('[')
+        if self._next_char() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self._next_char() == ',':
+                self.pos += 1
+                continue
+            self._consume(']')
+            return
+
+    def iter_values(self) -> typing.Iterator[typing.Any]:
+        for _ in self.iter_array():
+            yield self.read_value()
+
+    def finish(self):
+        match = _JSON_WHITESPACE.match(self.text, self.pos)
+        if match is not None and match.end() != len(self.text):
+            raise ValueError(f'Extra data at position {match.end()} of JSON document')
+
+
 class WorkbookBuilder:
 
     def __init__(self, workbook: xlsxwriter.Workbook):
@@ -236,12 +310,16 @@ class WorkbookBuilder:
         self.sheets.append(sheet)
         self._setup_worksheet_common(sheet, data)
 
-    def _add_worksheet(self, data: dict):
+    def _create_worksheet(self, data: dict) -> Worksheet:
         name = data.get('name')
         sheet = self.workbook.add_worksheet(name)
         self.sheets.append(sheet)
         self._setup_worksheet_common(sheet, data)
         self._setup_worksheet_data(sheet, data)
+        return sheet
+
+    def _add_worksheet(self, data: dict):
+        sheet = self._create_worksheet(data)
         self._add_data_to_worksheet(sheet, data)
 
     def _add_object_to_worksheet(self, worksheet: Worksheet, item: dict):
@@ -257,24 +335,27 @@ class WorkbookBuilder:
         elif item_type == 'image':
             self._add_data_image(worksheet, item)
 
+    def _add_data_item(self, worksheet: Worksheet, item: dict):
+        item_type = item.get('type')
+        if item_type is None:
+            return
+
+        if item_type == 'cell':
+            self._add_data_cell(worksheet, item)
+        elif item_type == 'row':
+            self._add_data_row(worksheet, item)
+        elif item_type == 'column':
+            self._add_data_column(worksheet, item)
+        elif item_type == 'grid':
+            self._add_data_grid(worksheet, item)
+        elif item_type == 'array_formula':
+            self._add_data_array_formula(worksheet, item)
+        else:
+            self._add_object_to_worksheet(worksheet, item)
+
     def _add_data_to_worksheet(self, worksheet: Worksheet, data: dict):
         for item in data.get('data', _EMPTY_LIST):
-            item_type = item.get('type')
-            if item_type is None:
-                continue
-
-            if item_type == 'cell':
-                self._add_data_cell(worksheet, item)
-            elif item_type == 'row':
-                self._add_data_row(worksheet, item)
-            elif item_type == 'column':
-                self._add_data_column(worksheet, item)
-            elif item_type == 'grid':
-                self._add_data_grid(worksheet, item)
-            elif item_type == 'array_formula':
-                self._add_data_array_formula(worksheet, item)
-            else:
-                self._add_object_to_worksheet(worksheet, item)
+            self._add_data_item(worksheet, item)
 
     def _add_data_cell(self, worksheet: Worksheet, item: dict):
         subtype = item.get('subtype', '')
@@ -337,16 +418,18 @@ class WorkbookBuilder:
             )
 
     def _add_data_grid(self, worksheet: Worksheet, item: dict):
+        self._write_grid_rows(worksheet, item, item.get('data', []))
+
+    def _write_grid_rows(self, worksheet: Worksheet, item: dict,
+                         rows: typing.Iterable[list]):
         cell_format = self.formats.get(item.get('format', ''))
-        grid = item.get('data', [])
-        rows = len(grid)
         start_row = item.get('row', 0)
         start_col = item.get('col', 0)
-        for row_index in range(rows):
+        for row_index, row_data in enumerate(rows):
             worksheet.write_row(
                 row=start_row + row_index,
                 col=start_col,
-                data=grid[row_index],
+                data=row_data,
                 cell_format=cell_format,
             )
 
@@ -854,9 +937,8 @@ class WorkbookBuilder:
                     if isinstance(item, dict):
                         self._replace_nested_formats(item, keys)
 
-    def build(self, data: dict):
+    def _build_header(self, data: dict):
         self._add_workbook_properties(data)
-        self._add_workbook_options(data)
         self._add_workbook_definitions(data)
 
         for vba_project in data.get('vba_projects', _EMPTY_LIST):
@@ -871,11 +953,15 @@ class WorkbookBuilder:
         for chart_data in data.get('charts', _EMPTY_LIST):
             self._add_chart(chart_data)
 
+    def build(self, data: dict):
+        self._build_header(data)
         for sheet_data in data.get('sheets', _EMPTY_LIST):
             if sheet_data.get('type', '') == 'chart':
                 self._add_chartsheet(sheet_data)
             else:
                 self._add_worksheet(sheet_data)
+        # options refer to sheets (e.g. active sheet)
+        self._add_workbook_options(data)
 
     def cleanup(self):
         for stream in self.byte_streams:
@@ -899,18 +985,186 @@ class WorkbookBuilder:
         return len(input_data.get('vba_projects', _EMPTY_LIST)) > 0
 
 
+class StreamingNotSupportedError(Exception):
+    # instructions cannot be written in constant memory mode
+
+    def __init__(self, message: str):
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+class StreamingWorkbookBuilder(WorkbookBuilder):
+    # Builds workbook while reading JSON instructions incrementally, the
+    # workbook uses constant memory mode (rows are flushed to disk as soon
+    # as next row is started), so "sheets" must be the last key of the
+    # instructions and "data" the last key of each sheet and grid; writes
+    # to already flushed rows would be silently dropped by xlsxwriter so
+    # they are rejected (StreamingNotSupportedError) instead
+
+    # sheet options writing cells (or unsupported in constant memory mode)
+    UNSUPPORTED_SHEET_OPTIONS = frozenset(['merge_ranges', 'tables'])
+
+    def __init__(self, workbook: xlsxwriter.Workbook):
+        super().__init__(workbook)
+        self.last_rows: dict[int, int] = {}
+
+    def _reserve_rows(self, worksheet: Worksheet, first_row: int, last_row: int):
+        last_written = self.last_rows.get(id(worksheet), 0)
+        if first_row < last_written:
+            raise StreamingNotSupportedError(
+                f'Row {first_row} written after row {last_written} '
+                f'in sheet "{worksheet.name}"',
+            )
+        self.last_rows[id(worksheet)] = max(last_written, last_row)
+
+    @staticmethod
+    def _item_rows(item: dict) -> tuple[int, int] | None:
+        item_type = item.get('type')
+        if item_type in ('cell', 'row', 'column'):
+            row = xl_cell_to_rowcol(item['cell'])[0] if 'cell' in item else item.get('row', 0)
+            if item_type == 'column':
+                return row, row + max(len(item.get('data', _EMPTY_LIST)) - 1, 0)
+            return row, row
+        if item_type == 'array_formula':
+            if 'range' in item:
+                row = xl_cell_to_rowcol(item['range'].split(':')[0])[0]
+            else:
+                row = item.get('first_row', 0)
+            return row, row
+        return None
+
+    def _add_data_item(self, worksheet: Worksheet, item: dict):
+        rows = self._item_rows(item)
+        if rows is not None:
+            self._reserve_rows(worksheet, *rows)
+        super()._add_data_item(worksheet, item)
+
+    def _write_grid_rows(self, worksheet: Worksheet, item: dict,
+                         rows: typing.Iterable[list]):
+        start_row = item.get('row', 0)
+
+        def reserved_rows() -> typing.Iterator[list]:
+            for row_index, row_data in enumerate(rows):
+                self._reserve_rows(worksheet, start_row + row_index, start_row + row_index)
+                yield row_data
+
+        self._reserve_rows(worksheet, start_row, start_row)
+        super()._write_grid_rows(worksheet, item, reserved_rows())
+
+    def _setup_worksheet_data(self, worksheet: Worksheet, container: dict):
+        options = container.get('options') or _EMPTY_DICT
+        unsupported = sorted(self.UNSUPPORTED_SHEET_OPTIONS.intersection(options))
+        if len(unsupported) > 0:
+            raise StreamingNotSupportedError(
+                f'Sheet option(s) {", ".join(unsupported)} used '
+                f'in sheet "{worksheet.name}"',
+            )
+        super()._setup_worksheet_data(worksheet, container)
+
+    def _stream_data_item(self, worksheet: Worksheet, reader: _JSONStreamReader):
+        item: dict[str, typing.Any] = {}
+        streamed = False
+        for key in reader.iter_object():
+            if streamed:
+                raise ValueError(f'Key "{key}" must precede "data" of grid in streaming mode')
+            if key == 'data' and item.get('type') == 'grid':
+                self._write_grid_rows(worksheet, item, reader.iter_values())
+                streamed = True
+            else:
+                item[key] = reader.read_value()
+        if not streamed:
+            self._add_data_item(worksheet, item)
+
+    def _stream_sheet(self, reader: _JSONStreamReader):
+        sheet_data: dict[str, typing.Any] = {}
+        sheet = None
+        for key in reader.iter_object():
+            if sheet is not None:
+                raise ValueError(f'Key "{key}" must precede "data" of sheet in streaming mode')
+            if key == 'data' and sheet_data.get('type', '') != 'chart':
+                sheet = self._create_worksheet(sheet_data)
+                for _ in reader.iter_array():
+                    self._stream_data_item(sheet, reader)
+            else:
+                sheet_data[key] = reader.read_value()
+        if sheet is not None:
+            return
+        if sheet_data.get('type', '') == 'chart':
+            self._add_chartsheet(sheet_data)
+        else:
+            self._add_worksheet(sheet_data)
+
+    def stream(self, header: dict, reader: _JSONStreamReader | None):
+        self._build_header(header)
+        if reader is not None:
+            for _ in reader.iter_array():
+                self._stream_sheet(reader)
+        self._add_workbook_options(header)
+
+    @staticmethod
+    def _open_workbook(output: io.BytesIO, header: dict,
+                       tmp_dir: str) -> xlsxwriter.Workbook:
+        options = dict(header.get('options', _EMPTY_DICT))
+        options['constant_memory'] = True
+        options['in_memory'] = False
+        options['tmpdir'] = tmp_dir
+        return xlsxwriter.Workbook(output, options)
+
+    @classmethod
+    def _stream_workbook(cls, output: io.BytesIO, header: dict,
+                         reader: _JSONStreamReader | None):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            builder = cls(workbook=cls._open_workbook(output, header, tmp_dir))
+            try:
+                builder.stream(header, reader)
+            except BaseException:
+                # release row data files of worksheets, result is discarded
+                try:
+                    builder.workbook.close()
+                except Exception as e:
+                    LOG.debug('Failed to close discarded workbook: %s', str(e))
+                raise
+            else:
+                builder.workbook.close()
+            finally:
+                builder.cleanup()
+
+    @classmethod
+    def stream_to_bytes(cls, reader: _JSONStreamReader) -> tuple[bytes, bool]:
+        output = io.BytesIO()
+        header: dict[str, typing.Any] = {}
+        streamed = False
+        for key in reader.iter_object():
+            if streamed:
+                raise ValueError(f'Key "{key}" must precede "sheets" in streaming mode')
+            if key == 'sheets':
+                cls._stream_workbook(output, header, reader)
+                streamed = True
+            else:
+                header[key] = reader.read_value()
+        reader.finish()
+        if not streamed:
+            cls._stream_workbook(output, header, None)
+        return output.getvalue(), cls.is_xlsm(header)
+
+
 class ExcelStep(Step):
     NAME = 'excel'
 
+    OPTION_STREAMING = 'streaming'
+
     def __init__(self, template, options: dict):
         super().__init__(template, options)
+        self.streaming = _is_true(options.get(self.OPTION_STREAMING, 'false'))
 
     def execute_first(self, context: dict) -> DocumentFile:
         return self.raise_exc(f'Step "{self.NAME}" cannot be first')
 
     def _get_data(self, document: DocumentFile) -> dict:
         if document.file_format != FileFormats.JSON:
-            self.raise_exc(f'Step "{self.NAME}" requires JSON input'
+            self.raise_exc(f'Step "{self.NAME}" requires JSON input '
                            f'with instructions from the previous step')
         data = _EMPTY_DICT
         try:
@@ -923,7 +1177,28 @@ class ExcelStep(Step):
             self.raise_exc(f'Failed to parse JSON for Excel: {str(e)}')
         return data
 
-    def execute_follow(self, document: DocumentFile, context: dict) -> DocumentFile:
+    def _execute_streaming(self, document: DocumentFile) -> DocumentFile:
+        if document.file_format != FileFormats.JSON:
+            self.raise_exc(f'Step "{self.NAME}" requires JSON input '
+                           f'with instructions from the previous step')
+        try:
+            reader = _JSONStreamReader(
+                text=document.content.decode(encoding=document.safe_encoding),
+            )
+            data, is_xlsm = StreamingWorkbookBuilder.stream_to_bytes(reader)
+        except StreamingNotSupportedError as e:
+            LOG.info('Instructions cannot be streamed (%s), building Excel '
+                     'document in memory', str(e))
+            return self._execute_regular(document)
+        except Exception as e:
+            raise FormatStepError(f'Failed to construct Excel document '
+                                  f'due to: {str(e)}') from e
+        return DocumentFile(
+            file_format=FileFormats.XLSM if is_xlsm else FileFormats.XLSX,
+            content=data,
+        )
+
+    def _execute_regular(self, document: DocumentFile) -> DocumentFile:
         input_data = self._get_data(document)
         is_xlsm = WorkbookBuilder.is_xlsm(input_data)
         file_format = FileFormats.XLSX
@@ -944,5 +1219,10 @@ class ExcelStep(Step):
             raise FormatStepError(f'Failed to construct Excel document '
                                   f'due to: {str(e)}') from e
 
+    def execute_follow(self, document: DocumentFile, context: dict) -> DocumentFile:
+        if self.streaming:
+            return self._execute_streaming(document)
+        return self._execute_regular(document)
+
 
 register_step(ExcelStep.NAME, ExcelStep)
@@ -1,6 +1,7 @@
-import pathlib
-import shutil
-import tempfile
+import copy
+import io
+import struct
+import typing
 import zipfile
 
 import jinja2
@@ -11,6 +12,57 @@ from .base import register_step
 from .template import JinjaPoweredStep
 
 
+RewriteFn = typing.Callable[[dict, str | None], str]
+
+_LOCAL_HEADER_STRUCT = struct.Struct('<4s2B4HL2L2H')
+_LOCAL_HEADER_NAME_LENGTH = 10
+_LOCAL_HEADER_EXTRA_LENGTH = 11
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+
+
+def _can_copy_raw(info: zipfile.ZipInfo) -> bool:
+    return (
+        not info.flag_bits & _FLAG_ENCRYPTED and
+        info.file_size < zipfile.ZIP64_LIMIT and
+        info.compress_size < zipfile.ZIP64_LIMIT and
+        info.header_offset < zipfile.ZIP64_LIMIT
+    )
+
+
+def _copy_raw_entry(source: zipfile.ZipFile, source_data: memoryview,
+                    target: zipfile.ZipFile, info: zipfile.ZipInfo):
+    # Copies already compressed entry data without decompressing and
+    # compressing it again, only the local header is re-created (relies
+    # on zipfile internals, covered by tests for supported Python versions)
+    header = _LOCAL_HEADER_STRUCT.unpack_from(source_data, info.header_offset)
+    data_start = (info.header_offset + _LOCAL_HEADER_STRUCT.size +
+                  header[_LOCAL_HEADER_NAME_LENGTH] + header[_LOCAL_HEADER_EXTRA_LENGTH])
+    data_end = data_start + info.compress_size
+    if data_end > len(source_data):
+        raise zipfile.BadZipFile(f'Truncated entry "{info.filename}" in {source.filename}')
+
+    target_fp = target.fp
+    if target_fp is None:
+        raise ValueError('Attempt to write to ZIP archive that was already closed')
+    new_info = copy.copy(info)
+    new_info.flag_bits &= ~_FLAG_DATA_DESCRIPTOR
+    new_info.header_offset = target_fp.tell()
+    target_fp.write(new_info.FileHeader(zip64=False))
+    target_fp.write(source_data[data_start:data_end])
+    target.filelist.append(new_info)
+    target.NameToInfo[new_info.filename] = new_info
+    target.start_dir = target_fp.tell()
+
+
+def _copy_entry(source: zipfile.ZipFile, source_data: memoryview,
+                target: zipfile.ZipFile, info: zipfile.ZipInfo):
+    if _can_copy_raw(info):
+        _copy_raw_entry(source, source_data, target, info)
+    else:
+        target.writestr(copy.copy(info), source.read(info))
+
+
 class EnrichDocxStep(JinjaPoweredStep):
     NAME = 'enrich-docx'
     INPUT_FORMAT = FileFormats.DOCX
@@ -21,81 +73,95 @@ class EnrichDocxStep(JinjaPoweredStep):
         self.rewrites = {k[8:]: v
                          for k, v in options.items()
                          if k.startswith('rewrite:')}
+        self._rewrite_fns: dict[str, RewriteFn] = {
+            target_file: self._prepare_rewrite(rewrite)
+            for target_file, rewrite in self.rewrites.items()
+        }
 
-    def _render_rewrite(self, rewrite_template: str, context: dict,
-                        existing_content: str | None) -> str:
+    def _prepare_render_rewrite(self, rewrite_template: str) -> RewriteFn:
         try:
             j2_template = self.j2_env.get_template(rewrite_template)
-            return j2_template.render(
-                ctx=context,
-                content=existing_content,
-            )
         except jinja2.exceptions.TemplateSyntaxError as e:
             self.raise_exc(self._jinja_exception_msg(e))
         except Exception as e:
             self.raise_exc(f'Failed loading Jinja2 template: {e}')
-        return ''
 
-    def _static_rewrite(self, rewrite_file: str) -> str:
+        def render(context: dict, existing_content: str | None) -> str:
+            try:
+                return j2_template.render(
+                    ctx=context,
+                    content=existing_content,
+                )
+            except Exception as e:
+                self.raise_exc(f'Failed rendering Jinja2 template: {e}')
+            return ''
+
+        return render
+
+    def _prepare_static_rewrite(self, rewrite_file: str) -> RewriteFn:
+        content = ''
         try:
             path = self.template.template_dir / rewrite_file
-            return path.read_text(encoding=DEFAULT_ENCODING)
+            content = path.read_text(encoding=DEFAULT_ENCODING)
         except Exception as e:
             self.raise_exc(f'Failed loading Jinja2 template: {e}')
-        return ''
+        return lambda context, existing_content: content
 
-    def _get_rewrite(self, rewrite: str, context: dict,
-                     existing_content: str | None) -> str:
+    def _prepare_rewrite(self, rewrite: str) -> RewriteFn:
         if rewrite.startswith('static:'):
-            return self._static_rewrite(rewrite[7:])
+            return self._prepare_static_rewrite(rewrite[7:])
         if rewrite.startswith('render:'):
-            return self._render_rewrite(rewrite[7:], context, existing_content)
-        return ''
+            return self._prepare_render_rewrite(rewrite[7:])
+        return lambda context, existing_content: ''
 
     def execute_first(self, context: dict) -> DocumentFile:
         return self.raise_exc(f'Step "{self.NAME}" cannot be first')
 
-    def _rewrite(self, docx_dir: pathlib.Path, context: dict):
-        for target_file, rewrite in self.rewrites.items():
-            target = docx_dir / target_file
-            existing_content = None
-            if target.is_file() and target.exists():
-                existing_content = target.read_text(encoding=DEFAULT_ENCODING)
-            content = self._get_rewrite(rewrite, context, existing_content)
-            target.write_text(content, encoding=DEFAULT_ENCODING)
+    def _write_rewrite(self, target: zipfile.ZipFile, info: zipfile.ZipInfo,
+                       context: dict, existing_content: str | None):
+        content = self._rewrite_fns[info.filename](context, existing_content)
+        target.writestr(
+            zinfo_or_arcname=info,
+            data=content.encode(DEFAULT_ENCODING),
+            compress_type=zipfile.ZIP_DEFLATED,
+            compresslevel=9,
+        )
+
+    def _rewrite(self, source: zipfile.ZipFile, source_data: memoryview,
+                 target: zipfile.ZipFile, context: dict):
+        pending = set(self._rewrite_fns.keys())
+        for info in source.infolist():
+            if info.filename in pending:
+                pending.discard(info.filename)
+                existing_content = None
+                if not info.is_dir():
+                    existing_content = source.read(info).decode(DEFAULT_ENCODING)
+                self._write_rewrite(target, copy.copy(info), context, existing_content)
+            else:
+                _copy_entry(source, source_data, target, info)
+        for target_file in self.rewrites:
+            if target_file in pending:
+                info = zipfile.ZipInfo(filename=target_file)
+                self._write_rewrite(target, info, context, None)
 
     def execute_follow(self, document: DocumentFile, context: dict) -> DocumentFile:
         if document.file_format != self.INPUT_FORMAT:
             self.raise_exc(f'Step "{self.NAME}" requires DOCX input')
 
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_dir = pathlib.Path(tmp_dir)
-            docx_file = tmp_dir / 'original_file.docx'
-            docx_file.write_bytes(document.content)
-            new_docx_file = tmp_dir / 'enriched_file.docx'
-            docx_dir = tmp_dir / 'enriched_file_docx'
-
-            with zipfile.ZipFile(docx_file, mode='r') as source_docx:
-                source_docx.extractall(docx_dir)
-
-            self._rewrite(docx_dir, context)
-
-            with zipfile.ZipFile(new_docx_file, mode='w',
-                                 compression=zipfile.ZIP_DEFLATED,
-                                 compresslevel=9) as target_docx:
-                for path in docx_dir.rglob('*'):
-                    if path.is_file():
-                        target_docx.write(path, path.relative_to(docx_dir))
-
-            new_content = new_docx_file.read_bytes()
-
-            docx_file.unlink(missing_ok=True)
-            new_docx_file.unlink(missing_ok=True)
-            shutil.rmtree(docx_dir, ignore_errors=True)
+        source_data = memoryview(document.content)
+        result = io.BytesIO()
+        try:
+            with (
+                zipfile.ZipFile(io.BytesIO(document.content), mode='r') as source_docx,
+                zipfile.ZipFile(result, mode='w') as target_docx,
+            ):
+                self._rewrite(source_docx, source_data, target_docx, context)
+        except zipfile.BadZipFile as e:
+            self.raise_exc(f'Failed to process DOCX file: {e}')
 
         return DocumentFile(
             file_format=self.OUTPUT_FORMAT,
-            content=new_content,
+            content=result.getvalue(),
         )
 
 
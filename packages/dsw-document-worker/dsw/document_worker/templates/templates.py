@@ -1,6 +1,7 @@
 import base64
 import dataclasses
 import datetime
+import hashlib
 import logging
 import pathlib
 import shutil
@@ -84,6 +85,16 @@ class Template:
     def raise_exc(self, message: str):
         raise TemplateError(self.template_uuid, message)
 
+    @property
+    def content_hash(self) -> str:
+        h = hashlib.sha256()
+        h.update(self.db_template.template.updated_at.isoformat().encode(consts.DEFAULT_ENCODING))
+        for file in sorted(self.db_template.files.values(), key=lambda f: f.uuid):
+            h.update(f'|f:{file.uuid}:{file.updated_at.isoformat()}'.encode(consts.DEFAULT_ENCODING))
+        for asset in sorted(self.db_template.assets.values(), key=lambda a: a.uuid):
+            h.update(f'|a:{asset.uuid}:{asset.updated_at.isoformat()}'.encode(consts.DEFAULT_ENCODING))
+        return h.hexdigest()
+
     def fetch_asset(self, file_name: str) -> Asset | None:
         LOG.info('Fetching asset "%s"', file_name)
         file_path = self.template_dir / file_name
@@ -15,11 +15,13 @@ from dsw.storage import S3Storage
 
 from . import consts
 from .build_info import BUILD_INFO
+from .cache import RenderCache
 from .config import DocumentWorkerConfig, TemplateConfig
 from .context import Context
-from .documents import DocumentFile, DocumentNameGiver
+from .documents import DocumentFile, DocumentNameGiver, StoredDocumentFile
 from .exceptions import DocumentNotFoundError, JobError, create_job_error
 from .limits import LimitsEnforcer
+from .metrics import JobMetrics, MetricsReporter
 from .templates import Format, Template, TemplateRegistry
 from .utils import byte_size_format, check_metamodel_version
 
@@ -57,6 +59,8 @@ class Job:
         self.doc: DBDocument | None = None
         self.final_file: DocumentFile | None = None
         self.template_config: TemplateConfig | None = None
+        self.render_cache_key: str | None = None
+        self.metrics = self.ctx.job.metrics = JobMetrics(job_id=document_uuid)
         self.tenant_limits = self.ctx.app.db.fetch_tenant_limits(self.tenant_uuid)
 
     @property
@@ -154,6 +158,10 @@ class Job:
         SentryReporter.set_tags(
             template=template.coordinates,
         )
+        self.metrics.tags.update({
+            'template': template.coordinates,
+            'format': format_uuid,
+        })
         # prepare format
         if not template.prepare_format(format_uuid):
             raise create_job_error(
@@ -235,6 +243,61 @@ class Job:
             metamodel_version=str(self.doc_context.get('metamodelVersion', '0')),
         )
 
+    def _get_render_cache_key(self) -> str | None:
+        if not RenderCache.get().enabled:
+            return None
+        if self.template_config is None or not self.template_config.cacheable:
+            return None
+        return RenderCache.make_key(
+            tenant_uuid=self.tenant_uuid,
+            template=self.safe_template.coordinates,
+            template_hash=self.safe_template.content_hash,
+            format_uuid=self.safe_doc.format_uuid,
+            context_hash=RenderCache.context_hash(self.doc_context),
+        )
+
+    def _check_limits(self, doc_size: int):
+        SentryReporter.set_tags(phase='limit')
+        LimitsEnforcer.check_doc_size(
+            job_id=self.doc_uuid,
+            doc_size=doc_size,
+        )
+        limit_size = None if self.tenant_limits is None else self.tenant_limits.storage
+        used_size = self.ctx.app.db.get_currently_used_size(tenant_uuid=self.tenant_uuid)
+        LimitsEnforcer.check_size_usage(
+            job_id=self.doc_uuid,
+            doc_size=doc_size,
+            used_size=used_size,
+            limit_size=limit_size,
+        )
+
+    def _reuse_cached_document(self) -> bool:
+        if self.render_cache_key is None:
+            return False
+        entry = RenderCache.get().lookup(self.render_cache_key)
+        if entry is None:
+            return False
+        LOG.info('Document with the same content was already rendered (%s)',
+                 entry.document_uuid)
+        self._check_limits(entry.byte_size)
+        SentryReporter.set_tags(phase='store')
+        copied = self.ctx.app.s3.copy_document(
+            tenant_uuid=self.tenant_uuid,
+            source_file_name=entry.document_uuid,
+            target_file_name=self.doc_uuid,
+        )
+        if not copied:
+            LOG.info('Cached document %s no longer exists, rendering',
+                     entry.document_uuid)
+            RenderCache.get().invalidate(self.render_cache_key)
+            return False
+        self.final_file = StoredDocumentFile(
+            file_format=entry.file_format,
+            byte_size=entry.byte_size,
+            encoding=entry.encoding,
+        )
+        return True
+
     @handle_job_step('Failed to build final document')
     def build_document(self):
         LOG.info('Building document by rendering template with context')
@@ -242,6 +305,13 @@ class Job:
         # enrich context
         SentryReporter.set_tags(phase='enrich')
         self._enrich_context()
+        # reuse previously rendered document
+        self.render_cache_key = self._get_render_cache_key()
+        if self._reuse_cached_document():
+            self.metrics.tags['renderCache'] = JobMetrics.CACHE_HIT
+            return
+        if self.render_cache_key is not None:
+            self.metrics.tags['renderCache'] = JobMetrics.CACHE_MISS
         # render document
         SentryReporter.set_tags(phase='render')
         final_file = self.safe_template.render(
@@ -250,19 +320,7 @@ class Job:
             context=self.doc_context,
         )
         # check limits
-        SentryReporter.set_tags(phase='limit')
-        LimitsEnforcer.check_doc_size(
-            job_id=self.doc_uuid,
-            doc_size=final_file.byte_size,
-        )
-        limit_size = None if self.tenant_limits is None else self.tenant_limits.storage
-        used_size = self.ctx.app.db.get_currently_used_size(tenant_uuid=self.tenant_uuid)
-        LimitsEnforcer.check_size_usage(
-            job_id=self.doc_uuid,
-            doc_size=final_file.byte_size,
-            used_size=used_size,
-            limit_size=limit_size,
-        )
+        self._check_limits(final_file.byte_size)
         # finalize
         self.final_file = final_file
 
@@ -271,6 +329,10 @@ class Job:
         SentryReporter.set_tags(phase='store')
         s3_id = self.ctx.app.s3.identification
         final_file = self.safe_final_file
+        if isinstance(final_file, StoredDocumentFile):
+            LOG.info('Document %s already stored in S3 bucket %s',
+                     self.doc_uuid, s3_id)
+            return
         LOG.info('Preparing S3 bucket %s', s3_id)
         self.ctx.app.s3.ensure_bucket()
         LOG.info('Storing document to S3 bucket %s', s3_id)
@@ -305,6 +367,13 @@ class Job:
             document_uuid=self.doc_uuid,
         )
         LOG.info('Document %s record finalized', self.doc_uuid)
+        if self.render_cache_key is not None:
+            RenderCache.get().store(
+                key=self.render_cache_key,
+                tenant_uuid=self.tenant_uuid,
+                document_uuid=self.doc_uuid,
+                document_file=final_file,
+            )
 
     def set_job_state(self, state: str, message: str) -> bool:
         return self.ctx.app.db.update_document_state(
@@ -324,13 +393,20 @@ class Job:
 
     def _run(self):
         self.check_compliance()
-        self.get_document()
+        with self.metrics.phase('fetch'):
+            self.get_document()
 
-        self.prepare_template()
-        self.build_document()
-        self.store_document()
+        with self.metrics.phase('prepare'):
+            self.prepare_template()
+        with self.metrics.phase('render') as measurement:
+            self.build_document()
+            measurement.output_size = self.safe_final_file.byte_size
+        with self.metrics.phase('store') as measurement:
+            self.store_document()
+            measurement.input_size = self.safe_final_file.byte_size
 
-        self.finalize()
+        with self.metrics.phase('finalize'):
+            self.finalize()
 
     def _set_failed(self, message: str):
         document_exists = self.check_document_exists()
@@ -346,6 +422,13 @@ class Job:
             LOG.error(msg)
             raise RuntimeError(msg)
 
+    def _report_metrics(self):
+        self.ctx.job.metrics = None
+        try:
+            MetricsReporter.get().report(self.metrics)
+        except Exception as e:
+            LOG.warning('Failed to report job metrics: %s', str(e))
+
     def run(self):
         try:
             self._run()
@@ -365,6 +448,8 @@ class Job:
             LOG.error(job_exc.log_message())
             LOG.info('Failed with unexpected error', exc_info=e)
             self._set_failed(job_exc.db_message())
+        finally:
+            self._report_metrics()
 
 
 class DocumentWorker(CommandWorker):
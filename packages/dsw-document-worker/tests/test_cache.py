@@ -0,0 +1,104 @@
+import copy
+import datetime
+import pathlib
+import types
+
+import pytest
+
+from dsw.document_worker.cache import RenderCache
+from dsw.document_worker.config import CacheConfig
+from dsw.document_worker.templates.templates import Template
+from dsw.document_worker.worker import Job
+
+
+UPDATED_AT = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+CONTEXT = {
+    'document': {
+        'uuid': '11111111-1111-1111-1111-111111111111',
+        'name': 'Report',
+        'createdAt': '2025-01-01T10:00:00Z',
+        'createdBy': {'uuid': '22222222-2222-2222-2222-222222222222'},
+        'formatUuid': 'f0000000-0000-0000-0000-000000000001',
+    },
+    'questionnaire': {'replies': {'q1': 'yes'}},
+}
+
+
+def _template(files_updated_at: datetime.datetime = UPDATED_AT) -> Template:
+    db_template = types.SimpleNamespace(
+        template=types.SimpleNamespace(
+            uuid='t0000000-0000-0000-0000-000000000001',
+            coordinates='dsw:report:1.0.0',
+            updated_at=UPDATED_AT,
+        ),
+        files={
+            'file-1': types.SimpleNamespace(uuid='file-1', updated_at=files_updated_at),
+            'file-2': types.SimpleNamespace(uuid='file-2', updated_at=UPDATED_AT),
+        },
+        assets={
+            'asset-1': types.SimpleNamespace(uuid='asset-1', updated_at=UPDATED_AT),
+        },
+    )
+    return Template(
+        tenant_uuid='00000000-0000-0000-0000-000000000000',
+        template_dir=pathlib.Path('/nonexistent'),
+        db_template=db_template,  # type: ignore
+    )
+
+
+def _key(context: dict | None = None, format_uuid: str = CONTEXT['document']['formatUuid'],
+         template: Template | None = None) -> str | None:
+    job = Job.__new__(Job)
+    job.tenant_uuid = '00000000-0000-0000-0000-000000000000'
+    job.template = template or _template()
+    job.template_config = types.SimpleNamespace(cacheable=True)  # type: ignore
+    job.doc = types.SimpleNamespace(format_uuid=format_uuid)  # type: ignore
+    job.doc_context = CONTEXT if context is None else context
+    return job._get_render_cache_key()
+
+
+def _changed(path: list[str], value) -> dict:
+    context = copy.deepcopy(CONTEXT)
+    target = context
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+    return context
+
+
+@pytest.fixture(autouse=True)
+def render_cache(monkeypatch: pytest.MonkeyPatch):
+    cache = RenderCache(CacheConfig(enabled=True, ttl=60, max_entries=10))
+    monkeypatch.setattr(RenderCache, '_instance', cache)
+    return cache
+
+
+def test_key_ignores_document_record_fields():
+    key = _key()
+    assert key is not None
+    assert _key(_changed(['document', 'uuid'], '33333333-3333-3333-3333-333333333333')) == key
+    assert _key(_changed(['document', 'createdAt'], '2025-02-02T10:00:00Z')) == key
+
+
+@pytest.mark.parametrize('path, value', [
+    (['document', 'name'], 'Other report'),
+    (['document', 'createdBy', 'uuid'], '44444444-4444-4444-4444-444444444444'),
+    (['questionnaire', 'replies', 'q1'], 'no'),
+])
+def test_key_changes_with_context(path: list[str], value: str):
+    assert _key(_changed(path, value)) != _key()
+
+
+def test_key_changes_with_format():
+    assert _key(format_uuid='f0000000-0000-0000-0000-000000000002') != _key()
+
+
+def test_key_changes_with_template_files():
+    changed = _template(files_updated_at=UPDATED_AT + datetime.timedelta(seconds=1))
+    assert changed.content_hash != _template().content_hash
+    assert _key(template=changed) != _key()
+
+
+def test_key_not_used_if_disabled(render_cache: RenderCache):
+    render_cache.cfg.enabled = False
+    assert _key() is None
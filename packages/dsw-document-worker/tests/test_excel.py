@@ -0,0 +1,64 @@
+import io
+import json
+import zipfile
+
+from dsw.document_worker.documents import DocumentFile, FileFormats
+from dsw.document_worker.templates.steps.excel import ExcelStep
+
+
+def _build(instructions: dict) -> zipfile.ZipFile:
+    step = ExcelStep(template=None, options={'streaming': 'True'})
+    document = DocumentFile(
+        file_format=FileFormats.JSON,
+        content=json.dumps(instructions).encode('utf-8'),
+    )
+    result = step.execute_follow(document, context={})
+    return zipfile.ZipFile(io.BytesIO(result.content))
+
+
+def _contents(xlsx: zipfile.ZipFile) -> str:
+    return ''.join(xlsx.read(name).decode('utf-8')
+                   for name in xlsx.namelist() if name.endswith('.xml'))
+
+
+def _cell(row: int, value: str) -> dict:
+    return {'type': 'cell', 'subtype': 'string', 'row': row, 'col': 2, 'value': value}
+
+
+def test_streaming_rows_in_order():
+    xlsx = _build({
+        'options': {'active_sheet': 1},
+        'sheets': [
+            {'name': 'First', 'data': [
+                {'type': 'grid', 'row': 0, 'data': [['g1', 'g2'], ['g3', 'g4']]},
+                _cell(1, 'same-row'),
+                _cell(5, 'later-row'),
+            ]},
+            {'name': 'Second', 'data': [_cell(0, 'second')]},
+        ],
+    })
+    contents = _contents(xlsx)
+    for value in ('g1', 'g4', 'same-row', 'later-row', 'second'):
+        assert value in contents
+    assert 'activeTab="1"' in xlsx.read('xl/workbook.xml').decode('utf-8')
+
+
+def test_streaming_previous_row_fallback():
+    xlsx = _build({'sheets': [{'name': 'Data', 'data': [
+        {'type': 'column', 'row': 0, 'col': 0, 'data': ['c1', 'c2', 'c3']},
+        _cell(1, 'previous-row'),
+    ]}]})
+    contents = _contents(xlsx)
+    assert 'c3' in contents
+    assert 'previous-row' in contents
+
+
+def test_streaming_merge_ranges_fallback():
+    xlsx = _build({'sheets': [{
+        'name': 'Data',
+        'options': {'merge_ranges': [{'range': 'A4:C4', 'data': 'merged'}]},
+        'data': [_cell(0, 'first-row')],
+    }]})
+    contents = _contents(xlsx)
+    assert 'merged' in contents
+    assert 'first-row' in contents
@@ -0,0 +1,127 @@
+import datetime
+import types
+
+import pytest
+
+from dsw.document_worker.cache import StepCache
+from dsw.document_worker.config import CacheConfig
+from dsw.document_worker.context import Context, JobContext
+from dsw.document_worker.documents import DocumentFile, FileFormats
+from dsw.document_worker.templates.formats import Format
+from dsw.document_worker.templates.steps import base
+
+
+EXECUTED: list[str] = []
+
+
+class _RenderStep(base.Step):
+    NAME = 'test-render'
+
+    def execute_first(self, context: dict) -> DocumentFile:
+        EXECUTED.append(f'{self.NAME}:{self.options["template"]}')
+        content = f'{self.options["template"]}({context["questionnaire"]})'
+        return DocumentFile(FileFormats.HTML, content.encode())
+
+
+class _ConvertStep(base.Step):
+    NAME = 'test-convert'
+
+    def execute_follow(self, document: DocumentFile, context: dict) -> DocumentFile:
+        EXECUTED.append(f'{self.NAME}:{self.options["to"]}')
+        content = f'{self.options["to"]}({document.content.decode()})'
+        return DocumentFile(FileFormats.HTML, content.encode())
+
+
+def _context(format_uuid: str, questionnaire: str = 'q1') -> dict:
+    # sibling formats of the same document differ in document record fields
+    return {
+        'document': {
+            'uuid': f'document-{format_uuid}',
+            'formatUuid': format_uuid,
+            'createdAt': datetime.datetime.now(tz=datetime.UTC).isoformat(),
+            'name': 'Report',
+        },
+        'questionnaire': questionnaire,
+    }
+
+
+def _format(uuid: str, *steps: tuple[str, dict]) -> Format:
+    template = types.SimpleNamespace(
+        template_uuid='t0000000-0000-0000-0000-000000000001',
+        coordinates='dsw:report:1.0.0',
+        content_hash='hash',
+    )
+    return Format(template, {
+        'uuid': uuid,
+        'name': uuid,
+        'steps': [{'name': name, 'options': options} for name, options in steps],
+    })
+
+
+@pytest.fixture(autouse=True)
+def step_cache(monkeypatch: pytest.MonkeyPatch):
+    EXECUTED.clear()
+    monkeypatch.setitem(base.STEPS, _RenderStep.NAME, _RenderStep)
+    monkeypatch.setitem(base.STEPS, _ConvertStep.NAME, _ConvertStep)
+    templates = types.SimpleNamespace(
+        get_config=lambda coordinates: types.SimpleNamespace(step_cacheable=True),
+    )
+    monkeypatch.setattr(Context, '_instance', types.SimpleNamespace(
+        app=types.SimpleNamespace(cfg=types.SimpleNamespace(templates=templates)),
+        job=JobContext(trace_id='-'),
+    ))
+    cache = StepCache(CacheConfig(enabled=True, ttl=60, max_entries=10))
+    monkeypatch.setattr(StepCache, '_instance', cache)
+    return cache
+
+
+def test_sibling_formats_share_prefix():
+    docx = _format('docx', ('test-render', {'template': 'a'}), ('test-convert', {'to': 'docx'}))
+    pdf = _format('pdf', ('test-render', {'template': 'a'}), ('test-convert', {'to': 'pdf'}))
+
+    assert docx.execute(_context('docx')).content == b'docx(a(q1))'
+    assert pdf.execute(_context('pdf')).content == b'pdf(a(q1))'
+
+    assert EXECUTED == ['test-render:a', 'test-convert:docx', 'test-convert:pdf']
+
+
+def test_longest_prefix_is_used():
+    steps = [('test-render', {'template': 'a'}), ('test-convert', {'to': 'docx'})]
+    pdf = _format('pdf', *steps, ('test-convert', {'to': 'pdf'}))
+    odt = _format('odt', *steps, ('test-convert', {'to': 'odt'}))
+
+    pdf.execute(_context('pdf'))
+    EXECUTED.clear()
+    assert odt.execute(_context('odt')).content == b'odt(docx(a(q1)))'
+
+    assert EXECUTED == ['test-convert:odt']
+
+
+def test_different_step_options_are_not_shared():
+    a = _format('a', ('test-render', {'template': 'a'}), ('test-convert', {'to': 'docx'}))
+    b = _format('b', ('test-render', {'template': 'b'}), ('test-convert', {'to': 'docx'}))
+    a_pdf = _format('a-pdf', ('test-render', {'template': 'a'}),
+                    ('test-convert', {'to': 'docx'}), ('test-convert', {'to': 'pdf'}))
+    b_pdf = _format('b-pdf', ('test-render', {'template': 'a'}),
+                    ('test-convert', {'to': 'html'}), ('test-convert', {'to': 'pdf'}))
+
+    assert a.execute(_context('a')).content == b'docx(a(q1))'
+    assert b.execute(_context('b')).content == b'docx(b(q1))'
+    assert a_pdf.execute(_context('a-pdf')).content == b'pdf(docx(a(q1)))'
+    assert b_pdf.execute(_context('b-pdf')).content == b'pdf(html(a(q1)))'
+
+    assert EXECUTED == [
+        'test-render:a', 'test-convert:docx',
+        'test-render:b', 'test-convert:docx',
+        'test-convert:docx', 'test-convert:pdf',
+        'test-convert:html', 'test-convert:pdf',
+    ]
+
+
+def test_different_context_is_not_shared():
+    docx = _format('docx', ('test-render', {'template': 'a'}), ('test-convert', {'to': 'docx'}))
+
+    assert docx.execute(_context('docx', 'q1')).content == b'docx(a(q1))'
+    assert docx.execute(_context('docx', 'q2')).content == b'docx(a(q2))'
+
+    assert EXECUTED == ['test-render:a', 'test-convert:docx'] * 2
@@ -0,0 +1,109 @@
+import io
+import pathlib
+import struct
+import types
+import zipfile
+
+import pytest
+
+from dsw.document_worker.context import Context
+from dsw.document_worker.documents import DocumentFile, FileFormats
+from dsw.document_worker.templates.steps import word
+
+
+ENTRIES = {
+    '[Content_Types].xml': (b'<Types/>' * 100, zipfile.ZIP_DEFLATED),
+    'word/document.xml': (b'<w:document/>' * 1000, zipfile.ZIP_DEFLATED),
+    'word/media/image1.png': (bytes(range(256)) * 10, zipfile.ZIP_STORED),
+}
+
+
+def _source_docx() -> bytes:
+    result = io.BytesIO()
+    with zipfile.ZipFile(result, mode='w') as docx:
+        # level different from the default one so that re-compressed
+        # entries would not be byte-identical
+        for name, (content, compress_type) in ENTRIES.items():
+            docx.writestr(name, content, compress_type=compress_type, compresslevel=1)
+    return result.getvalue()
+
+
+def _copy_all(data: bytes) -> bytes:
+    result = io.BytesIO()
+    with (
+        zipfile.ZipFile(io.BytesIO(data), mode='r') as source,
+        zipfile.ZipFile(result, mode='w') as target,
+    ):
+        for info in source.infolist():
+            word._copy_entry(source, memoryview(data), target, info)
+    return result.getvalue()
+
+
+def _raw_data(data: bytes, info: zipfile.ZipInfo) -> bytes:
+    # compressed data of the entry (after its local header)
+    name_length, extra_length = struct.unpack_from('<2H', data, info.header_offset + 26)
+    start = info.header_offset + 30 + name_length + extra_length
+    return data[start:start + info.compress_size]
+
+
+def _assert_entries(data: bytes):
+    with zipfile.ZipFile(io.BytesIO(data), mode='r') as docx:
+        assert docx.testzip() is None
+        assert docx.namelist() == list(ENTRIES.keys())
+        for name, (content, compress_type) in ENTRIES.items():
+            assert docx.read(name) == content
+            assert docx.getinfo(name).compress_type == compress_type
+
+
+def test_copy_entry_raw():
+    data = _source_docx()
+    result = _copy_all(data)
+    _assert_entries(result)
+    # raw copy keeps the compressed data as is
+    with (
+        zipfile.ZipFile(io.BytesIO(data)) as source,
+        zipfile.ZipFile(io.BytesIO(result)) as target,
+    ):
+        for info in source.infolist():
+            assert target.getinfo(info.filename).compress_size == info.compress_size
+            assert target.getinfo(info.filename).CRC == info.CRC
+
+
+def test_execute_follow_rewrites(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(Context, '_instance', types.SimpleNamespace(
+        app=types.SimpleNamespace(
+            pm=types.SimpleNamespace(
+                hook=types.SimpleNamespace(enrich_jinja_env=lambda **kwargs: None),
+            ),
+            cfg=types.SimpleNamespace(
+                templates=types.SimpleNamespace(get_config=lambda coordinates: None),
+            ),
+        ),
+    ))
+    (tmp_path / 'document.xml.j2').write_text('{{ content|safe }}<w:p>{{ ctx.name }}</w:p>')
+    (tmp_path / 'footer.xml').write_text('<w:ftr/>')
+    template = types.SimpleNamespace(template_dir=tmp_path, coordinates='dsw:report:1.0.0')
+    step = word.EnrichDocxStep(template, {
+        'rewrite:word/document.xml': 'render:document.xml.j2',
+        'rewrite:word/footer1.xml': 'static:footer.xml',
+    })
+    data = _source_docx()
+
+    result = step.execute_follow(DocumentFile(FileFormats.DOCX, data), {'name': 'Report'})
+
+    assert result.file_format == FileFormats.DOCX
+    with (
+        zipfile.ZipFile(io.BytesIO(data)) as source,
+        zipfile.ZipFile(io.BytesIO(result.content)) as target,
+    ):
+        assert target.testzip() is None
+        assert target.namelist() == [*ENTRIES.keys(), 'word/footer1.xml']
+        document = ENTRIES['word/document.xml'][0] + b'<w:p>Report</w:p>'
+        assert target.read('word/document.xml') == document
+        assert target.read('word/footer1.xml') == b'<w:ftr/>'
+        # untouched entries are copied byte-identically
+        for name in ('[Content_Types].xml', 'word/media/image1.png'):
+            source_info, target_info = source.getinfo(name), target.getinfo(name)
+            assert _raw_data(result.content, target_info) == _raw_data(data, source_info)
+            assert target_info.compress_type == source_info.compress_type
+            assert target_info.CRC == source_info.CRC
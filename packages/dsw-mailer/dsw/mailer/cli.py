@@ -41,14 +41,17 @@ def validate_config(ctx, param, value: typing.IO | None):
     return load_config_str(content)
 
 
-def extract_message_request(ctx, param, value: typing.IO):
-    data = json.load(value)
-    try:
-        return MessageRequest.load_from_file(data)
-    except Exception as e:
-        click.echo('Error: Cannot parse message request', err=True)
-        click.echo(f'{type(e).__name__}: {str(e)}')
-        sys.exit(1)
+def extract_message_requests(ctx, param, value: tuple[typing.IO, ...]):
+    requests = []
+    for file in value:
+        data = json.load(file)
+        try:
+            requests.append(MessageRequest.load_from_file(data))
+        except Exception as e:
+            click.echo(f'Error: Cannot parse message request ({file.name})', err=True)
+            click.echo(f'{type(e).__name__}: {str(e)}')
+            sys.exit(1)
+    return requests
 
 
 @click.group(name='dsw-mailer', help='Mailer for sending emails from DSW')
@@ -65,17 +68,20 @@ def cli(ctx, config: MailerConfig, workdir: str):
     ctx.obj['mailer'] = Mailer(config, path_workdir)
 
 
-@cli.command(name='send', help='Send message(s) from given file directly.')
+@cli.command(name='send', help='Send message(s) from given file(s) directly.')
 @click.pass_context
-@click.argument('msg-request', type=click.File('r', encoding=consts.DEFAULT_ENCODING),
-                callback=extract_message_request)
+@click.argument('msg-requests', type=click.File('r', encoding=consts.DEFAULT_ENCODING),
+                nargs=-1, required=True, callback=extract_message_requests)
 @click.option('-c', '--config', envvar=consts.VAR_APP_CONFIG_PATH,
               required=False, callback=validate_config,
               type=click.File('r', encoding=consts.DEFAULT_ENCODING))
-def send(ctx, msg_request: MessageRequest, config: MailerConfig):
+def send(ctx, msg_requests: list[MessageRequest], config: MailerConfig):
     mailer: Mailer = ctx.obj['mailer']
     try:
-        mailer.send(rq=msg_request, cfg=config.mail)
+        if len(msg_requests) == 1:
+            mailer.send(rq=msg_requests[0], cfg=config.mail)
+        else:
+            mailer.send_batch(rqs=msg_requests, cfg=config.mail)
     except Exception as e:
         SentryReporter.capture_exception(e)
         click.echo(f'Error: {e}', err=True)
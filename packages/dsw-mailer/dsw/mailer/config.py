@@ -10,6 +10,7 @@ from dsw.config.keys import (
     cast_bool,
     cast_int,
     cast_optional_bool,
+    cast_optional_float,
     cast_optional_int,
     cast_optional_str,
     cast_str,
@@ -41,6 +42,119 @@ class ExperimentalConfig(ConfigModel):
     job_timeout: int | None
 
 
+class _LocalesKeys(ConfigKeysContainer):
+    cache_max_entries = ConfigKey(
+        yaml_path=['locales', 'cache', 'maxEntries'],
+        var_names=['LOCALES_CACHE_MAX_ENTRIES'],
+        default=50,
+        cast=cast_int,
+    )
+    cache_ttl = ConfigKey(
+        yaml_path=['locales', 'cache', 'ttl'],
+        var_names=['LOCALES_CACHE_TTL'],
+        default=60,
+        cast=cast_int,
+    )
+    cache_dir = ConfigKey(
+        yaml_path=['locales', 'cache', 'dir'],
+        var_names=['LOCALES_CACHE_DIR'],
+        default=None,
+        cast=cast_optional_str,
+    )
+
+
+@dataclasses.dataclass
+class LocalesConfig(ConfigModel):
+    cache_max_entries: int
+    cache_ttl: int
+    cache_dir: str | None
+
+
+class _TemplatesKeys(ConfigKeysContainer):
+    render_cache_enabled = ConfigKey(
+        yaml_path=['templates', 'renderCache', 'enabled'],
+        var_names=['TEMPLATES_RENDER_CACHE_ENABLED'],
+        default=True,
+        cast=cast_bool,
+    )
+    render_cache_max_entries = ConfigKey(
+        yaml_path=['templates', 'renderCache', 'maxEntries'],
+        var_names=['TEMPLATES_RENDER_CACHE_MAX_ENTRIES'],
+        default=100,
+        cast=cast_int,
+    )
+    render_cache_ttl = ConfigKey(
+        yaml_path=['templates', 'renderCache', 'ttl'],
+        var_names=['TEMPLATES_RENDER_CACHE_TTL'],
+        default=300,
+        cast=cast_int,
+    )
+
+
+@dataclasses.dataclass
+class TemplatesConfig(ConfigModel):
+    render_cache_enabled: bool
+    render_cache_max_entries: int
+    render_cache_ttl: int
+
+
+class _BulkKeys(ConfigKeysContainer):
+    enabled = ConfigKey(
+        yaml_path=['bulk', 'enabled'],
+        var_names=['BULK_ENABLED'],
+        default=False,
+        cast=cast_bool,
+    )
+    max_commands = ConfigKey(
+        yaml_path=['bulk', 'maxCommands'],
+        var_names=['BULK_MAX_COMMANDS'],
+        default=50,
+        cast=cast_int,
+    )
+    per_recipient = ConfigKey(
+        yaml_path=['bulk', 'perRecipient'],
+        var_names=['BULK_PER_RECIPIENT'],
+        default=False,
+        cast=cast_bool,
+    )
+
+
+@dataclasses.dataclass
+class BulkConfig(ConfigModel):
+    enabled: bool
+    max_commands: int
+    per_recipient: bool
+
+    @property
+    def batch_size(self) -> int:
+        return self.max_commands if self.enabled else 1
+
+
+class _EngineKeys(ConfigKeysContainer):
+    mode = ConfigKey(
+        yaml_path=['engine', 'mode'],
+        var_names=['ENGINE_MODE'],
+        default='sync',
+        cast=cast_str,
+    )
+    max_in_flight = ConfigKey(
+        yaml_path=['engine', 'maxInFlight'],
+        var_names=['ENGINE_MAX_IN_FLIGHT'],
+        default=8,
+        cast=cast_int,
+    )
+
+
+@dataclasses.dataclass
+class EngineConfig(ConfigModel):
+    mode: str
+    max_in_flight: int
+
+    @property
+    def is_async(self) -> bool:
+        return self.mode.lower() == 'async'
+
+
 class _MailKeys(ConfigKeysContainer):
     enabled = ConfigKey(
         yaml_path=['mail', 'enabled'],
@@ -78,6 +192,12 @@ class _MailKeys(ConfigKeysContainer):
         default=0,
         cast=cast_int,
     )
+    rate_limit_shared = ConfigKey(
+        yaml_path=['mail', 'rateLimit', 'shared'],
+        var_names=['MAIL_RATE_LIMIT_SHARED'],
+        default=False,
+        cast=cast_bool,
+    )
     dkim_selector = ConfigKey(
         yaml_path=['mail', 'dkim', 'selector'],
         var_names=['MAIL_DKIM_SELECTOR'],
@@ -170,6 +290,30 @@ class _MailSMTPKeys(ConfigKeysContainer):
         default=5,
         cast=cast_int,
     )
+    pool_enabled = ConfigKey(
+        yaml_path=['mail', 'smtp', 'pool', 'enabled'],
+        var_names=['MAIL_SMTP_POOL_ENABLED'],
+        default=True,
+        cast=cast_bool,
+    )
+    pool_max_messages = ConfigKey(
+        yaml_path=['mail', 'smtp', 'pool', 'maxMessages'],
+        var_names=['MAIL_SMTP_POOL_MAX_MESSAGES'],
+        default=100,
+        cast=cast_int,
+    )
+    pool_idle_timeout = ConfigKey(
+        yaml_path=['mail', 'smtp', 'pool', 'idleTimeout'],
+        var_names=['MAIL_SMTP_POOL_IDLE_TIMEOUT'],
+        default=60,
+        cast=cast_int,
+    )
+    pool_max_connections = ConfigKey(
+        yaml_path=['mail', 'smtp', 'pool', 'maxConnections'],
+        var_names=['MAIL_SMTP_POOL_MAX_CONNECTIONS'],
+        default=8,
+        cast=cast_int,
+    )
 
 
 class _MailAmazonSESKeys(ConfigKeysContainer):
@@ -188,6 +332,12 @@ class _MailAmazonSESKeys(ConfigKeysContainer):
         var_names=['MAIL_SES_REGION'],
         cast=cast_optional_str,
     )
+    max_send_rate = ConfigKey(
+        yaml_path=['mail', 'amazonSes', 'maxSendRate'],
+        var_names=['MAIL_SES_MAX_SEND_RATE'],
+        default=None,
+        cast=cast_optional_float,
+    )
 
 
 class MailerConfigKeys(ConfigKeys):
@@ -195,6 +345,10 @@ class MailerConfigKeys(ConfigKeys):
     mail_legacy_smtp = _MailLegacySMTPKeys
     mail_smtp = _MailSMTPKeys
     mail_amazon_ses = _MailAmazonSESKeys
+    locales = _LocalesKeys
+    templates = _TemplatesKeys
+    bulk = _BulkKeys
+    engine = _EngineKeys
     experimental = _ExperimentalKeys
 
 
@@ -223,7 +377,9 @@ class MailSMTPConfig:
     def __init__(self, *, host: str | None = None, port: int | None = None,
                  security: str | None = None, ssl: bool | None = None,
                  username: str | None = None, password: str | None = None,
-                 auth_enabled: bool | None = None, timeout: int = 10):
+                 auth_enabled: bool | None = None, timeout: int = 10,
+                 pool_enabled: bool = True, pool_max_messages: int = 100,
+                 pool_idle_timeout: int = 60, pool_max_connections: int = 8):
         self.host = host
         self.security = SMTPSecurityMode.PLAIN  # type: SMTPSecurityMode
         if security is not None and SMTPSecurityMode.has(security.upper()):
@@ -237,6 +393,28 @@ class MailSMTPConfig:
         self.username = username
         self.password = password
         self.timeout = timeout
+        self.pool_enabled = pool_enabled
+        self.pool_max_messages = pool_max_messages
+        self.pool_idle_timeout = pool_idle_timeout
+        self.pool_max_connections = pool_max_connections
+
+    @property
+    def session_key(self) -> tuple:
+        # connections can be shared only with the same server and identity
+        return (
+            self.host,
+            self.port,
+            self.security,
+            self.auth,
+            self.username,
+            self.password,
+        )
+
+    def update_pool(self, other: 'MailSMTPConfig'):
+        self.pool_enabled = other.pool_enabled
+        self.pool_max_messages = other.pool_max_messages
+        self.pool_idle_timeout = other.pool_idle_timeout
+        self.pool_max_connections = other.pool_max_connections
 
     @property
     def login_user(self) -> str:
@@ -275,6 +453,11 @@ class MailAmazonSESConfig:
     access_key_id: str | None = None
     secret_access_key: str | None = None
     region: str | None = None
+    max_send_rate: float | None = None
+
+    @property
+    def client_key(self) -> tuple:
+        return self.region, self.access_key_id, self.secret_access_key
 
     def has_credentials(self) -> bool:
         return self.access_key_id is not None and self.secret_access_key is not None
@@ -285,6 +468,7 @@ class MailConfig(ConfigModel):
     def __init__(self, *, enabled: bool, name: str, email: str,
                  provider: str, smtp: MailSMTPConfig, amazon_ses: MailAmazonSESConfig,
                  rate_limit_window: int, rate_limit_count: int,
+                 rate_limit_shared: bool = False,
                  dkim_selector: str | None = None, dkim_privkey_file: str | None = None):
         self.enabled = enabled
         self.name = name
@@ -301,6 +485,8 @@ class MailConfig(ConfigModel):
 
         self.rate_limit_window = rate_limit_window
         self.rate_limit_count = rate_limit_count
+        self.rate_limit_shared = rate_limit_shared
+        self.rate_limit_key = f'{self.provider.name}:default'
         self.dkim_selector = dkim_selector
         self.dkim_privkey_file = dkim_privkey_file
         self.dkim_privkey = b''
@@ -330,6 +516,7 @@ class MailConfig(ConfigModel):
                f'- provider = {self.provider}\n' \
                f'- rate_limit_window = {self.rate_limit_window}\n' \
                f'- rate_limit_count = {self.rate_limit_count}\n' \
+               f'- rate_limit_shared = {self.rate_limit_shared}\n' \
                f'- dkim_selector = {self.dkim_selector}\n' \
                f'- dkim_privkey_file = {self.dkim_privkey_file}\n'
 
@@ -339,6 +526,8 @@ class MailerConfig:
     def __init__(self, *, db: DatabaseConfig, log: LoggingConfig,
                  mail: MailConfig, sentry: SentryConfig,
                  general: GeneralConfig, aws: AWSConfig,
+                 locales: LocalesConfig, templates: TemplatesConfig,
+                 bulk: BulkConfig, engine: EngineConfig,
                  experimental: ExperimentalConfig,
                  s3: S3Config, cloud: CloudConfig):
         self.db = db
@@ -349,6 +538,10 @@ class MailerConfig:
         self.sentry = sentry
         self.general = general
         self.aws = aws
+        self.locales = locales
+        self.templates = templates
+        self.bulk = bulk
+        self.engine = engine
         self.experimental = experimental
 
         # Use AWS credentials for Amazon SES if not provided
@@ -362,6 +555,10 @@ class MailerConfig:
                f'{self.mail}' \
                f'{self.sentry}' \
                f'{self.general}' \
+               f'{self.locales}' \
+               f'{self.templates}' \
+               f'{self.bulk}' \
+               f'{self.engine}' \
                f'{self.experimental}' \
                f'====================\n'
 
@@ -381,6 +578,10 @@ class MailerConfigParser(DSWConfigParser):
             username=self.get(self.keys.mail_smtp.username),
             password=self.get(self.keys.mail_smtp.password),
             timeout=int(self.get(self.keys.mail_smtp.timeout)),
+            pool_enabled=self.get(self.keys.mail_smtp.pool_enabled),
+            pool_max_messages=int(self.get(self.keys.mail_smtp.pool_max_messages)),
+            pool_idle_timeout=int(self.get(self.keys.mail_smtp.pool_idle_timeout)),
+            pool_max_connections=int(self.get(self.keys.mail_smtp.pool_max_connections)),
         )
         if smtp.host == '':
             smtp = MailSMTPConfig(
@@ -392,12 +593,17 @@ class MailerConfigParser(DSWConfigParser):
                 password=self.get(self.keys.mail_legacy_smtp.password),
                 ssl=self.get(self.keys.mail_legacy_smtp.ssl),
                 timeout=int(self.get(self.keys.mail_legacy_smtp.timeout)),
+                pool_enabled=self.get(self.keys.mail_smtp.pool_enabled),
+                pool_max_messages=int(self.get(self.keys.mail_smtp.pool_max_messages)),
+                pool_idle_timeout=int(self.get(self.keys.mail_smtp.pool_idle_timeout)),
+                pool_max_connections=int(self.get(self.keys.mail_smtp.pool_max_connections)),
             )
 
         amazon_ses = MailAmazonSESConfig(
             access_key_id=self.get(self.keys.mail_amazon_ses.access_key_id),
             secret_access_key=self.get(self.keys.mail_amazon_ses.secret_access_key),
             region=self.get(self.keys.mail_amazon_ses.region),
+            max_send_rate=self.get(self.keys.mail_amazon_ses.max_send_rate),
         )
 
         return MailConfig(
@@ -409,10 +615,42 @@ class MailerConfigParser(DSWConfigParser):
             amazon_ses=amazon_ses,
             rate_limit_window=int(self.get(self.keys.mail.rate_limit_window)),
             rate_limit_count=int(self.get(self.keys.mail.rate_limit_count)),
+            rate_limit_shared=self.get(self.keys.mail.rate_limit_shared),
             dkim_selector=self.get(self.keys.mail.dkim_selector),
             dkim_privkey_file=self.get(self.keys.mail.dkim_privkey_file),
         )
 
+    @property
+    def locales(self) -> LocalesConfig:
+        return LocalesConfig(
+            cache_max_entries=self.get(self.keys.locales.cache_max_entries),
+            cache_ttl=self.get(self.keys.locales.cache_ttl),
+            cache_dir=self.get(self.keys.locales.cache_dir),
+        )
+
+    @property
+    def templates(self) -> TemplatesConfig:
+        return TemplatesConfig(
+            render_cache_enabled=self.get(self.keys.templates.render_cache_enabled),
+            render_cache_max_entries=self.get(self.keys.templates.render_cache_max_entries),
+            render_cache_ttl=self.get(self.keys.templates.render_cache_ttl),
+        )
+
+    @property
+    def bulk(self) -> BulkConfig:
+        return BulkConfig(
+            enabled=self.get(self.keys.bulk.enabled),
+            max_commands=self.get(self.keys.bulk.max_commands),
+            per_recipient=self.get(self.keys.bulk.per_recipient),
+        )
+
+    @property
+    def engine(self) -> EngineConfig:
+        return EngineConfig(
+            mode=self.get(self.keys.engine.mode),
+            max_in_flight=self.get(self.keys.engine.max_in_flight),
+        )
+
     @property
     def experimental(self) -> ExperimentalConfig:
         return ExperimentalConfig(
@@ -430,6 +668,10 @@ class MailerConfigParser(DSWConfigParser):
             sentry=self.sentry,
             general=self.general,
             aws=self.aws,
+            locales=self.locales,
+            templates=self.templates,
+            bulk=self.bulk,
+            engine=self.engine,
             experimental=self.experimental,
         )
         cfg.mail.load_dkim_privkey()
@@ -441,7 +683,10 @@ def merge_mail_configs(cfg: MailerConfig, db_cfg: DBInstanceConfigMail | None) -
         return cfg.mail
 
     smtp = MailSMTPConfig()
-    amazon_ses = MailAmazonSESConfig()
+    smtp.update_pool(cfg.mail.smtp)
+    amazon_ses = MailAmazonSESConfig(
+        max_send_rate=cfg.mail.amazon_ses.max_send_rate,
+    )
     if db_cfg.provider.lower() == 'smtp':
         if db_cfg.smtp_host is None:
             smtp.host = cfg.mail.smtp.host
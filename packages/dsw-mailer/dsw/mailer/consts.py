@@ -5,6 +5,8 @@ COMPONENT_NAME = 'Mailer'
 CMD_CHANNEL = 'mailer'
 CMD_COMPONENT = 'mailer'
 CMD_FUNCTION = 'sendMail'
+# recipients already delivered in previous attempts (stored in body)
+CMD_DELIVERED_RECIPIENTS = 'deliveredRecipients'
 DEFAULT_ENCODING = 'utf-8'
 NULL_UUID = '00000000-0000-0000-0000-000000000000'
 PROG_NAME = 'dsw-mailer'
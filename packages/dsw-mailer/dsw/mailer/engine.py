@@ -0,0 +1,202 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import signal
+import typing
+
+import tenacity
+
+from dsw.command_queue import CommandJobError, CommandQueue
+from dsw.command_queue.command_queue import RETRY_QUEUE_MULTIPLIER, RETRY_QUEUE_TRIES
+from dsw.database.model import PersistentCommand
+
+from .sender import send
+
+
+if typing.TYPE_CHECKING:
+    from .mailer import Mailer
+
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncMailerEngine:
+    # Claims commands while there are free slots and sends up to
+    # max_in_flight messages concurrently; database work (claiming,
+    # rendering, rate limit, results) is serialized in a single thread
+    # as the connection is shared, sending runs in a pool of threads
+
+    def __init__(self, mailer: 'Mailer', queue: CommandQueue, max_in_flight: int):
+        self.mailer = mailer
+        self.queue = queue
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._sending: dict[str, asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._queue_socket: int | None = None
+        self._db_executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._send_executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    def run(self):
+        LOG.info('Starting asynchronous engine (up to %s messages in flight)',
+                 self.max_in_flight)
+        asyncio.run(self._run(once=False))
+
+    def run_once(self):
+        LOG.info('Processing the command queue once (up to %s messages in flight)',
+                 self.max_in_flight)
+        asyncio.run(self._run(once=True))
+
+    async def _run(self, once: bool):
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._db_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='mailer-db',
+        )
+        self._send_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_in_flight,
+            thread_name_prefix='mailer-send',
+        )
+        for sig in (signal.SIGINT, signal.SIGABRT):
+            loop.add_signal_handler(sig, self._interrupt)
+        try:
+            await self._process_queue(once)
+        finally:
+            self._unlisten()
+            if len(self._in_flight) > 0:
+                LOG.info('Waiting for %s commands in flight', len(self._in_flight))
+                await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+            self._db_executor.shutdown()
+            self._send_executor.shutdown()
+        LOG.info('Exiting asynchronous engine')
+
+    async def _process_queue(self, once: bool):
+        while not self.queue.interrupted:
+            self._wakeup.clear()
+            if not once and self._queue_socket is None:
+                await self._listen()
+            free = self.max_in_flight - len(self._in_flight)
+            if free > 0:
+                commands = await self._queue_db(
+                    self.queue.claim_commands, free, list(self._in_flight.keys()),
+                )
+                for command in commands:
+                    self._start(command)
+                if len(commands) == free:
+                    # there may be more commands waiting
+                    continue
+            if once and len(self._in_flight) == 0:
+                LOG.info('There are no more commands to process')
+                break
+            await self._wait()
+
+    async def _wait(self):
+        LOG.debug('Waiting for notifications or finished commands (up to %s seconds)',
+                  self.queue.wait_timeout)
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.queue.wait_timeout)
+        except TimeoutError:
+            LOG.info('Nothing received in this cycle (timeout %s seconds)',
+                     self.queue.wait_timeout)
+
+    async def _db(self, func: typing.Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args))
+
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_QUEUE_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_QUEUE_TRIES),
+        before=tenacity.before_log(LOG, logging.INFO),
+        after=tenacity.after_log(LOG, logging.INFO),
+    )
+    async def _queue_db(self, func: typing.Callable, *args):
+        # queue operations are retried as in the synchronous engine, query
+        # connection is re-established before the next attempt (so that
+        # a database restart does not end the engine)
+        try:
+            return await self._db(func, *args)
+        except Exception as e:
+            LOG.warning('Command queue operation failed: %s', str(e))
+            await self._db(self.queue.db.conn_query.reset)
+            raise
+
+    async def _listen(self):
+        # broken queue connection is re-established when listening again
+        self._queue_socket = await self._queue_db(self.queue.listen)
+        asyncio.get_running_loop().add_reader(self._queue_socket, self._on_notification)
+
+    def _unlisten(self):
+        if self._queue_socket is not None:
+            asyncio.get_running_loop().remove_reader(self._queue_socket)
+            self._queue_socket = None
+
+    def _start(self, command: PersistentCommand):
+        task = asyncio.create_task(self._process(command), name=f'command-{command.uuid}')
+        self._in_flight[command.uuid] = task
+        task.add_done_callback(functools.partial(self._finished, command.uuid))
+
+    def _finished(self, command_uuid: str, _: asyncio.Task):
+        self._in_flight.pop(command_uuid, None)
+        self._wakeup.set()
+
+    def _on_notification(self):
+        try:
+            self.queue.drain_notifications()
+        except Exception as e:
+            LOG.warning('Failed to read notifications (listening again): %s', str(e))
+            self._unlisten()
+        self._wakeup.set()
+
+    def _interrupt(self):
+        LOG.warning('Received interrupt signal, finishing commands in flight')
+        self.queue.interrupt()
+        self._wakeup.set()
+
+    async def _process(self, command: PersistentCommand):
+        LOG.info('Processing persistent command %s (attempt %s / %s)',
+                 command.uuid, command.attempts + 1, command.max_attempts)
+        # result is recorded once; a send thread cannot be stopped, so when
+        # it is already running on timeout, its outcome is recorded instead
+        # of a timeout (retrying it could deliver the message twice)
+        error: BaseException | None = None
+        work = asyncio.ensure_future(self._work(command))
+        done, _ = await asyncio.wait({work}, timeout=self.queue.work_timeout)
+        timed_out = len(done) == 0
+        if timed_out:
+            work.cancel()
+            sending = self._sending.get(command.uuid)
+            if sending is not None:
+                LOG.warning('Command %s timed out while sending, waiting for the result',
+                            command.uuid)
+                timed_out = False
+                work = sending
+                await asyncio.wait({work})
+        self._sending.pop(command.uuid, None)
+        if not timed_out:
+            try:
+                work.result()
+            except (CommandJobError, Exception) as e:
+                error = e
+        try:
+            await self._queue_db(self.queue.finish_command, command, error, timed_out)
+        except Exception as e:
+            LOG.error('Failed to record result of command %s: %s', command.uuid, str(e))
+
+    async def _work(self, command: PersistentCommand):
+        msg, cfg = await self._db(self.mailer.prepare_message, command)
+        wait_time = await self._db(
+            self.mailer.rate_limiter.reserve,
+            cfg.rate_limit_key, cfg.rate_limit_window, cfg.rate_limit_count,
+        )
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        LOG.info('Sending message: %s (command %s)', msg.msg_id, command.uuid)
+        loop = asyncio.get_running_loop()
+        sending = loop.run_in_executor(self._send_executor, send, msg, cfg)
+        self._sending[command.uuid] = sending
+        # shielded so that cancelling the work keeps the send result
+        await asyncio.shield(sending)
+        LOG.info('Message sent successfully (command %s)', command.uuid)
@@ -0,0 +1,171 @@
+import collections
+import gettext
+import logging
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import time
+
+import polib
+
+from .config import LocalesConfig
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = '~:default:1.0.0'
+LOCALE_FILE = 'mail.po'
+
+_UNSAFE_CHARS = re.compile(r'[^a-zA-Z0-9_.-]+')
+
+
+class LocaleNotFoundError(RuntimeError):
+
+    def __init__(self, locale_uuid: str):
+        super().__init__(f'Locale not found in DB: {locale_uuid}')
+
+
+class LocaleCache:
+    # Compiled translations are kept in memory (LRU) and as MO files on
+    # disk, keyed by tenant, locale and its last update; locale lookups
+    # in DB are reused for a short time (TTL) to avoid query per message
+
+    def __init__(self, cfg: LocalesConfig):
+        self.cfg = cfg
+        self.cache_dir = self._prepare_cache_dir(cfg.cache_dir)
+        self._translations: collections.OrderedDict[tuple, gettext.GNUTranslations] = \
+            collections.OrderedDict()
+        self._resolved: dict[tuple[str, str], tuple[float, tuple | None]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prepare_cache_dir(cache_dir: str | None) -> pathlib.Path | None:
+        path = pathlib.Path(cache_dir) if cache_dir else \
+            pathlib.Path(tempfile.gettempdir()) / 'dsw-mailer' / 'locales'
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            LOG.warning('Cannot use locale cache directory %s: %s', path, str(e))
+            return None
+        return path
+
+    def _resolve(self, tenant_uuid: str, locale_uuid: str, app_ctx) -> tuple | None:
+        # returns cache key of translations or None for default locale
+        now = time.monotonic()
+        with self._lock:
+            resolved = self._resolved.get((tenant_uuid, locale_uuid))
+        if resolved is not None and resolved[0] > now:
+            return resolved[1]
+        locale = app_ctx.db.get_locale(
+            tenant_uuid=tenant_uuid,
+            locale_uuid=locale_uuid,
+        )
+        if locale is None:
+            LOG.error('Could not find locale for tenant %s', tenant_uuid)
+            raise LocaleNotFoundError(locale_uuid)
+        key = None
+        if locale.id != DEFAULT_LOCALE:
+            updated_at = locale.updated_at.isoformat() if locale.updated_at else None
+            key = (tenant_uuid, locale_uuid, locale.code, updated_at)
+        if key is None or key[3] is not None:
+            with self._lock:
+                self._resolved[(tenant_uuid, locale_uuid)] = (now + self.cfg.cache_ttl, key)
+        return key
+
+    def _get_cached(self, key: tuple) -> gettext.GNUTranslations | None:
+        with self._lock:
+            translations = self._translations.get(key)
+            if translations is not None:
+                self._translations.move_to_end(key)
+        return translations
+
+    def _put_cached(self, key: tuple, translations: gettext.GNUTranslations):
+        with self._lock:
+            self._translations[key] = translations
+            self._translations.move_to_end(key)
+            while len(self._translations) > self.cfg.cache_max_entries:
+                self._translations.popitem(last=False)
+
+    @staticmethod
+    def _mo_name(*parts) -> str:
+        return '_'.join(_UNSAFE_CHARS.sub('-', str(part)) for part in parts)
+
+    def _mo_path(self, key: tuple) -> pathlib.Path | None:
+        if self.cache_dir is None or key[3] is None:
+            return None
+        return self.cache_dir / f'{self._mo_name(*key)}.mo'
+
+    def _remove_outdated(self, key: tuple, current: pathlib.Path):
+        if self.cache_dir is None:
+            return
+        prefix = self._mo_name(key[0], key[1])
+        for path in self.cache_dir.glob(f'{prefix}_*.mo'):
+            if path != current:
+                LOG.debug('Removing outdated MO file: %s', path)
+                path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_mo(path: pathlib.Path) -> gettext.GNUTranslations:
+        with path.open(mode='rb') as mo_file:
+            return gettext.GNUTranslations(mo_file)
+
+    @staticmethod
+    def _compile(key: tuple, app_ctx, target_path: pathlib.Path):
+        tenant_uuid, locale_uuid, _, _ = key
+        with tempfile.TemporaryDirectory() as tmpdir:
+            po_path = pathlib.Path(tmpdir) / 'default.po'
+            downloaded = app_ctx.s3.download_locale(
+                tenant_uuid=tenant_uuid,
+                locale_uuid=locale_uuid,
+                file_name=LOCALE_FILE,
+                target_path=po_path,
+            )
+            if not downloaded:
+                LOG.error('Cannot download locale file (%s) from %s to %s',
+                          LOCALE_FILE, locale_uuid, po_path)
+                raise RuntimeError(f'Failed to download locale file '
+                                   f'({LOCALE_FILE}) from {locale_uuid}')
+            LOG.debug('Saved PO file to %s', po_path)
+            # convert po to mo (atomically, other processes may share the dir)
+            mo_tmp_path = target_path.with_name(f'.{target_path.name}.{os.getpid()}')
+            po = polib.pofile(po_path.absolute().as_posix())
+            po.save_as_mofile(mo_tmp_path.absolute().as_posix())
+            mo_tmp_path.replace(target_path)
+            LOG.debug('Converted PO file to MO file: %s', target_path)
+
+    def _load(self, key: tuple, app_ctx) -> gettext.GNUTranslations:
+        mo_path = self._mo_path(key)
+        if mo_path is not None and mo_path.exists():
+            try:
+                LOG.debug('Loading translations from cached MO file: %s', mo_path)
+                return self._read_mo(mo_path)
+            except OSError as e:
+                LOG.warning('Cannot read cached MO file %s: %s', mo_path, str(e))
+        if mo_path is None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                tmp_mo_path = pathlib.Path(tmpdir) / 'default.mo'
+                self._compile(key, app_ctx, tmp_mo_path)
+                return self._read_mo(tmp_mo_path)
+        self._compile(key, app_ctx, mo_path)
+        self._remove_outdated(key, mo_path)
+        return self._read_mo(mo_path)
+
+    def get(self, tenant_uuid: str, locale_uuid: str,
+            app_ctx) -> gettext.GNUTranslations | None:
+        key = self._resolve(tenant_uuid, locale_uuid, app_ctx)
+        if key is None:
+            return None
+        translations = self._get_cached(key)
+        if translations is not None:
+            return translations
+        translations = self._load(key, app_ctx)
+        if key[3] is not None:
+            self._put_cached(key, translations)
+        return translations
+
+    def clear(self):
+        with self._lock:
+            self._translations.clear()
+            self._resolved.clear()
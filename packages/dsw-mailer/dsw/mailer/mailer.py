@@ -1,8 +1,8 @@
+import dataclasses
 import datetime
 import logging
-import math
 import pathlib
-import time
+import threading
 
 import dateutil.parser
 
@@ -16,8 +16,10 @@ from . import consts
 from .build_info import BUILD_INFO
 from .config import MailConfig, MailerConfig, merge_mail_configs
 from .context import Context
-from .model import MessageRecipient, MessageRequest
-from .sender import send
+from .engine import AsyncMailerEngine
+from .model import MailMessage, MessageRecipient, MessageRequest
+from .ratelimit import LocalRateLimitBackend, PostgresRateLimitBackend, RateLimiter
+from .sender import send, send_batch
 
 
 LOG = logging.getLogger(__name__)
@@ -28,14 +30,13 @@ class Mailer(CommandWorker):
     def __init__(self, cfg: MailerConfig, workdir: pathlib.Path):
         self.cfg = cfg
         self.workdir = workdir
-        self.rate_limiter = RateLimiter(
-            window=cfg.mail.rate_limit_window,
-            count=cfg.mail.rate_limit_count,
-        )
 
         self._init_context(workdir=workdir)
         self._init_sentry()
         self.ctx = Context.get()
+        self.rate_limiter = self._init_rate_limiter()
+        self.queue: CommandQueue | None = None
+        self._bulk_progress: BulkProgress | None = None
 
     def _init_context(self, workdir: pathlib.Path):
         Context.initialize(
@@ -48,6 +49,11 @@ class Mailer(CommandWorker):
             ),
         )
 
+    def _init_rate_limiter(self) -> RateLimiter:
+        if self.cfg.mail.rate_limit_shared:
+            return RateLimiter(PostgresRateLimitBackend(db=self.ctx.app.db))
+        return RateLimiter(LocalRateLimitBackend())
+
     def _init_sentry(self):
         SentryReporter.initialize(
             config=self.cfg.sentry,
@@ -72,24 +78,32 @@ class Mailer(CommandWorker):
         self._update_component_info()
         # init queue
         LOG.info('Preparing command queue')
-        return CommandQueue(
+        self.queue = CommandQueue(
             worker=self,
             db=Context.get().app.db,
             channel=consts.CMD_CHANNEL,
             component=consts.CMD_COMPONENT,
             wait_timeout=Context.get().app.cfg.db.queue_timeout,
             work_timeout=Context.get().app.cfg.experimental.job_timeout,
+            batch_size=Context.get().app.cfg.bulk.batch_size,
         )
+        return self.queue
 
     def run(self):
         LOG.info('Starting mailer worker (loop)')
         queue = self._run_preparation()
-        queue.run()
+        if self.cfg.engine.is_async:
+            AsyncMailerEngine(self, queue, self.cfg.engine.max_in_flight).run()
+        else:
+            queue.run()
 
     def run_once(self):
         LOG.info('Starting mailer worker (once)')
         queue = self._run_preparation()
-        queue.run_once()
+        if self.cfg.engine.is_async:
+            AsyncMailerEngine(self, queue, self.cfg.engine.max_in_flight).run_once()
+        else:
+            queue.run_once()
 
     def _get_locale_uuid(self, recipient_uuid: str, tenant_uuid: str) -> str | None:
         app_ctx = Context.get().app
@@ -136,9 +150,17 @@ class Mailer(CommandWorker):
             cfg=self.cfg,
             db_cfg=db_cfg,
         )
+        mail_cfg.rate_limit_key = f'{mail_cfg.provider.name}:{mail_config_uuid or "default"}'
         LOG.debug('Mail config: %s', mail_cfg)
         return mail_cfg
 
+    def _hit_rate_limit(self, cfg: MailConfig):
+        self.rate_limiter.hit(
+            key=cfg.rate_limit_key,
+            window=cfg.rate_limit_window,
+            count=cfg.rate_limit_count,
+        )
+
     def work(self, command: PersistentCommand):
         # init Sentry info
         SentryReporter.set_tags(
@@ -162,52 +184,224 @@ class Mailer(CommandWorker):
         )
         Context.get().update_trace_id('-')
 
+    def prepare_message(self, command: PersistentCommand) -> tuple[MailMessage, MailConfig]:
+        rq = self._get_msg_request(command)
+        mail_cfg = self._get_mail_config(command)
+        return self._render(rq, mail_cfg), mail_cfg
+
+    def batch_match(self, command: PersistentCommand) -> dict | None:
+        if not self.cfg.bulk.enabled:
+            return None
+        if 'mode' not in command.body or 'template' not in command.body:
+            return None
+        return {
+            'mode': command.body['mode'],
+            'template': command.body['template'],
+        }
+
+    def work_batch(self, commands: list[PersistentCommand],
+                   completed: set[str]) -> dict[str, BaseException]:
+        # on timeout, deliveries are recorded by process_timeout (the batch
+        # runs in a separate thread that may not be stopped yet)
+        self._bulk_progress = BulkProgress(completed)
+        try:
+            errors = self._work_batch(commands, self._bulk_progress)
+        except Exception:
+            self._record_deliveries()
+            raise
+        self._record_deliveries()
+        return errors
+
+    def _work_batch(self, commands: list[PersistentCommand],
+                    progress: 'BulkProgress') -> dict[str, BaseException]:
+        errors: dict[str, BaseException] = {}
+        # group by template, locale, and mail config (tenant is the same)
+        groups: dict[tuple, list[tuple[PersistentCommand, MessageRequest]]] = {}
+        for command in commands:
+            try:
+                rq = self._get_msg_request(command)
+                if not self.ctx.templates.has_template_for(rq):
+                    raise RuntimeError(f'Template not found: {rq.template_name}')
+            except Exception as e:
+                errors[command.uuid] = e
+                continue
+            params: dict = command.body.get('parameters', {})
+            key = (rq.template_name, rq.locale_uuid, params.get('mailConfigUuid'))
+            groups.setdefault(key, []).append((command, rq))
+        for (template_name, locale_uuid, _), items in groups.items():
+            first_command = items[0][0]
+            LOG.info('Sending %s requests in bulk: %s (locale %s)',
+                     len(items), template_name, locale_uuid)
+            SentryReporter.set_tags(
+                template=template_name,
+                command_uuid=first_command.uuid,
+                tenant_uuid=first_command.tenant_uuid,
+            )
+            Context.get().update_trace_id(first_command.uuid)
+            try:
+                errors.update(self._send_bulk(items, progress))
+            except Exception as e:
+                for command, _ in items:
+                    errors[command.uuid] = e
+        SentryReporter.set_tags(
+            template='-',
+            command_uuid='-',
+            tenant_uuid='-',
+        )
+        Context.get().update_trace_id('-')
+        return errors
+
+    def _split_recipients(self, msg: MailMessage, delivered: set[str]) -> list[MailMessage]:
+        # recipients delivered in previous attempts are skipped
+        recipients = [r for r in msg.recipients if r not in delivered]
+        if len(recipients) == 0:
+            return []
+        if not self.cfg.bulk.per_recipient or len(recipients) < 2:
+            return [dataclasses.replace(msg, recipients=recipients)]
+        return [dataclasses.replace(msg, recipients=[recipient])
+                for recipient in recipients]
+
+    def _send_bulk(self, items: list[tuple[PersistentCommand, MessageRequest]],
+                   progress: 'BulkProgress'):
+        errors: dict[str, BaseException] = {}
+        mail_cfg = self._get_mail_config(items[0][0])
+        rendered = self.ctx.templates.render_batch(
+            rqs=[rq for _, rq in items],
+            cfg=mail_cfg,
+            app_ctx=Context.get().app,
+        )
+        msgs: list[MailMessage] = []
+        msg_indices: list[int] = []
+        for (command, _), result in zip(items, rendered, strict=True):
+            if isinstance(result, Exception):
+                errors[command.uuid] = result
+                continue
+            for msg in self._split_recipients(result, progress.previously_delivered(command)):
+                msgs.append(msg)
+                msg_indices.append(progress.add_message(command, msg))
+            progress.messages_added(command)
+        LOG.info('Sending %s messages in bulk', len(msgs))
+        results = send_batch(
+            msgs, mail_cfg,
+            on_result=lambda index, error: progress.finish_message(msg_indices[index], error),
+            before_send=lambda: self._hit_rate_limit(mail_cfg),
+        )
+        for index, error in zip(msg_indices, results, strict=True):
+            if error is not None:
+                errors.setdefault(progress.command_uuid(index), error)
+        return errors
+
+    def _record_deliveries(self):
+        # remember delivered recipients of unfinished commands for next attempt
+        progress = self._bulk_progress
+        self._bulk_progress = None
+        if progress is None or self.queue is None:
+            return
+        for command, recipients in progress.partial_deliveries():
+            LOG.info('Recording %s delivered recipients of command %s',
+                     len(recipients), command.uuid)
+            command.body[consts.CMD_DELIVERED_RECIPIENTS] = recipients
+            try:
+                self.queue.update_command_body(command)
+            except Exception as e:
+                LOG.warning('Failed to record delivered recipients of command %s: %s',
+                            command.uuid, str(e))
+
     def process_timeout(self, e: BaseException):
         LOG.info('Failed with timeout')
         SentryReporter.capture_exception(e)
+        self._record_deliveries()
 
     def process_exception(self, e: BaseException):
         LOG.info('Failed with unexpected error', exc_info=e)
         SentryReporter.capture_exception(e)
 
-    def send(self, rq: MessageRequest, cfg: MailConfig):
-        LOG.info('Sending request: %s (%s)', rq.template_name, rq.id)
+    def _render(self, rq: MessageRequest, cfg: MailConfig) -> MailMessage:
         # get template
         if not self.ctx.templates.has_template_for(rq):
             raise RuntimeError(f'Template not found: {rq.template_name}')
         # render
         LOG.info('Rendering message: %s', rq.template_name)
         LOG.warning('Should send with locale: %s', rq.locale_uuid)
-        msg = self.ctx.templates.render(rq, cfg, Context.get().app)
+        return self.ctx.templates.render(rq, cfg, Context.get().app)
+
+    def send(self, rq: MessageRequest, cfg: MailConfig):
+        LOG.info('Sending request: %s (%s)', rq.template_name, rq.id)
+        msg = self._render(rq, cfg)
         # send
+        self._hit_rate_limit(cfg)
         LOG.info('Sending message: %s', rq.template_name)
         send(msg, cfg)
         LOG.info('Message sent successfully')
 
+    def send_batch(self, rqs: list[MessageRequest], cfg: MailConfig):
+        LOG.info('Sending batch of %s requests', len(rqs))
+        msgs = [self._render(rq, cfg) for rq in rqs]
+        # send (one token of rate limit for each message)
+        LOG.info('Sending %s messages', len(msgs))
+        results = send_batch(msgs, cfg, before_send=lambda: self._hit_rate_limit(cfg))
+        errors = [e for e in results if e is not None]
+        if len(errors) > 0:
+            raise RuntimeError(f'Failed to send {len(errors)} of {len(msgs)} '
+                               f'messages') from errors[0]
+        LOG.info('Messages sent successfully')
+
+
+class BulkProgress:
+    # Tracks messages of commands sent in bulk (results may come from
+    # multiple threads), commands with all messages delivered are added
+    # to completed right away, delivered recipients are kept for others
+
+    def __init__(self, completed: set[str]):
+        self.completed = completed
+        self._commands: dict[str, PersistentCommand] = {}
+        self._messages: list[tuple[str, list[str]]] = []
+        self._pending: dict[str, int] = {}
+        self._failed: set[str] = set()
+        self._delivered: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
 
-class RateLimiter:
-
-    def __init__(self, window: int, count: int):
-        self.window = window
-        self.count = count
-        self.hits: list[float] = []
-
-    def hit(self):
-        if self.window == 0:
-            return
-        LOG.debug('Hit for checking rate limit')
-        now = datetime.datetime.now(tz=datetime.UTC).timestamp()
-        threshold = now - self.window
-        while len(self.hits) > 0 and self.hits[0] < threshold:
-            self.hits.pop()
-        self.hits.append(now)
-
-        if len(self.hits) >= self.count:
-            LOG.info('Reached rate limit')
-            sleep_time = math.ceil(self.window - now + self.hits[0])
-            if sleep_time > 1:
-                LOG.info('Will sleep now for %s seconds', sleep_time)
-                time.sleep(sleep_time)
+    @staticmethod
+    def previously_delivered(command: PersistentCommand) -> set[str]:
+        return set(command.body.get(consts.CMD_DELIVERED_RECIPIENTS, []))
+
+    def add_message(self, command: PersistentCommand, msg: MailMessage) -> int:
+        with self._lock:
+            self._commands[command.uuid] = command
+            self._messages.append((command.uuid, msg.recipients))
+            self._pending[command.uuid] = self._pending.get(command.uuid, 0) + 1
+            return len(self._messages) - 1
+
+    def messages_added(self, command: PersistentCommand):
+        # command without any message to send is already delivered
+        with self._lock:
+            if self._pending.get(command.uuid, 0) == 0:
+                self.completed.add(command.uuid)
+
+    def command_uuid(self, index: int) -> str:
+        return self._messages[index][0]
+
+    def finish_message(self, index: int, error: Exception | None):
+        with self._lock:
+            command_uuid, recipients = self._messages[index]
+            if error is None:
+                self._delivered.setdefault(command_uuid, []).extend(recipients)
+            else:
+                self._failed.add(command_uuid)
+            self._pending[command_uuid] -= 1
+            if self._pending[command_uuid] == 0 and command_uuid not in self._failed:
+                self.completed.add(command_uuid)
+
+    def partial_deliveries(self) -> list[tuple[PersistentCommand, list[str]]]:
+        with self._lock:
+            return [
+                (command, sorted(self.previously_delivered(command).union(
+                    self._delivered.get(command_uuid, []),
+                )))
+                for command_uuid, command in self._commands.items()
+                if command_uuid not in self.completed and
+                len(self._delivered.get(command_uuid, [])) > 0
+            ]
 
 
 class MailerCommand:
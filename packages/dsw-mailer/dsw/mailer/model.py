@@ -1,3 +1,4 @@
+import base64
 import dataclasses
 import os
 import re
@@ -266,3 +267,13 @@ class MailAttachment:
     name: str
     content_type: str
     data: bytes
+    _base64_data: str | None = dataclasses.field(
+        default=None, init=False, repr=False, compare=False,
+    )
+
+    @property
+    def base64_data(self) -> str:
+        # attachments of templates are shared by all messages, encode once
+        if self._base64_data is None:
+            self._base64_data = base64.encodebytes(self.data).decode('ascii')
+        return self._base64_data
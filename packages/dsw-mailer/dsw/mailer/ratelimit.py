@@ -0,0 +1,137 @@
+import abc
+import logging
+import threading
+import time
+
+from dsw.database import Database
+from dsw.database.database import PostgresConnection
+
+
+LOG = logging.getLogger(__name__)
+
+
+class RateLimitBackend(abc.ABC):
+
+    @abc.abstractmethod
+    def reserve(self, key: str, capacity: float, rate: float, count: int) -> float:
+        # takes count tokens (can go to debt), returns seconds to wait
+        ...
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, capacity: float, rate: float, count: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate) - count
+            self._buckets[key] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+
+class PostgresRateLimitBackend(RateLimitBackend):
+    # Bucket is a row updated atomically (row lock) so all mailer
+    # replicas sharing the database share also the limit; the table is
+    # created by migration (see migrations), local bucket is used if it
+    # is missing, own autocommit connection is used so the transaction
+    # of the command queue is not committed
+
+    TABLE_NAME = 'mailer_rate_limit'
+    CHECK_TABLE = """
+        SELECT to_regclass(%(table_name)s) IS NOT NULL;
+    """
+    RESERVE = """
+        INSERT INTO mailer_rate_limit AS bucket (key, tokens, updated_at)
+        VALUES (%(key)s, %(capacity)s - %(count)s, clock_timestamp())
+        ON CONFLICT (key) DO UPDATE
+        SET tokens = LEAST(
+                %(capacity)s,
+                bucket.tokens + %(rate)s * EXTRACT(
+                    EPOCH FROM clock_timestamp() - bucket.updated_at
+                )
+            ) - %(count)s,
+            updated_at = clock_timestamp()
+        RETURNING tokens;
+    """
+
+    def __init__(self, db: Database):
+        self.conn = PostgresConnection(
+            name='rate-limit',
+            dsn=db.cfg.connection_string,
+            timeout=db.cfg.connection_timeout,
+            autocommit=True,
+        )
+        self._fallback: RateLimitBackend | None = None
+        self._checked = False
+        self._lock = threading.Lock()
+
+    def _check_table(self):
+        if self._checked:
+            return
+        with self.conn.new_cursor() as cursor:
+            cursor.execute(
+                query=self.CHECK_TABLE,
+                params={'table_name': self.TABLE_NAME},
+            )
+            row = cursor.fetchone()
+        if row is None or not row[0]:
+            LOG.warning('Table %s for shared rate limit does not exist '
+                        '(apply migrations), using local rate limit', self.TABLE_NAME)
+            self._fallback = LocalRateLimitBackend()
+        self._checked = True
+
+    def reserve(self, key: str, capacity: float, rate: float, count: int) -> float:
+        with self._lock:
+            self._check_table()
+            if self._fallback is not None:
+                return self._fallback.reserve(key, capacity, rate, count)
+            with self.conn.new_cursor() as cursor:
+                cursor.execute(
+                    query=self.RESERVE,
+                    params={
+                        'key': key,
+                        'capacity': capacity,
+                        'rate': rate,
+                        'count': count,
+                    },
+                )
+                row = cursor.fetchone()
+        tokens = float(row[0]) if row is not None else 0.0
+        return max(0.0, -tokens / rate)
+
+
+class RateLimiter:
+    # Token bucket allowing bursts up to count messages and refilling
+    # count messages per window (seconds); hits over the limit wait
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    def reserve(self, key: str, window: int, count: int, messages: int = 1) -> float:
+        # returns seconds to wait before sending (without sleeping)
+        if window <= 0 or count <= 0:
+            return 0.0
+        LOG.debug('Hit for checking rate limit (%s, %s messages)', key, messages)
+        try:
+            wait_time = self.backend.reserve(
+                key=key,
+                capacity=float(count),
+                rate=count / window,
+                count=messages,
+            )
+        except Exception as e:
+            LOG.warning('Failed to check rate limit (%s): %s', key, str(e))
+            return 0.0
+        if wait_time > 0:
+            LOG.info('Reached rate limit (%s), need to wait %.2f seconds',
+                     key, wait_time)
+        return wait_time
+
+    def hit(self, key: str, window: int, count: int, messages: int = 1):
+        wait_time = self.reserve(key, window, count, messages)
+        if wait_time > 0:
+            time.sleep(wait_time)
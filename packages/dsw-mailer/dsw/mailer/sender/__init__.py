@@ -1,4 +1,4 @@
-from .dispatch import send
+from .dispatch import send, send_batch
 
 
-__all__ = ['send']
+__all__ = ['send', 'send_batch']
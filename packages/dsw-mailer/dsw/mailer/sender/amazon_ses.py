@@ -1,14 +1,88 @@
+import concurrent.futures
 import logging
+import threading
+import time
 
 import boto3
 
-from ..config import MailConfig
+from ..config import MailAmazonSESConfig, MailConfig
 from ..model import MailMessage
-from .base import BaseMailSender
+from .base import BaseMailSender, BeforeSendCallback, ResultCallback
 
 
 LOG = logging.getLogger(__name__)
 
+BATCH_MAX_WORKERS = 8
+
+
+class _SESClients:
+    # Creating a client loads botocore service models (slow), clients
+    # themselves are thread-safe so they are shared per region and identity
+
+    def __init__(self):
+        self._clients: dict[tuple, object] = {}
+        self._send_rates: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cfg: MailAmazonSESConfig):
+        key = cfg.client_key
+        with self._lock:
+            if key not in self._clients:
+                LOG.debug('Creating Amazon SES client (region %s)', cfg.region)
+                # default boto3 session is not thread-safe, use own one
+                session = boto3.session.Session()
+                self._clients[key] = session.client(
+                    'ses',
+                    region_name=cfg.region,
+                    aws_access_key_id=cfg.access_key_id,
+                    aws_secret_access_key=cfg.secret_access_key,
+                )
+            return self._clients[key]
+
+    def send_rate(self, cfg: MailAmazonSESConfig) -> float:
+        if cfg.max_send_rate is not None:
+            return cfg.max_send_rate
+        key = cfg.client_key
+        with self._lock:
+            if key in self._send_rates:
+                return self._send_rates[key]
+        rate = 1.0
+        try:
+            quota = self.get(cfg).get_send_quota()
+            rate = float(quota['MaxSendRate'])
+        except Exception as e:
+            LOG.warning('Cannot get Amazon SES send quota (using %s/s): %s',
+                        rate, str(e))
+        with self._lock:
+            self._send_rates[key] = rate
+        return rate
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._send_rates.clear()
+
+
+SES_CLIENTS = _SESClients()
+
+
+class _SendPacer:
+    # Spreads sends evenly so that the rate (messages per second)
+    # is not exceeded even with multiple threads sending
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 
 class AmazonSESSender(BaseMailSender):
 
@@ -19,19 +93,45 @@ class AmazonSESSender(BaseMailSender):
         if not cfg.amazon_ses.region:
             raise ValueError('Missing region for Amazon SES')
 
-    def send(self, message: MailMessage):
+    def send(self, message: MailMessage, cfg: MailConfig):
         LOG.info('Sending via Amazon SES (region %s)',
-                 self.cfg.amazon_ses.region)
-        self._send(message, self.cfg)
+                 cfg.amazon_ses.region)
+        self._send(message, cfg)
+
+    def send_batch(self, messages: list[MailMessage], cfg: MailConfig,
+                   on_result: ResultCallback | None = None,
+                   before_send: BeforeSendCallback | None = None) -> list[Exception | None]:
+        if len(messages) < 2:
+            return super().send_batch(messages, cfg, on_result, before_send)
+        rate = SES_CLIENTS.send_rate(cfg.amazon_ses)
+        workers = max(1, min(BATCH_MAX_WORKERS, len(messages), int(rate)))
+        LOG.info('Sending %s messages via Amazon SES (region %s, %s/s, %s workers)',
+                 len(messages), cfg.amazon_ses.region, rate, workers)
+        pacer = _SendPacer(rate)
+
+        def send_paced(index: int, mail: MailMessage):
+            error: Exception | None = None
+            try:
+                if before_send is not None:
+                    before_send()
+                pacer.wait()
+                self._send(mail, cfg)
+            except Exception as e:
+                LOG.warning('Failed to send message via Amazon SES: %s', str(e))
+                error = e
+            if on_result is not None:
+                on_result(index, error)
+            return error
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(send_paced, index, mail)
+                       for index, mail in enumerate(messages)]
+            concurrent.futures.wait(futures)
+        return [future.result() for future in futures]
 
     def _send(self, mail: MailMessage, cfg: MailConfig):
-        ses = boto3.client(
-            'ses',
-            region_name=cfg.amazon_ses.region,
-            aws_access_key_id=cfg.amazon_ses.access_key_id,
-            aws_secret_access_key=cfg.amazon_ses.secret_access_key,
-        )
-        msg = self._convert_email(mail)
+        ses = SES_CLIENTS.get(cfg.amazon_ses)
+        msg = self._convert_email(mail, cfg)
         return ses.send_raw_email(
             Source=mail.from_mail,
             Destinations=mail.recipients,
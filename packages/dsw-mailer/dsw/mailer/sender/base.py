@@ -1,7 +1,7 @@
 import abc
 import datetime
 import logging
-from email import encoders
+import typing
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -16,21 +16,23 @@ from ..model import MailAttachment, MailMessage
 
 LOG = logging.getLogger(__name__)
 
+# called with index of the message and its error (None if sent)
+ResultCallback = typing.Callable[[int, Exception | None], None]
+# called (and waited for) before sending each message, e.g. rate limit
+BeforeSendCallback = typing.Callable[[], None]
 
-class BaseMailSender(abc.ABC):
 
-    def __init__(self):
-        self._cfg = None  # type: MailConfig | None
+def _encoded_part(attachment: MailAttachment) -> MIMEBase:
+    mime_type, mime_subtype = attachment.content_type.split('/', maxsplit=1)
+    part = MIMEBase(mime_type, mime_subtype)
+    part.set_payload(attachment.base64_data)
+    part['Content-Transfer-Encoding'] = 'base64'
+    return part
 
-    @property
-    def cfg(self) -> MailConfig:
-        if self._cfg is None:
-            raise RuntimeError('Mail sender not prepared')
-        return self._cfg
 
-    def prepare(self, cfg: MailConfig):
-        self.validate_config(cfg)
-        self._cfg = cfg
+class BaseMailSender(abc.ABC):
+    # Senders are shared (stateless), so the config is passed with each call
+    # as concurrent sends may use different mail configs
 
     @staticmethod
     @abc.abstractmethod
@@ -38,10 +40,29 @@ class BaseMailSender(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def send(self, message: MailMessage):
+    def send(self, message: MailMessage, cfg: MailConfig):
         ...
 
-    def _convert_email(self, mail: MailMessage) -> MIMEBase:
+    def send_batch(self, messages: list[MailMessage], cfg: MailConfig,
+                   on_result: ResultCallback | None = None,
+                   before_send: BeforeSendCallback | None = None) -> list[Exception | None]:
+        # returns error for each message (None if sent successfully)
+        errors: list[Exception | None] = []
+        for index, message in enumerate(messages):
+            error: Exception | None = None
+            try:
+                if before_send is not None:
+                    before_send()
+                self.send(message, cfg)
+            except Exception as e:
+                LOG.warning('Failed to send message: %s', str(e))
+                error = e
+            errors.append(error)
+            if on_result is not None:
+                on_result(index, error)
+        return errors
+
+    def _convert_email(self, mail: MailMessage, cfg: MailConfig) -> MIMEBase:
         msg = self._convert_txt_parts(mail)
         if len(mail.attachments) > 0:
             txt = msg
@@ -69,15 +90,15 @@ class BaseMailSender(abc.ABC):
         if mail.priority is not None:
             add_header('Priority', mail.priority)
 
-        if self.cfg.dkim_selector and self.cfg.dkim_privkey:
+        if cfg.dkim_selector and cfg.dkim_privkey:
             import dkim
 
             sender_domain = mail.from_mail.split('@')[-1]
             signature = dkim.sign(
                 message=msg.as_bytes(),
-                selector=self.cfg.dkim_selector.encode(),
+                selector=cfg.dkim_selector.encode(),
                 domain=sender_domain.encode(),
-                privkey=self.cfg.dkim_privkey,
+                privkey=cfg.dkim_privkey,
                 include_headers=headers,
             ).decode()
             signature = signature.removeprefix('DKIM-Signature: ').strip()
@@ -87,10 +108,7 @@ class BaseMailSender(abc.ABC):
 
     @staticmethod
     def _convert_inline_image(image: MailAttachment) -> MIMEBase:
-        mime_type, mime_subtype = image.content_type.split('/', maxsplit=1)
-        part = MIMEBase(mime_type, mime_subtype)
-        part.set_payload(image.data)
-        encoders.encode_base64(part)
+        part = _encoded_part(image)
         filename = pathvalidate.sanitize_filename(image.name)
         part.add_header('Content-ID', f'<{filename}>')
         part.add_header('Content-Disposition', f'inline; filename={filename}')
@@ -130,10 +148,7 @@ class BaseMailSender(abc.ABC):
 
     @staticmethod
     def _convert_attachment(attachment: MailAttachment) -> MIMEBase:
-        mime_type, mime_subtype = attachment.content_type.split('/', maxsplit=1)
-        part = MIMEBase(mime_type, mime_subtype)
-        part.set_payload(attachment.data)
-        encoders.encode_base64(part)
+        part = _encoded_part(attachment)
         filename = pathvalidate.sanitize_filename(attachment.name)
         part.add_header('Content-Disposition', f'attachment; filename={filename}')
         return part
@@ -145,5 +160,5 @@ class NoProviderSender(BaseMailSender):
     def validate_config(cfg: MailConfig):
         pass
 
-    def send(self, message: MailMessage):
+    def send(self, message: MailMessage, cfg: MailConfig):
         LOG.info('No provider configured, not sending anything')
@@ -3,7 +3,7 @@ import logging
 from ..config import MailConfig, MailProvider
 from ..model import MailMessage
 from .amazon_ses import AmazonSESSender
-from .base import BaseMailSender, NoProviderSender
+from .base import BaseMailSender, BeforeSendCallback, NoProviderSender, ResultCallback
 from .smtp import SMTPSender
 
 
@@ -29,8 +29,22 @@ def send(message: MailMessage, cfg: MailConfig):
         LOG.info('Mail sending is disabled, skipping...')
         return
     sender = get_sender(cfg)
-    sender.prepare(cfg)
-    sender.send(message)
+    sender.validate_config(cfg)
+    sender.send(message, cfg)
 
 
-__all__ = ['get_sender', 'send', 'SENDERS', 'BaseMailSender']
+def send_batch(messages: list[MailMessage], cfg: MailConfig,
+               on_result: ResultCallback | None = None,
+               before_send: BeforeSendCallback | None = None) -> list[Exception | None]:
+    if cfg.enabled is False:
+        LOG.info('Mail sending is disabled, skipping %s messages...', len(messages))
+        if on_result is not None:
+            for index in range(len(messages)):
+                on_result(index, None)
+        return [None for _ in messages]
+    sender = get_sender(cfg)
+    sender.validate_config(cfg)
+    return sender.send_batch(messages, cfg, on_result, before_send)
+
+
+__all__ = ['get_sender', 'send', 'send_batch', 'SENDERS', 'BaseMailSender']
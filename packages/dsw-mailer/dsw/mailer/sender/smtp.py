@@ -1,20 +1,190 @@
+import atexit
 import logging
 import smtplib
 import ssl
+import threading
+import time
+import typing
 from email.utils import formataddr
 
 import tenacity
 
-from ..config import MailConfig
+from ..config import MailConfig, MailSMTPConfig
 from ..model import MailMessage
-from .base import BaseMailSender
+from .base import BaseMailSender, BeforeSendCallback, ResultCallback
 
 
 RETRY_SMTP_MULTIPLIER = 0.5
 RETRY_SMTP_TRIES = 3
+REAPER_INTERVAL = 5
 LOG = logging.getLogger(__name__)
 
 
+def _connect(cfg: MailSMTPConfig) -> smtplib.SMTP:
+    context = ssl.create_default_context()
+    server: smtplib.SMTP
+    if cfg.is_ssl:
+        server = smtplib.SMTP_SSL(
+            host=cfg.host or 'localhost',
+            port=cfg.port,
+            context=context,
+            timeout=cfg.timeout,
+        )
+    else:
+        server = smtplib.SMTP(
+            host=cfg.host or 'localhost',
+            port=cfg.port,
+            timeout=cfg.timeout,
+        )
+    try:
+        if cfg.is_tls:
+            server.starttls(context=context)
+        if cfg.auth:
+            server.login(
+                user=cfg.login_user,
+                password=cfg.login_password,
+            )
+    except Exception:
+        _close(server)
+        raise
+    return server
+
+
+def _close(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except smtplib.SMTPException:
+        server.close()
+    except OSError:
+        server.close()
+
+
+class SMTPSession:
+
+    def __init__(self, server: smtplib.SMTP, idle_timeout: int):
+        self.server = server
+        self.idle_timeout = idle_timeout
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def is_alive(self) -> bool:
+        try:
+            code, _ = self.server.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return code == 250
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.last_used > self.idle_timeout
+
+
+class SMTPConnectionPool:
+    # Keeps authenticated SMTP sessions open between messages, up to
+    # max connections per effective server configuration (tenants may use
+    # own SMTP servers), each session is used by one sender at a time
+
+    def __init__(self):
+        self._sessions: dict[tuple, list[SMTPSession]] = {}
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+
+    def _take(self, cfg: MailSMTPConfig) -> tuple[SMTPSession, bool]:
+        with self._lock:
+            idle = self._sessions.get(cfg.session_key)
+            session = idle.pop() if idle else None
+        if session is not None:
+            if not session.is_expired(time.monotonic()) and session.is_alive():
+                LOG.debug('Reusing SMTP connection (%s messages sent)', session.sent)
+                return session, True
+            LOG.debug('Dropping stale SMTP connection')
+            _close(session.server)
+        LOG.debug('Opening new SMTP connection')
+        return SMTPSession(_connect(cfg), cfg.pool_idle_timeout), False
+
+    def _give_back(self, cfg: MailSMTPConfig, session: SMTPSession):
+        if session.sent >= cfg.pool_max_messages:
+            LOG.debug('SMTP connection reached message limit, closing')
+            _close(session.server)
+            return
+        session.last_used = time.monotonic()
+        with self._lock:
+            idle = self._sessions.setdefault(cfg.session_key, [])
+            keep = len(idle) < max(1, cfg.pool_max_connections)
+            if keep:
+                idle.append(session)
+        if not keep:
+            LOG.debug('SMTP connection pool is full, closing')
+            _close(session.server)
+            return
+        self._ensure_reaper()
+
+    def send(self, cfg: MailSMTPConfig, send_fn: typing.Callable[[smtplib.SMTP], typing.Any]):
+        session, reused = self._take(cfg)
+        try:
+            result = send_fn(session.server)
+        except smtplib.SMTPServerDisconnected:
+            _close(session.server)
+            if not reused:
+                raise
+            # server may drop a connection right after successful NOOP
+            LOG.debug('Reused SMTP connection closed by server, reconnecting')
+            session = SMTPSession(_connect(cfg), cfg.pool_idle_timeout)
+            try:
+                result = send_fn(session.server)
+            except BaseException:
+                _close(session.server)
+                raise
+        except BaseException:
+            _close(session.server)
+            raise
+        session.sent += 1
+        self._give_back(cfg, session)
+        return result
+
+    def close_idle(self):
+        now = time.monotonic()
+        sessions: list[SMTPSession] = []
+        with self._lock:
+            for key, idle in list(self._sessions.items()):
+                sessions.extend(session for session in idle if session.is_expired(now))
+                idle[:] = [session for session in idle if not session.is_expired(now)]
+                if len(idle) == 0:
+                    del self._sessions[key]
+        for session in sessions:
+            LOG.debug('Closing idle SMTP connection')
+            _close(session.server)
+
+    def close_all(self):
+        with self._lock:
+            sessions = [session for idle in self._sessions.values() for session in idle]
+            self._sessions.clear()
+        for session in sessions:
+            _close(session.server)
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap,
+                name='smtp-pool-reaper',
+                daemon=True,
+            )
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(REAPER_INTERVAL)
+            try:
+                self.close_idle()
+            except Exception as e:
+                LOG.debug('Failed to close idle SMTP connections: %s', str(e))
+
+
+POOL = SMTPConnectionPool()
+atexit.register(POOL.close_all)
+
+
 class SMTPSender(BaseMailSender):
 
     @staticmethod
@@ -31,49 +201,50 @@ class SMTPSender(BaseMailSender):
         before=tenacity.before_log(LOG, logging.DEBUG),
         after=tenacity.after_log(LOG, logging.DEBUG),
     )
-    def send(self, message: MailMessage):
+    def send(self, message: MailMessage, cfg: MailConfig):
         LOG.info('Sending via SMTP (server %s:%s)',
-                 self.cfg.smtp.host, self.cfg.smtp.port)
-        if self.cfg.smtp.is_ssl:
-            self._send_smtp_ssl(mail=message)
-        else:
-            self._send_smtp(mail=message)
-
-    def _send_smtp_ssl(self, mail: MailMessage):
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL(
-            host=self.cfg.smtp.host or 'localhost',
-            port=self.cfg.smtp.port,
-            context=context,
-            timeout=self.cfg.smtp.timeout,
-        ) as server:
-            if self.cfg.smtp.auth:
-                server.login(
-                    user=self.cfg.smtp.login_user,
-                    password=self.cfg.smtp.login_password,
-                )
-            return server.send_message(
-                msg=self._convert_email(mail),
-                from_addr=formataddr((mail.from_name, mail.from_mail)),
-                to_addrs=mail.recipients,
-            )
+                 cfg.smtp.host, cfg.smtp.port)
+        send_message = self._prepare_send(message, cfg)
+        if not cfg.smtp.pool_enabled:
+            server = _connect(cfg.smtp)
+            try:
+                return send_message(server)
+            finally:
+                _close(server)
+        return POOL.send(cfg.smtp, send_message)
 
-    def _send_smtp(self, mail: MailMessage):
-        context = ssl.create_default_context()
-        with smtplib.SMTP(
-            host=self.cfg.smtp.host or 'localhost',
-            port=self.cfg.smtp.port,
-            timeout=self.cfg.smtp.timeout,
-        ) as server:
-            if self.cfg.smtp.is_tls:
-                server.starttls(context=context)
-            if self.cfg.smtp.auth:
-                server.login(
-                    user=self.cfg.smtp.login_user,
-                    password=self.cfg.smtp.login_password,
-                )
+    def _prepare_send(self, message: MailMessage,
+                      cfg: MailConfig) -> typing.Callable[[smtplib.SMTP], dict]:
+        msg = self._convert_email(message, cfg)
+
+        def send_message(server: smtplib.SMTP):
             return server.send_message(
-                msg=self._convert_email(mail),
-                from_addr=formataddr((mail.from_name, mail.from_mail)),
-                to_addrs=mail.recipients,
+                msg=msg,
+                from_addr=formataddr((message.from_name, message.from_mail)),
+                to_addrs=message.recipients,
             )
+
+        return send_message
+
+    def send_batch(self, messages: list[MailMessage], cfg: MailConfig,
+                   on_result: ResultCallback | None = None,
+                   before_send: BeforeSendCallback | None = None) -> list[Exception | None]:
+        if not cfg.smtp.pool_enabled:
+            return super().send_batch(messages, cfg, on_result, before_send)
+        LOG.info('Sending %s messages via SMTP (server %s:%s)',
+                 len(messages), cfg.smtp.host, cfg.smtp.port)
+        # messages go one by one over the same pooled connection
+        errors: list[Exception | None] = []
+        for index, message in enumerate(messages):
+            error: Exception | None = None
+            try:
+                if before_send is not None:
+                    before_send()
+                POOL.send(cfg.smtp, self._prepare_send(message, cfg))
+            except Exception as e:
+                LOG.warning('Failed to send message via SMTP: %s', str(e))
+                error = e
+            errors.append(error)
+            if on_result is not None:
+                on_result(index, error)
+        return errors
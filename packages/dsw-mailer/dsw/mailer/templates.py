@@ -1,10 +1,14 @@
+import collections
 import datetime
+import functools
 import gettext
+import hashlib
 import json
 import logging
 import pathlib
 import re
-import tempfile
+import threading
+import time
 import typing
 
 import dateutil.parser
@@ -13,10 +17,10 @@ import jinja2.sandbox
 import markdown
 import markdown.preprocessors
 import markupsafe
-import polib
 
 from . import consts
-from .config import MailConfig, MailerConfig
+from .config import MailConfig, MailerConfig, TemplatesConfig
+from .locales import LocaleCache
 from .model import (
     MailAttachment,
     MailMessage,
@@ -28,27 +32,98 @@ from .model import (
 
 LOG = logging.getLogger(__name__)
 
+MARKDOWN_CACHE_SIZE = 1024
+MARKDOWN_CACHE_MAX_LENGTH = 10_000
+
+NULL_TRANSLATIONS = gettext.NullTranslations()
+
+
+def translation_vars(translations: gettext.NullTranslations) -> dict[str, typing.Callable]:
+    # i18n extension resolves these from render context first, so passing
+    # them per render avoids installing translations to shared environment
+    return {
+        'gettext': translations.gettext,
+        'ngettext': translations.ngettext,
+        'pgettext': translations.pgettext,
+        'npgettext': translations.npgettext,
+    }
+
+
+class RenderCache:
+    # Rendered bodies are reused for the same template, translations,
+    # subject, and context (except per-message _meta) for a limited time
+
+    def __init__(self, cfg: TemplatesConfig):
+        self.cfg = cfg
+        self._entries: collections.OrderedDict[tuple, tuple[float, str | None, str | None]] = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def context_hash(ctx: dict) -> str | None:
+        data = {key: value for key, value in ctx.items() if key != '_meta'}
+        try:
+            serialized = json.dumps(data, sort_keys=True, default=str)
+        except (TypeError, ValueError) as e:
+            LOG.debug('Cannot hash render context (not caching): %s', str(e))
+            return None
+        return hashlib.sha256(serialized.encode(consts.DEFAULT_ENCODING)).hexdigest()
+
+    def get(self, key: tuple) -> tuple[str | None, str | None] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return entry[1], entry[2]
+
+    def put(self, key: tuple, html_body: str | None, plain_body: str | None):
+        if self.cfg.render_cache_max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.cfg.render_cache_ttl
+        with self._lock:
+            self._entries[key] = (expires_at, html_body, plain_body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.cfg.render_cache_max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 
 class MailTemplate:
 
     def __init__(self, *, name: str, descriptor: TemplateDescriptor,
                  subject_template: jinja2.Template,
                  html_template: jinja2.Template | None,
-                 plain_template: jinja2.Template | None):
+                 plain_template: jinja2.Template | None,
+                 render_cache: RenderCache | None = None):
         self.name = name
         self.descriptor = descriptor
         self.html_template = html_template
         self.plain_template = plain_template
         self.subject_template = subject_template
+        self.render_cache = render_cache
         self.attachments: list[MailAttachment] = []
         self.html_images: list[MailAttachment] = []
 
-    def render(self, rq: MessageRequest, mail_name: str | None, mail_from: str) -> MailMessage:
+    def render_subject(self, translations: gettext.NullTranslations) -> str:
+        return self.subject_template.render(**translation_vars(translations))
+
+    def render(self, rq: MessageRequest, mail_name: str | None, mail_from: str,
+               translations: gettext.NullTranslations = NULL_TRANSLATIONS,
+               subject: str | None = None) -> MailMessage:
         ctx = rq.ctx
         msg = MailMessage()
         msg.recipients = [r.email for r in rq.recipients]
+        i18n = translation_vars(translations)
 
-        subject = self.subject_template.render()
+        if subject is None:
+            subject = self.subject_template.render(**i18n)
 
         if self.descriptor.use_subject_prefix:
             subject_prefix = ctx.get('appTitle', None) or mail_name
@@ -66,14 +141,34 @@ class MailTemplate:
         ctx = self._enhance_context(ctx, msg)
         msg.from_mail = mail_from
         msg.from_name = mail_name or self.descriptor.default_sender_name
-        if self.html_template is not None:
-            msg.html_body = self.html_template.render(ctx=ctx)
-        if self.plain_template is not None:
-            msg.plain_body = self.plain_template.render(ctx=ctx)
+        cache_key = self._render_cache_key(ctx, msg.subject, translations)
+        cached = None
+        if self.render_cache is not None and cache_key is not None:
+            cached = self.render_cache.get(cache_key)
+        if cached is not None:
+            LOG.debug('Using cached render of template %s', self.descriptor.id)
+            msg.html_body, msg.plain_body = cached
+        else:
+            if self.html_template is not None:
+                msg.html_body = self.html_template.render(ctx=ctx, **i18n)
+            if self.plain_template is not None:
+                msg.plain_body = self.plain_template.render(ctx=ctx, **i18n)
+            if self.render_cache is not None and cache_key is not None:
+                self.render_cache.put(cache_key, msg.html_body, msg.plain_body)
         msg.attachments = self.attachments
         msg.html_images = self.html_images
         return msg
 
+    def _render_cache_key(self, ctx: dict, subject: str,
+                          translations: gettext.NullTranslations) -> tuple | None:
+        if self.render_cache is None:
+            return None
+        ctx_hash = self.render_cache.context_hash(ctx)
+        if ctx_hash is None:
+            return None
+        # translations are compared by identity (new object on locale update)
+        return self.descriptor.id, translations, subject, ctx_hash
+
     @staticmethod
     def _enhance_context(ctx: dict, msg: MailMessage) -> dict:
         if '_meta' not in ctx:
@@ -89,7 +184,6 @@ class TemplateRegistry:
 
     DESCRIPTOR_FILENAME = 'message.json'
     DESCRIPTOR_PATTERN = f'./**/{DESCRIPTOR_FILENAME}'
-    DEFAULT_LOCALE = '~:default:1.0.0'
 
     def __init__(self, cfg: MailerConfig, workdir: pathlib.Path):
         self.cfg = cfg
@@ -102,7 +196,12 @@ class TemplateRegistry:
             ],
         )
         self.templates: dict[str, MailTemplate] = {}
+        self.locales = LocaleCache(cfg.locales)
+        self.render_cache: RenderCache | None = None
+        if cfg.templates.render_cache_enabled:
+            self.render_cache = RenderCache(cfg.templates)
         self._set_filters()
+        self._install_null_translations()
         self._load_templates()
 
     def _set_filters(self):
@@ -175,6 +274,7 @@ class TemplateRegistry:
             plain_template=plain_template,
             subject_template=subject_template,
             descriptor=descriptor,
+            render_cache=self.render_cache,
         )
         template.attachments = [a for a in attachments if a is not None]
         template.html_images = [a for a in html_images if a is not None]
@@ -193,88 +293,73 @@ class TemplateRegistry:
                      descriptor.id, path.as_posix())
             self.templates[descriptor.id] = template
 
-    def _uninstall_translations(self):
-        fn = getattr(self.j2_env, 'uninstall_gettext_translations', None)
-        if callable(fn):
-            fn('default')
-
     def _install_null_translations(self):
+        # fallback for rendering without translations passed
         fn = getattr(self.j2_env, 'install_null_translations', None)
         if callable(fn):
             fn()
 
-    def _install_translations(self, translations: gettext.GNUTranslations):
-        fn = getattr(self.j2_env, 'install_gettext_translations', None)
-        if callable(fn):
-            fn(translations)
-
-    def _load_locale(self, tenant_uuid: str, locale_uuid: str | None, app_ctx,
-                     locale_root_dir: pathlib.Path):
+    def _load_locale(self, tenant_uuid: str, locale_uuid: str | None,
+                     app_ctx) -> gettext.NullTranslations:
         LOG.info('Loading locale: %s (for tenant %s)', locale_uuid, tenant_uuid)
-        self._uninstall_translations()
         if locale_uuid is None:
             LOG.info('No locale specified - using null translations')
-            self._install_null_translations()
-        else:
-            # fetch locale from DB
-            locale = app_ctx.db.get_locale(
-                tenant_uuid=tenant_uuid,
-                locale_uuid=locale_uuid,
-            )
-            if locale.id == self.DEFAULT_LOCALE:
-                LOG.info('Locale is default locale - using null translations')
-                self._install_null_translations()
-                return
-            if locale is None:
-                LOG.error('Could not find locale for tenant %s', tenant_uuid)
-                raise RuntimeError(f'Locale not found in DB: {locale_uuid}')
-            # fetch locale from S3
-            locale_dir = locale_root_dir / locale.code / 'LC_MESSAGES'
-            locale_dir.mkdir(parents=True, exist_ok=True)
-            locale_po_path = locale_dir / 'default.po'
-            locale_mo_path = locale_dir / 'default.mo'
-            downloaded = app_ctx.s3.download_locale(
-                tenant_uuid=tenant_uuid,
-                locale_uuid=locale_uuid,
-                file_name='mail.po',
-                target_path=locale_po_path,
-            )
-            if not downloaded:
-                LOG.error('Cannot download locale file (mail.po) from %s to %s',
-                          locale_uuid, locale_po_path)
-                raise RuntimeError(f'Failed to download locale file (mail.po) from {locale_uuid}')
-            LOG.debug('Saved PO file to %s', locale_po_path)
-            # convert po to mo
-            po = polib.pofile(locale_po_path.absolute().as_posix())
-            po.save_as_mofile(locale_mo_path.absolute().as_posix())
-            LOG.debug('Converted PO file to MO file: %s', locale_mo_path)
-            # load translations
-            translations = gettext.translation(
-                domain='default',
-                localedir=locale_root_dir,
-                languages=[locale.code],
-            )
-            self._install_translations(translations)
+            return NULL_TRANSLATIONS
+        translations = self.locales.get(
+            tenant_uuid=tenant_uuid,
+            locale_uuid=locale_uuid,
+            app_ctx=app_ctx,
+        )
+        if translations is None:
+            LOG.info('Locale is default locale - using null translations')
+            return NULL_TRANSLATIONS
+        return translations
 
     def has_template_for(self, rq: MessageRequest) -> bool:
         return rq.template_name in self.templates
 
+    def _get_translations(self, rq: MessageRequest, app_ctx) -> gettext.NullTranslations:
+        try:
+            return self._load_locale(rq.tenant_uuid, rq.locale_uuid, app_ctx)
+        except Exception as e:
+            LOG.warning('Cannot load locale for tenant %s: %s', rq.tenant_uuid, str(e))
+            LOG.warning('Rendering without locale')
+            return NULL_TRANSLATIONS
+
     def render(self, rq: MessageRequest, cfg: MailConfig, app_ctx) -> MailMessage:
         used_cfg = cfg or self.cfg.mail
-        with tempfile.TemporaryDirectory() as tmpdir:
+        translations = self._get_translations(rq, app_ctx)
+        return self.templates[rq.template_name].render(
+            rq=rq,
+            mail_name=used_cfg.name,
+            mail_from=used_cfg.email,
+            translations=translations,
+        )
+
+    def render_batch(self, rqs: list[MessageRequest], cfg: MailConfig,
+                     app_ctx) -> list[MailMessage | Exception]:
+        # requests share template, tenant and locale (translations, subject,
+        # and attachments are prepared once), only bodies are rendered for each
+        if len(rqs) == 0:
+            return []
+        used_cfg = cfg or self.cfg.mail
+        template = self.templates[rqs[0].template_name]
+        translations = self._get_translations(rqs[0], app_ctx)
+        subject = template.render_subject(translations)
+        results: list[MailMessage | Exception] = []
+        for rq in rqs:
             try:
-                locale_root_dir = pathlib.Path(tmpdir) / 'locale'
-                self._load_locale(rq.tenant_uuid, rq.locale_uuid, app_ctx, locale_root_dir)
+                results.append(template.render(
+                    rq=rq,
+                    mail_name=used_cfg.name,
+                    mail_from=used_cfg.email,
+                    translations=translations,
+                    subject=subject,
+                ))
             except Exception as e:
-                LOG.warning('Cannot load locale for tenant %s: %s', rq.tenant_uuid, str(e))
-                LOG.warning('Rendering without locale')
-                self._uninstall_translations()
-                self._install_null_translations()
-            return self.templates[rq.template_name].render(
-                rq=rq,
-                mail_name=used_cfg.name,
-                mail_from=used_cfg.email,
-            )
+                LOG.warning('Failed to render message %s: %s', rq.id, str(e))
+                results.append(e)
+        return results
 
 
 def datetime_format(iso_timestamp: None | datetime.datetime | str, fmt: str):
@@ -324,23 +409,35 @@ class DSWMarkdownProcessor(markdown.preprocessors.Preprocessor):
         return new_lines
 
 
+class _MarkdownConverters(threading.local):
+    # Markdown instances are expensive to build but not thread-safe,
+    # each thread reuses own one (reset before each conversion)
+
+    def __init__(self):
+        self.html = markdown.Markdown(extensions=[DSWMarkdownExt()])
+
+
+_CONVERTERS = _MarkdownConverters()
+
+
+@functools.lru_cache(maxsize=MARKDOWN_CACHE_SIZE)
+def _cached_html(md_text: str) -> str:
+    return _CONVERTERS.html.reset().convert(md_text)
+
+
+def _convert_html(md_text: str) -> str:
+    if len(md_text) > MARKDOWN_CACHE_MAX_LENGTH:
+        return _CONVERTERS.html.reset().convert(md_text)
+    return _cached_html(md_text)
+
+
 def render_markdown(md_text: str):
     if md_text is None:
         return ''
-    return markupsafe.Markup(markdown.markdown(
-        text=md_text,
-        extensions=[
-            DSWMarkdownExt(),
-        ],
-    ))
+    return markupsafe.Markup(_convert_html(md_text))
 
 
 def remove_markdown(md_text: str):
     if md_text is None:
         return ''
-    return re.sub(r'<[^>]*>', '', markdown.markdown(
-        text=md_text,
-        extensions=[
-            DSWMarkdownExt(),
-        ],
-    ))
+    return re.sub(r'<[^>]*>', '', _convert_html(md_text))
@@ -0,0 +1,8 @@
+-- Token buckets of rate limit shared by mailer replicas (mail.rateLimit.shared)
+CREATE TABLE IF NOT EXISTS mailer_rate_limit
+(
+    key        VARCHAR                  NOT NULL,
+    tokens     DOUBLE PRECISION         NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    CONSTRAINT mailer_rate_limit_pk PRIMARY KEY (key)
+);
@@ -0,0 +1,86 @@
+import datetime
+import threading
+
+from dsw.database.model import PersistentCommand
+from dsw.mailer import consts
+from dsw.mailer.mailer import BulkProgress
+from dsw.mailer.model import MailMessage
+
+
+def _command(uuid: str, delivered: list[str] | None = None) -> PersistentCommand:
+    now = datetime.datetime.now(tz=datetime.UTC)
+    body: dict = {'mode': 'wizard', 'template': 'registration'}
+    if delivered is not None:
+        body[consts.CMD_DELIVERED_RECIPIENTS] = delivered
+    return PersistentCommand(
+        uuid=uuid,
+        state='NewPersistentCommandState',
+        component='mailer',
+        function='send',
+        body=body,
+        last_error_message=None,
+        attempts=0,
+        max_attempts=3,
+        tenant_uuid='00000000-0000-0000-0000-000000000000',
+        created_by=None,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def test_completed_commands_and_partial_deliveries():
+    completed: set[str] = set()
+    progress = BulkProgress(completed)
+    sent, partial, failed, empty = (
+        _command('sent'),
+        _command('partial', delivered=['a@example.com']),
+        _command('failed'),
+        _command('empty'),
+    )
+    indexes = {
+        'sent': progress.add_message(sent, MailMessage(recipients=['b@example.com'])),
+        'partial-ok': progress.add_message(partial, MailMessage(recipients=['c@example.com'])),
+        'partial-error': progress.add_message(partial, MailMessage(recipients=['d@example.com'])),
+        'failed': progress.add_message(failed, MailMessage(recipients=['e@example.com'])),
+    }
+    for command in (sent, partial, failed, empty):
+        progress.messages_added(command)
+    assert completed == {'empty'}
+
+    progress.finish_message(indexes['sent'], None)
+    progress.finish_message(indexes['partial-ok'], None)
+    assert completed == {'empty', 'sent'}
+    progress.finish_message(indexes['partial-error'], RuntimeError('SMTP error'))
+    progress.finish_message(indexes['failed'], RuntimeError('SMTP error'))
+
+    assert progress.command_uuid(indexes['partial-error']) == 'partial'
+    assert completed == {'empty', 'sent'}
+    assert [(command.uuid, recipients) for command, recipients
+            in progress.partial_deliveries()] == [
+        ('partial', ['a@example.com', 'c@example.com']),
+    ]
+
+
+def test_messages_finished_from_threads():
+    completed: set[str] = set()
+    progress = BulkProgress(completed)
+    commands = [_command(f'command-{i}') for i in range(10)]
+    indexes = [
+        progress.add_message(command, MailMessage(recipients=[f'{j}@example.com']))
+        for command in commands
+        for j in range(20)
+    ]
+    for command in commands:
+        progress.messages_added(command)
+
+    threads = [
+        threading.Thread(target=progress.finish_message, args=(index, None))
+        for index in indexes
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert completed == {command.uuid for command in commands}
+    assert progress.partial_deliveries() == []
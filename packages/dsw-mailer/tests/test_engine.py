@@ -0,0 +1,165 @@
+import datetime
+import os
+import types
+
+import pytest
+import tenacity
+
+from dsw.database.model import PersistentCommand
+from dsw.mailer import engine as engine_module
+from dsw.mailer.engine import AsyncMailerEngine
+
+
+def _command(uuid: str) -> PersistentCommand:
+    now = datetime.datetime.now(tz=datetime.UTC)
+    return PersistentCommand(
+        uuid=uuid,
+        state='NewPersistentCommandState',
+        component='mailer',
+        function='send',
+        body={'uuid': uuid},
+        last_error_message=None,
+        attempts=0,
+        max_attempts=3,
+        tenant_uuid='00000000-0000-0000-0000-000000000000',
+        created_by=None,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+class _FakeConnection:
+
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+class _FakeQueue:
+    # hands out pending commands and records claims and results, given
+    # number of calls of an operation fail first (as if database restarted)
+
+    def __init__(self, commands: list[PersistentCommand], failures: dict[str, int] | None = None):
+        self.pending = list(commands)
+        self.failures = dict(failures or {})
+        self.db = types.SimpleNamespace(conn_query=_FakeConnection())
+        self.claimed: list[str] = []
+        self.finished: list[tuple[str, str | None, bool]] = []
+        self.listened = 0
+        self.wait_timeout = 0.1
+        self.work_timeout = 0.5
+        self._interrupted = False
+        self._socket_r, self._socket_w = os.pipe()
+
+    def _fail(self, operation: str):
+        if self.failures.get(operation, 0) > 0:
+            self.failures[operation] -= 1
+            raise ConnectionError(f'{operation} failed')
+
+    @property
+    def interrupted(self) -> bool:
+        return self._interrupted
+
+    def interrupt(self):
+        self._interrupted = True
+
+    def listen(self) -> int:
+        self._fail('listen')
+        self.listened += 1
+        return self._socket_r
+
+    def drain_notifications(self) -> int:
+        return 0
+
+    def claim_commands(self, limit: int, exclude=()) -> list[PersistentCommand]:
+        self._fail('claim')
+        commands = [c for c in self.pending if c.uuid not in exclude][:limit]
+        for command in commands:
+            self.pending.remove(command)
+            self.claimed.append(command.uuid)
+        if self.listened > 0 and len(self.pending) == 0 \
+                and len(self.finished) == len(self.claimed):
+            # engine listening for notifications stops when all is done
+            self._interrupted = True
+        return commands
+
+    def finish_command(self, command: PersistentCommand, error: BaseException | None = None,
+                       timed_out: bool = False):
+        self._fail('finish')
+        self.finished.append((command.uuid, None if error is None else str(error), timed_out))
+
+    def close(self):
+        os.close(self._socket_r)
+        os.close(self._socket_w)
+
+
+class _FakeRateLimiter:
+
+    def __init__(self, waits: dict[str, float]):
+        self.waits = waits
+
+    def reserve(self, key: str, window: int, count: int) -> float:
+        return self.waits.get(key, 0)
+
+
+class _FakeMailer:
+    # rate limit key is the command UUID so that a command can be delayed
+
+    def __init__(self, waits: dict[str, float]):
+        self.rate_limiter = _FakeRateLimiter(waits)
+
+    def prepare_message(self, command: PersistentCommand):
+        cfg = types.SimpleNamespace(
+            rate_limit_key=command.uuid,
+            rate_limit_window=0,
+            rate_limit_count=0,
+        )
+        return types.SimpleNamespace(msg_id=command.uuid), cfg
+
+
+def _send(msg, cfg):
+    if msg.msg_id == 'failing':
+        raise RuntimeError('SMTP error')
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(AsyncMailerEngine._queue_db.retry, 'wait', tenacity.wait_none())
+    monkeypatch.setattr(engine_module, 'send', _send)
+
+
+def test_commands_are_claimed_and_finished_once():
+    queue = _FakeQueue(
+        commands=[_command('sent'), _command('failing'), _command('slow'), _command('other')],
+        failures={'claim': 1, 'finish': 2},
+    )
+    mailer = _FakeMailer(waits={'slow': 5})
+    try:
+        AsyncMailerEngine(mailer, queue, max_in_flight=2).run_once()  # type: ignore
+    finally:
+        queue.close()
+
+    assert sorted(queue.claimed) == ['failing', 'other', 'sent', 'slow']
+    assert sorted(queue.finished) == [
+        ('failing', 'SMTP error', False),
+        ('other', None, False),
+        ('sent', None, False),
+        ('slow', None, True),
+    ]
+    assert queue.db.conn_query.resets == 3
+
+
+def test_listen_is_retried():
+    queue = _FakeQueue(commands=[_command('sent')], failures={'listen': 2})
+    mailer = _FakeMailer(waits={})
+    try:
+        AsyncMailerEngine(mailer, queue, max_in_flight=2).run()  # type: ignore
+    finally:
+        queue.close()
+
+    assert queue.listened == 1
+    assert queue.claimed == ['sent']
+    assert queue.finished == [('sent', None, False)]
+    assert queue.db.conn_query.resets == 2
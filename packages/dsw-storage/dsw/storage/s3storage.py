@@ -5,6 +5,8 @@ import pathlib
 import tempfile
 
 import minio
+import minio.commonconfig
+import minio.deleteobjects
 import minio.error
 import tenacity
 
@@ -85,6 +87,35 @@ class S3Storage:
                 metadata=metadata,
             )
 
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_S3_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_S3_TRIES),
+        before=tenacity.before_log(LOG, logging.DEBUG),
+        after=tenacity.after_log(LOG, logging.DEBUG),
+    )
+    def copy_document(self, *, tenant_uuid: str, source_file_name: str,
+                      target_file_name: str) -> bool:
+        source_name = f'{DOCUMENTS_DIR}/{source_file_name}'
+        target_name = f'{DOCUMENTS_DIR}/{target_file_name}'
+        if self.multi_tenant:
+            source_name = f'{tenant_uuid}/{source_name}'
+            target_name = f'{tenant_uuid}/{target_name}'
+        try:
+            self.client.copy_object(
+                bucket_name=self.cfg.bucket,
+                object_name=target_name,
+                source=minio.commonconfig.CopySource(
+                    bucket_name=self.cfg.bucket,
+                    object_name=source_name,
+                ),
+            )
+        except minio.error.S3Error as e:
+            if e.code != 'NoSuchKey':
+                raise e
+            return False
+        return True
+
     @tenacity.retry(
         reraise=True,
         wait=tenacity.wait_exponential(multiplier=RETRY_S3_MULTIPLIER),
@@ -175,6 +206,90 @@ class S3Storage:
                 metadata=metadata,
             )
 
+    def _object_name(self, tenant_uuid: str | None, object_name: str) -> str:
+        # objects without tenant are shared (e.g. sources for copying)
+        if self.multi_tenant and tenant_uuid is not None:
+            return f'{tenant_uuid}/{object_name}'
+        return object_name
+
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_S3_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_S3_TRIES),
+        before=tenacity.before_log(LOG, logging.DEBUG),
+        after=tenacity.after_log(LOG, logging.DEBUG),
+    )
+    def store_file(self, *, tenant_uuid: str | None, object_name: str,
+                   content_type: str, file_path: pathlib.Path,
+                   metadata: dict | None = None):
+        # streamed from disk (multipart for large files)
+        self.client.fput_object(
+            bucket_name=self.cfg.bucket,
+            object_name=self._object_name(tenant_uuid, object_name),
+            file_path=str(file_path),
+            content_type=content_type,
+            metadata=metadata,
+        )
+
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_S3_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_S3_TRIES),
+        before=tenacity.before_log(LOG, logging.DEBUG),
+        after=tenacity.after_log(LOG, logging.DEBUG),
+    )
+    def copy_object(self, *, tenant_uuid: str | None, source_object_name: str,
+                    object_name: str) -> bool:
+        # server-side copy, source object name is not prefixed with tenant
+        try:
+            self.client.copy_object(
+                bucket_name=self.cfg.bucket,
+                object_name=self._object_name(tenant_uuid, object_name),
+                source=minio.commonconfig.CopySource(
+                    bucket_name=self.cfg.bucket,
+                    object_name=source_object_name,
+                ),
+            )
+        except minio.error.S3Error as e:
+            if e.code != 'NoSuchKey':
+                raise e
+            return False
+        return True
+
+    @tenacity.retry(
+        reraise=True,
+        wait=tenacity.wait_exponential(multiplier=RETRY_S3_MULTIPLIER),
+        stop=tenacity.stop_after_attempt(RETRY_S3_TRIES),
+        before=tenacity.before_log(LOG, logging.DEBUG),
+        after=tenacity.after_log(LOG, logging.DEBUG),
+    )
+    def object_exists(self, *, tenant_uuid: str | None, object_name: str) -> bool:
+        try:
+            self.client.stat_object(
+                bucket_name=self.cfg.bucket,
+                object_name=self._object_name(tenant_uuid, object_name),
+            )
+        except minio.error.S3Error as e:
+            if e.code not in ('NoSuchKey', 'NoSuchObject'):
+                raise e
+            return False
+        return True
+
+    def remove_objects(self, *, tenant_uuid: str | None, object_names: list[str]) -> int:
+        # returns number of objects that failed to be removed
+        errors = self.client.remove_objects(
+            bucket_name=self.cfg.bucket,
+            delete_object_list=[
+                minio.deleteobjects.DeleteObject(self._object_name(tenant_uuid, name))
+                for name in object_names
+            ],
+        )
+        failed = 0
+        for error in errors:
+            LOG.warning('Failed to remove object %s: %s', error.name, error.message)
+            failed += 1
+        return failed
+
     def make_path(self, fragments: list[str], tenant_uuid: str) -> str:
         lst = []
         if self.multi_tenant:
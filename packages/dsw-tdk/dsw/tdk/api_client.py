@@ -1,3 +1,4 @@
+import asyncio
 import functools
 import pathlib
 import urllib.parse
@@ -23,11 +24,54 @@ class WizardCommunicationError(RuntimeError):
         self.message = message
 
 
+# transient errors (rate limiting, unavailable server), requests
+# failing with 500 are not retried as they may not be idempotent
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+# rejected before processing, so retried also for non-idempotent requests
+# (e.g. POST creating a file could be processed despite 502 or 504)
+RETRY_STATUSES_ANY_METHOD = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 10.0
+
+
+def _retry_delay(e: aiohttp.client_exceptions.ClientResponseError, attempt: int) -> float:
+    retry_after = e.headers.get('Retry-After') if e.headers is not None else None
+    if retry_after is not None:
+        try:
+            return min(max(float(retry_after), 0.0), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    return min(RETRY_BACKOFF * 2 ** attempt, RETRY_MAX_DELAY)
+
+
+def _is_retryable(e: aiohttp.client_exceptions.ClientResponseError) -> bool:
+    if isinstance(e, aiohttp.client_exceptions.ContentTypeError):
+        return False
+    if e.status in RETRY_STATUSES_ANY_METHOD:
+        return True
+    method = e.request_info.method.upper() if e.request_info is not None else ''
+    return e.status in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+
+
+async def _call_with_retry(func, client: 'WizardAPIClient', *args, **kwargs):
+    attempt = 0
+    while True:
+        try:
+            return await func(client, *args, **kwargs)
+        except aiohttp.client_exceptions.ClientResponseError as e:
+            if not _is_retryable(e) or attempt >= client.max_retries:
+                raise
+            delay = _retry_delay(e, attempt)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
 def handle_client_errors(func):
     @functools.wraps(func)
     async def handled_client_call(job, *args, **kwargs):
         try:
-            return await func(job, *args, **kwargs)
+            return await _call_with_retry(func, job, *args, **kwargs)
         except WizardCommunicationError as e:
             # Already DSWCommunicationError (re-raise)
             raise e
@@ -80,17 +124,19 @@ class WizardAPIClient:
                         f'{r.reason} (expecting {expected_status})',
             )
 
-    def __init__(self, api_url: str, api_key: str, session=None):
+    def __init__(self, api_url: str, api_key: str, session=None, max_retries: int = 3):
         """
         Exception representing communication error with DSW.
 
         Args:
             api_url (str): URL of DSW API for HTTP communication.
             session (aiohttp.ClientSession): Optional custom session for HTTP communication.
+            max_retries (int): Retries of requests failing with transient errors (429, 5xx).
         """
         self.api_url = api_url
         self.client_url = api_url[:-4]
         self.token = api_key
+        self.max_retries = max_retries
         self.session = session or aiohttp.ClientSession(
             connector=aiohttp.TCPConnector(ssl=False),
         )
@@ -156,6 +202,8 @@ class WizardAPIClient:
             url=f'{self.api_url}{endpoint}',
             headers=self._headers(),
         ) as r:
+            if r.status in RETRY_STATUSES:
+                r.raise_for_status()
             return r.status == 204
 
     @handle_client_errors
@@ -272,6 +320,12 @@ class WizardAPIClient:
             result.append(file)
         return result
 
+    @handle_client_errors
+    async def list_template_draft_files(self, remote_uuid: str) -> list[TemplateFile]:
+        # metadata only (without retrieving contents of files)
+        body = await self._get_json(f'/document-template-drafts/{remote_uuid}/files')
+        return [_load_remote_file(file_body) for file_body in body]
+
     @handle_client_errors
     async def get_template_draft_file(self, remote_uuid: str, file_id: str) -> TemplateFile:
         body = await self._get_json(f'/document-template-drafts/{remote_uuid}/files/{file_id}')
@@ -287,6 +341,12 @@ class WizardAPIClient:
             result.append(template_asset)
         return result
 
+    @handle_client_errors
+    async def list_template_draft_assets(self, remote_uuid: str) -> list[TemplateFile]:
+        # metadata only (without retrieving contents of assets)
+        body = await self._get_json(f'/document-template-drafts/{remote_uuid}/assets')
+        return [_load_remote_asset(file_body, b'') for file_body in body]
+
     @handle_client_errors
     async def get_template_draft_asset(self, remote_uuid: str, asset_id: str) -> TemplateFile:
         body = await self._get_json(f'/document-template-drafts/{remote_uuid}'
@@ -437,6 +497,7 @@ def _load_remote_file(data: dict) -> TemplateFile:
         remote_type=TemplateFileType.FILE,
         filename=pathlib.Path(urllib.parse.unquote(filename)),
         content=content.encode(encoding=consts.DEFAULT_ENCODING),
+        updated_at=data.get('updatedAt'),
     )
 
 
@@ -448,6 +509,7 @@ def _load_remote_asset(data: dict, content: bytes) -> TemplateFile:
         filename=pathlib.Path(urllib.parse.unquote(filename)),
         content_type=data.get('contentType'),
         content=content,
+        updated_at=data.get('updatedAt'),
     )
 
 
@@ -94,7 +94,7 @@ def print_template_info(template: Template):
         click.echo(f' - {format_spec.name}')
     click.echo('Files:')
     for template_file in template.files.values():
-        filesize = humanize.naturalsize(len(template_file.content))
+        filesize = humanize.naturalsize(template_file.size)
         click.echo(f' - {template_file.filename.as_posix()} [{filesize}]')
 
 
@@ -395,10 +395,13 @@ def get_template(ctx, template_id, template_dir, api_url, api_key, force):
               help='Delete template if already exists.')
 @click.option('-w', '--watch', is_flag=True,
               help='Enter watch mode to continually upload changes.')
+@click.option('-j', '--jobs', metavar='JOBS', envvar='DSW_TDK_JOBS',
+              type=click.IntRange(min=1), default=consts.DEFAULT_PARALLELISM,
+              show_default=True, help='Number of files uploaded concurrently.')
 @click.pass_context
-def put_template(ctx, template_dir, api_url, api_key, force, watch):
+def put_template(ctx, template_dir, api_url, api_key, force, watch, jobs):
     ensure_api_config(api_url, api_key)
-    tdk = TDKCore(logger=ctx.obj.logger)
+    tdk = TDKCore(logger=ctx.obj.logger, parallelism=jobs)
     stop_event = asyncio.Event()
 
     async def watch_callback(changes):
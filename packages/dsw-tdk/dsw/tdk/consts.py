@@ -28,6 +28,19 @@ REGEX_MIME_TYPE = re.compile(r'^(?![-])(?!.*[-]$)[-\w.]+/[-\w.]+$')
 DEFAULT_LIST_FORMAT = '{template.id:<50} {template.name:<30} [{template.uuid}]'
 DEFAULT_ENCODING = 'utf-8'
 DEFAULT_README = pathlib.Path('README.md')
+DEFAULT_PARALLELISM = 8
+COPY_CHUNK_SIZE = 1024 * 1024
+# content types stored in packages without compression
+COMPRESSED_TYPES = (
+    'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/avif',
+    'font/woff', 'font/woff2', 'application/font-woff', 'application/font-woff2',
+    'application/pdf', 'application/zip', 'application/gzip',
+    'audio/', 'video/',
+)
+# watch mode: changes are processed after no new ones for quiet period
+# or at latest after max delay (in milliseconds)
+WATCH_QUIET_PERIOD = 300
+WATCH_MAX_DELAY = 3000
 
 TEMPLATE_FILE = 'template.json'
 PathspecFactory = pathspec.patterns.GitWildMatchPattern
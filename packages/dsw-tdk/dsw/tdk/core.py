@@ -1,11 +1,11 @@
 import asyncio
+import collections.abc
 import datetime
 import io
 import json
 import logging
 import pathlib
 import shutil
-import tempfile
 import zipfile
 
 import watchfiles
@@ -13,6 +13,7 @@ import watchfiles
 from . import consts
 from .api_client import WizardAPIClient, WizardCommunicationError
 from .model import Template, TemplateFile, TemplateFileType, TemplateProject
+from .sync import SyncManifest, content_hash
 from .utils import UUIDGen
 from .validation import TemplateValidator, ValidationError
 
@@ -68,10 +69,12 @@ class TDKCore:
             )
 
     def __init__(self, template: Template | None = None, project: TemplateProject | None = None,
-                 client: WizardAPIClient | None = None, logger: logging.Logger | None = None):
+                 client: WizardAPIClient | None = None, logger: logging.Logger | None = None,
+                 parallelism: int = consts.DEFAULT_PARALLELISM):
         self.template = template
         self.project = project
         self.client = client
+        self.parallelism = max(1, parallelism)
         self.remote_version: str = 'unknown~??????'
         self.remote_metamodel_version: str | None = 'unknown'
         self.logger = logger or logging.getLogger()
@@ -79,6 +82,7 @@ class TDKCore:
         self.changes_processor = ChangesProcessor(self)
         self.remote_id = 'unknown'
         self.remote_uuid = None
+        self.sync_manifest: SyncManifest | None = None
 
     async def close(self):
         await self.safe_client.close()
@@ -217,19 +221,9 @@ class TDKCore:
                 template=self.safe_template,
                 remote_uuid=self.remote_uuid,
             )
-            self.logger.debug('Retrieving remote assets')
-            remote_assets = await self.safe_client.get_template_draft_assets(
-                remote_uuid=self.remote_uuid,
-            )
-            self.logger.debug('Retrieving remote files')
-            remote_files = await self.safe_client.get_template_draft_files(
-                remote_uuid=self.remote_uuid,
-            )
-            await self.cleanup_remote_files(
-                remote_assets=remote_assets,
-                remote_files=remote_files,
-            )
             self.logger.info('Using existing editor with UUID: %s', self.remote_uuid)
+            self.logger.info('==> URL: %s', self.remote_editor_url)
+            await self.sync_remote_files()
         else:
             self.logger.info('Creating remote document template draft')
             result = await self.safe_client.create_new_template_draft(
@@ -240,11 +234,11 @@ class TDKCore:
             if result is None:
                 raise RuntimeError('Failed to create document template draft')
             self.logger.info('Using new editor with UUID: %s', self.remote_uuid)
-        self.logger.info('==> URL: %s', self.remote_editor_url)
-        await self.store_remote_files()
+            self.logger.info('==> URL: %s', self.remote_editor_url)
+            await self.store_remote_files()
 
     async def _update_template_file(self, remote_file: TemplateFile, local_file: TemplateFile,
-                                    project_update: bool = False):
+                                    project_update: bool = False) -> TemplateFile | None:
         try:
             self.logger.debug('Updating existing remote %s %s (%s) started',
                               remote_file.remote_type.value, remote_file.filename.as_posix(),
@@ -265,17 +259,20 @@ class TDKCore:
                               remote_file.remote_id, 'ok' if result else 'failed')
             if project_update and result:
                 self.safe_project.update_template_file(result)
+            return result
         except Exception as e1:
             try:
                 self.logger.debug('Trying to delete/create due to: %s', str(e1))
                 await self._delete_template_file(file=remote_file)
-                await self._create_template_file(file=local_file, project_update=True)
+                return await self._create_template_file(file=local_file, project_update=True)
             except Exception as e2:
                 self.logger.error('Failed to update existing remote %s %s: %s',
                                   remote_file.remote_type.value,
                                   remote_file.filename.as_posix(), e2)
+        return None
 
-    async def _delete_template_file(self, file: TemplateFile, project_update: bool = False):
+    async def _delete_template_file(self, file: TemplateFile,
+                                    project_update: bool = False) -> bool:
         try:
             self.logger.debug('Deleting existing remote %s %s (%s) started',
                               file.remote_type.value, file.filename.as_posix(),
@@ -296,22 +293,14 @@ class TDKCore:
                               file.remote_id, 'ok' if result else 'failed')
             if project_update and result:
                 self.safe_project.remove_template_file(file.filename)
+            return result
         except Exception as e:
             self.logger.error('Failed to delete existing remote %s %s: %s',
                               file.remote_type.value, file.filename.as_posix(), e)
+        return False
 
-    async def cleanup_remote_files(self, remote_assets: list[TemplateFile],
-                                   remote_files: list[TemplateFile]):
-        for local_file in self.safe_project.safe_template.files.values():
-            self.logger.debug('Cleaning up remote %s', local_file.filename.as_posix())
-            for remote_asset in remote_assets:
-                if remote_asset.filename == local_file.filename:
-                    await self._delete_template_file(file=remote_asset, project_update=False)
-            for remote_file in remote_files:
-                if remote_file.filename == local_file.filename:
-                    await self._delete_template_file(file=remote_file, project_update=False)
-
-    async def _create_template_file(self, file: TemplateFile, project_update: bool = False):
+    async def _create_template_file(self, file: TemplateFile,
+                                    project_update: bool = False) -> TemplateFile | None:
         try:
             self.logger.debug('Storing remote %s %s started',
                               file.remote_type.value, file.filename.as_posix())
@@ -330,18 +319,139 @@ class TDKCore:
                               result.remote_id)
             if project_update and result is not None:
                 self.safe_project.update_template_file(result)
+            return result
         except Exception as e:
             self.logger.error('Failed to store remote %s %s: %s',
                               file.remote_type.value, file.filename.as_posix(), e)
+        return None
+
+    async def _gather_limited(self,
+                              coroutines: collections.abc.Iterable[collections.abc.Awaitable]):
+        # runs requests concurrently, at most parallelism at once
+        semaphore = asyncio.Semaphore(self.parallelism)
+
+        async def limited(coroutine: collections.abc.Awaitable):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*(limited(coroutine) for coroutine in coroutines))
+
+    def _sync_manifest(self) -> SyncManifest:
+        if self.remote_uuid is None:
+            raise RuntimeError('Remote template draft is not linked (yet)')
+        return SyncManifest(api_url=self.safe_client.api_url, remote_uuid=self.remote_uuid)
 
     async def store_remote_files(self):
         if len(self.safe_project.safe_template.files) == 0:
             self.logger.warning('No files to store, maybe you forgot to '
                                 'update _tdk.files patterns in template.json?')
-        for file in self.safe_project.safe_template.files.values():
+        manifest = self._sync_manifest()
+
+        async def store_file(file: TemplateFile):
             file.remote_id = None
             file.remote_type = TemplateFileType.FILE if file.is_text else TemplateFileType.ASSET
-            await self._create_template_file(file=file, project_update=True)
+            local_hash = content_hash(file.content)
+            result = await self._create_template_file(file=file, project_update=True)
+            if result is not None:
+                manifest.record(result, local_hash)
+
+        await self._gather_limited(
+            store_file(file) for file in list(self.safe_project.safe_template.files.values())
+        )
+        manifest.store(self.logger)
+        self.sync_manifest = manifest
+
+    async def _sync_remote_file(self, local_file: TemplateFile, remote_file: TemplateFile | None,
+                                manifest: SyncManifest) -> bool:
+        # returns if the file was sent (created or updated)
+        filename = local_file.filename.as_posix()
+        local_file.remote_type = TemplateFileType.FILE if local_file.is_text \
+            else TemplateFileType.ASSET
+        local_hash = content_hash(local_file.content)
+        entry = manifest.get(filename)
+        if remote_file is not None and entry is not None \
+                and remote_file.remote_type == local_file.remote_type \
+                and entry.matches(remote_file, local_hash):
+            self.logger.debug('Skipping unchanged %s %s',
+                              remote_file.remote_type.value, filename)
+            local_file.remote_id = remote_file.remote_id
+            local_file.updated_at = remote_file.updated_at
+            return False
+        if remote_file is None:
+            local_file.remote_id = None
+            result = await self._create_template_file(file=local_file, project_update=True)
+        elif remote_file.remote_type != local_file.remote_type:
+            await self._delete_template_file(file=remote_file)
+            local_file.remote_id = None
+            result = await self._create_template_file(file=local_file, project_update=True)
+        else:
+            result = await self._update_template_file(
+                remote_file=remote_file,
+                local_file=local_file,
+                project_update=True,
+            )
+        if result is not None:
+            manifest.record(result, local_hash)
+        else:
+            manifest.remove(filename)
+        return True
+
+    async def sync_remote_files(self):
+        # sends only files changed since the last synchronization (manifest)
+        # and deletes remote files that were sent before but removed locally
+        manifest = self._sync_manifest()
+        manifest.load(self.logger)
+        self.logger.debug('Retrieving remote assets and files (metadata)')
+        remote_assets = await self.safe_client.list_template_draft_assets(
+            remote_uuid=self.remote_uuid,
+        )
+        remote_files = await self.safe_client.list_template_draft_files(
+            remote_uuid=self.remote_uuid,
+        )
+        remote = {file.filename.as_posix(): file for file in [*remote_assets, *remote_files]}
+        local_files = list(self.safe_project.safe_template.files.values())
+        if len(local_files) == 0:
+            self.logger.warning('No files to store, maybe you forgot to '
+                                'update _tdk.files patterns in template.json?')
+        results = await self._gather_limited(
+            self._sync_remote_file(
+                local_file=local_file,
+                remote_file=remote.pop(local_file.filename.as_posix(), None),
+                manifest=manifest,
+            )
+            for local_file in local_files
+        )
+        sent = sum(1 for result in results if result)
+        removed = []
+        for filename, remote_file in remote.items():
+            entry = manifest.get(filename)
+            if entry is not None and entry.remote_id == remote_file.remote_id:
+                self.logger.debug('Deleting remote %s %s (removed locally)',
+                                  remote_file.remote_type.value, filename)
+                removed.append(remote_file)
+        await self._gather_limited(
+            self._delete_template_file(file=remote_file) for remote_file in removed
+        )
+        deleted = len(removed)
+        manifest.entries = {
+            filename: entry for filename, entry in manifest.entries.items()
+            if filename in self.safe_project.safe_template.files
+        }
+        manifest.store(self.logger)
+        self.sync_manifest = manifest
+        self.logger.info('Synchronized files: %s sent, %s unchanged, %s deleted',
+                         sent, len(local_files) - sent, deleted)
+
+    @staticmethod
+    def _package_entry(name: str, content_type: str) -> zipfile.ZipInfo:
+        entry = zipfile.ZipInfo(
+            filename=name,
+            date_time=datetime.datetime.now(tz=datetime.UTC).timetuple()[:6],
+        )
+        # compressing already compressed formats costs time without gain
+        entry.compress_type = zipfile.ZIP_STORED \
+            if content_type.startswith(consts.COMPRESSED_TYPES) else zipfile.ZIP_DEFLATED
+        return entry
 
     def create_package(self, output: pathlib.Path, force: bool):
         if output.exists() and not force:
@@ -369,8 +479,12 @@ class TDKCore:
                     })
                     self.logger.debug('Packaging template asset %s',
                                       file.filename.as_posix())
-                    pkg.writestr(f'template/assets/{file.filename.as_posix()}',
-                                 file.content)
+                    entry = self._package_entry(
+                        name=f'template/assets/{file.filename.as_posix()}',
+                        content_type=file.content_type,
+                    )
+                    with file.open() as src, pkg.open(entry, mode='w') as dst:
+                        shutil.copyfileobj(src, dst, consts.COPY_CHUNK_SIZE)
             descriptor['files'] = files
             descriptor['assets'] = assets
             if len(files) == 0 and len(assets) == 0:
@@ -384,19 +498,23 @@ class TDKCore:
                          data=json.dumps(descriptor, indent=4))
         self.logger.debug('ZIP packaging done')
 
+    @staticmethod
+    def _package_target(template_dir: pathlib.Path, filename: str) -> pathlib.Path:
+        target = (template_dir / filename).resolve()
+        if not target.is_relative_to(template_dir.resolve()):
+            raise RuntimeError(f'Malformed package: invalid file name {filename}')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target
+
     def extract_package(self, zip_data: bytes, template_dir: pathlib.Path | None, force: bool):
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            io_zip = io.BytesIO(zip_data)
-            with zipfile.ZipFile(io_zip) as pkg:
-                pkg.extractall(tmp_dir)
-            del io_zip
-            tmp_root = pathlib.Path(tmp_dir) / 'template'
-            file = tmp_root / 'template.json'
-            assets_dir = tmp_root / 'assets'
+        # files are extracted directly from the package to the template dir
+        with zipfile.ZipFile(io.BytesIO(zip_data)) as pkg:
             self.logger.debug('Extracting template data')
-            if not file.exists():
-                raise RuntimeError('Malformed package: missing template.json file')
-            data = json.loads(file.read_text(encoding=consts.DEFAULT_ENCODING))
+            try:
+                descriptor = pkg.read('template/template.json')
+            except KeyError as e:
+                raise RuntimeError('Malformed package: missing template.json file') from e
+            data = json.loads(descriptor.decode(encoding=consts.DEFAULT_ENCODING))
             template = Template.load_local(data)
             template.tdk_config.use_default_files()
             self.logger.warning('Using default _tdk.files in template.json, you may want '
@@ -423,26 +541,35 @@ class TDKCore:
                 encoding=consts.DEFAULT_ENCODING,
             )
             self.logger.debug('Extracting assets from package')
-            for asset_file in assets_dir.rglob('*'):
-                if asset_file.is_file():
-                    target_asset = template_dir / asset_file.relative_to(assets_dir)
-                    target_dir = target_asset.parent
-                    target_dir.mkdir(parents=True, exist_ok=True)
-                    target_asset.write_bytes(asset_file.read_bytes())
-            self.logger.debug('Extracting files from package')
-            for file_item in data.get('files', []):
-                filename = file_item['fileName']
-                content = file_item['content'].replace('\r\n', '\n')
-                target_file = template_dir / filename
-                target_dir = target_file.parent
-                target_dir.mkdir(parents=True, exist_ok=True)
-                target_file.write_text(data=content, encoding=consts.DEFAULT_ENCODING)
+            assets_prefix = 'template/assets/'
+            for entry in pkg.infolist():
+                if entry.is_dir() or not entry.filename.startswith(assets_prefix):
+                    continue
+                target_asset = self._package_target(
+                    template_dir=template_dir,
+                    filename=entry.filename[len(assets_prefix):],
+                )
+                with pkg.open(entry) as src, target_asset.open(mode='wb') as dst:
+                    shutil.copyfileobj(src, dst, consts.COPY_CHUNK_SIZE)
+        self.logger.debug('Extracting files from package')
+        for file_item in data.get('files', []):
+            target_file = self._package_target(
+                template_dir=template_dir,
+                filename=file_item['fileName'],
+            )
+            content = file_item['content'].replace('\r\n', '\n')
+            target_file.write_text(data=content, encoding=consts.DEFAULT_ENCODING)
         self.logger.debug('Extracting package done')
 
     async def watch_project(self, callback, stop_event: asyncio.Event):
+        # changes are collected until there are none for a while (e.g.
+        # save-all in editor, formatters), changes during processing of
+        # previous batch are collected for the next one
         async for changes in watchfiles.awatch(
                 self.safe_project.template_dir,
                 stop_event=stop_event,
+                step=consts.WATCH_QUIET_PERIOD,
+                debounce=consts.WATCH_MAX_DELAY,
         ):
             await callback(
                 change for change in ((change[0], pathlib.Path(change[1])) for change in changes)
@@ -478,8 +605,8 @@ class TDKCore:
                               self.safe_project.safe_template.coordinates, e)
 
     async def delete_file(self, filepath: pathlib.Path):
-        if not filepath.is_file():
-            self.logger.debug('%s is not a regular file - skipping',
+        if filepath.exists():
+            self.logger.debug('%s still exists - skipping',
                               filepath.as_posix())
             return
         try:
@@ -489,10 +616,21 @@ class TDKCore:
                                  filepath.as_posix())
                 return
             await self._delete_template_file(file=file, project_update=True)
+            if self.sync_manifest is not None:
+                self.sync_manifest.remove(file.filename.as_posix())
         except Exception as e:
             self.logger.error('Failed to delete file %s: %s',
                               filepath.as_posix(), e)
 
+    def _sent_hash(self, remote_file: TemplateFile) -> str | None:
+        filename = remote_file.filename.as_posix()
+        entry = self.sync_manifest.get(filename) if self.sync_manifest is not None else None
+        if entry is not None and entry.remote_id == remote_file.remote_id:
+            return entry.content_hash
+        if remote_file.has_remote_id:
+            return content_hash(remote_file.content)
+        return None
+
     async def update_file(self, filepath: pathlib.Path):
         if not filepath.is_file():
             self.logger.debug('%s is not a regular file - skipping',
@@ -501,13 +639,29 @@ class TDKCore:
         try:
             remote_file = self.safe_project.get_template_file(filepath=filepath)
             local_file = self.safe_project.load_file(filepath=filepath)
+            local_hash = content_hash(local_file.content)
+            if remote_file is not None and self._sent_hash(remote_file) == local_hash:
+                self.logger.debug('File %s not changed - skipping', filepath.as_posix())
+                self.safe_project.update_template_file(remote_file)
+                return
             if remote_file is not None:
-                await self._update_template_file(remote_file, local_file, project_update=True)
+                result = await self._update_template_file(remote_file, local_file,
+                                                          project_update=True)
             else:
-                await self._create_template_file(file=local_file, project_update=True)
+                result = await self._create_template_file(file=local_file, project_update=True)
+            if result is not None and self.sync_manifest is not None:
+                self.sync_manifest.record(result, local_hash)
         except Exception as e:
             self.logger.error('Failed to update file %s: %s', filepath.as_posix(), e)
 
+    async def sync_files(self, updated: list[pathlib.Path], deleted: list[pathlib.Path]):
+        await self._gather_limited([
+            *(self.delete_file(filepath) for filepath in deleted),
+            *(self.update_file(filepath) for filepath in updated),
+        ])
+        if self.sync_manifest is not None:
+            self.sync_manifest.store(self.logger)
+
     async def process_changes(self, changes: list[ChangeItem], force: bool):
         self.changes_processor.clear()
         try:
@@ -523,14 +677,33 @@ class ChangesProcessor:
         self.descriptor_change: ChangeItem | None = None
         self.readme_change: ChangeItem | None = None
         self.file_changes: list[ChangeItem] = []
+        self.descriptor_hash: str | None = None
 
     def clear(self):
         self.descriptor_change = None
         self.readme_change = None
         self.file_changes = []
 
+    @staticmethod
+    def _final_change(change_type: watchfiles.Change,
+                      filepath: pathlib.Path) -> watchfiles.Change:
+        if not filepath.exists():
+            return watchfiles.Change.deleted
+        if change_type == watchfiles.Change.deleted:
+            return watchfiles.Change.modified
+        return change_type
+
+    def _coalesce(self, changes: list[ChangeItem]) -> list[ChangeItem]:
+        # multiple events of a path (e.g. added, modified, deleted) collapse
+        # into its final state on disk (order of events is not known)
+        final = {filepath: change_type for change_type, filepath in changes}
+        return [
+            (self._final_change(change_type, filepath), filepath)
+            for filepath, change_type in final.items()
+        ]
+
     def _split_changes(self, changes: list[ChangeItem]):
-        for change in changes:
+        for change in self._coalesce(changes):
             if change[1] == self.tdk.safe_project.descriptor_path:
                 self.descriptor_change = change
             elif change[1] == self.tdk.safe_project.used_readme:
@@ -539,21 +712,19 @@ class ChangesProcessor:
                 self.file_changes.append(change)
 
     async def _process_file_changes(self):
-        deleted = set()
-        updated = set()
+        deleted: list[pathlib.Path] = []
+        updated: list[pathlib.Path] = []
         for file_change in self.file_changes:
             self.tdk.logger.debug('Processing: %s',
                                   _change(file_change, self.tdk.safe_project.template_dir))
-            change_type = file_change[0]
-            filepath = file_change[1]
-            if change_type == watchfiles.Change.deleted and filepath not in deleted:
-                self.tdk.logger.debug('Scheduling delete operation')
-                deleted.add(filepath)
-                await self.tdk.delete_file(filepath)
-            elif filepath not in updated:
-                self.tdk.logger.debug('Scheduling update operation')
-                updated.add(filepath)
-                await self.tdk.update_file(filepath)
+            if file_change[0] == watchfiles.Change.deleted:
+                deleted.append(file_change[1])
+            else:
+                updated.append(file_change[1])
+        if len(deleted) > 0 or len(updated) > 0:
+            self.tdk.logger.debug('Scheduling %s update and %s delete operations',
+                                  len(updated), len(deleted))
+            await self.tdk.sync_files(updated=updated, deleted=deleted)
 
     async def _reload_descriptor(self, force: bool) -> bool:
         if self.descriptor_change is None:
@@ -585,8 +756,17 @@ class ChangesProcessor:
 
     async def _update_descriptor(self):
         if self.readme_change is not None or self.descriptor_change is not None:
-            self.tdk.logger.debug('Updating template descriptor (metadata)')
-            await self.tdk.update_descriptor()
+            descriptor = json.dumps(
+                self.tdk.safe_project.safe_template.serialize_for_update(),
+                sort_keys=True,
+            )
+            descriptor_hash = content_hash(descriptor.encode(encoding=consts.DEFAULT_ENCODING))
+            if descriptor_hash == self.descriptor_hash:
+                self.tdk.logger.debug('Template descriptor (metadata) not changed - skipping')
+            else:
+                self.tdk.logger.debug('Updating template descriptor (metadata)')
+                await self.tdk.update_descriptor()
+                self.descriptor_hash = descriptor_hash
             self.tdk.safe_project.template = self.tdk.safe_template
 
     async def process_changes(self, changes: list[ChangeItem], force: bool):
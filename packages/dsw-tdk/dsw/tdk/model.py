@@ -1,5 +1,6 @@
 import collections
 import enum
+import io
 import json
 import logging
 import mimetypes
@@ -136,14 +137,42 @@ class TemplateFile:
 
     def __init__(self, *, filename: pathlib.Path, remote_uuid: str | None = None,
                  remote_id: str | None = None, remote_type: TemplateFileType | None = None,
-                 content_type: str | None = None, content: bytes = b''):
+                 content_type: str | None = None, content: bytes = b'',
+                 updated_at: str | None = None, path: pathlib.Path | None = None):
         self.remote_uuid: str | None = remote_uuid
         self.remote_id = remote_id
+        self.updated_at = updated_at
         self.filename = filename
-        self.content = content
+        # content of local file is read when needed (and then kept)
+        self.path = path
+        self._content: bytes | None = None if path is not None else content
         self.content_type: str = content_type or self.guess_type()
         self.remote_type: TemplateFileType = remote_type or self.guess_template_file_type()
 
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            if self.path is None:
+                return b''
+            self._content = self.path.read_bytes()
+        return self._content
+
+    @content.setter
+    def content(self, value: bytes):
+        self._content = value
+
+    @property
+    def size(self) -> int:
+        if self._content is None and self.path is not None:
+            return self.path.stat().st_size
+        return len(self.content)
+
+    def open(self) -> typing.BinaryIO:
+        # stream of content without reading the whole file into memory
+        if self._content is None and self.path is not None:
+            return self.path.open(mode='rb')
+        return io.BytesIO(self.content)
+
     def guess_template_file_type(self):
         return TemplateFileType.FILE if self.is_text else TemplateFileType.ASSET
 
@@ -376,8 +405,10 @@ class TemplateProject:
         try:
             if filepath.is_absolute():
                 filepath = filepath.relative_to(self.template_dir)
-            template_file = TemplateFile(filename=filepath)
-            template_file.content = (self.template_dir / filepath).read_bytes()
+            path = self.template_dir / filepath
+            if not path.is_file():
+                raise FileNotFoundError(f'Not a regular file: {path.as_posix()}')
+            template_file = TemplateFile(filename=filepath, path=path)
             self.safe_template.files[filepath.as_posix()] = template_file
             return template_file
         except Exception as e:
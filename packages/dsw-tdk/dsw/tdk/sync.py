@@ -0,0 +1,122 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+
+from . import consts
+from .model import TemplateFile, TemplateFileType
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclasses.dataclass
+class SyncEntry:
+    remote_id: str
+    remote_type: TemplateFileType
+    content_hash: str
+    updated_at: str | None
+
+    def matches(self, remote_file: TemplateFile, local_hash: str) -> bool:
+        # unchanged locally and remotely since the last synchronization
+        return self.remote_id == remote_file.remote_id \
+            and self.remote_type == remote_file.remote_type \
+            and self.content_hash == local_hash \
+            and self.updated_at is not None \
+            and self.updated_at == remote_file.updated_at
+
+    def serialize(self) -> dict:
+        return {
+            'remoteId': self.remote_id,
+            'remoteType': self.remote_type.value,
+            'hash': self.content_hash,
+            'updatedAt': self.updated_at,
+        }
+
+    @staticmethod
+    def load(data: dict) -> 'SyncEntry':
+        return SyncEntry(
+            remote_id=data['remoteId'],
+            remote_type=TemplateFileType(data['remoteType']),
+            content_hash=data['hash'],
+            updated_at=data.get('updatedAt'),
+        )
+
+
+class SyncManifest:
+    # Last synchronized state of a remote template draft (hashes of sent
+    # files and their remote IDs) kept locally, so unchanged files are
+    # not sent again and remote contents do not need to be retrieved
+
+    CACHE_DIR = pathlib.Path.home() / '.dsw-tdk' / 'sync'
+    CACHE_DIR_ENV = 'DSW_TDK_SYNC_DIR'
+
+    def __init__(self, api_url: str, remote_uuid: str, cache_dir: pathlib.Path | None = None):
+        self.api_url = api_url
+        self.remote_uuid = remote_uuid
+        self.cache_dir = cache_dir or self.default_cache_dir()
+        self.entries: dict[str, SyncEntry] = {}
+
+    @classmethod
+    def default_cache_dir(cls) -> pathlib.Path:
+        cache_dir = os.getenv(cls.CACHE_DIR_ENV, '')
+        return pathlib.Path(cache_dir) if cache_dir else cls.CACHE_DIR
+
+    @property
+    def path(self) -> pathlib.Path:
+        key = content_hash(f'{self.api_url}|{self.remote_uuid}'.encode(consts.DEFAULT_ENCODING))
+        return self.cache_dir / f'{key[:32]}.json'
+
+    def get(self, filename: str) -> SyncEntry | None:
+        return self.entries.get(filename)
+
+    def record(self, file: TemplateFile, local_hash: str):
+        if file.remote_id is None:
+            return
+        self.entries[file.filename.as_posix()] = SyncEntry(
+            remote_id=file.remote_id,
+            remote_type=file.remote_type,
+            content_hash=local_hash,
+            updated_at=file.updated_at,
+        )
+
+    def remove(self, filename: str):
+        self.entries.pop(filename, None)
+
+    def load(self, logger: logging.Logger):
+        self.entries.clear()
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding=consts.DEFAULT_ENCODING))
+            if data.get('remoteUuid') != self.remote_uuid:
+                return
+            self.entries = {
+                filename: SyncEntry.load(entry)
+                for filename, entry in data.get('files', {}).items()
+            }
+            logger.debug('Loaded sync manifest %s (%s files)',
+                         self.path.as_posix(), len(self.entries))
+        except Exception as e:
+            logger.warning('Ignoring invalid sync manifest %s: %s', self.path.as_posix(), e)
+            self.entries.clear()
+
+    def store(self, logger: logging.Logger):
+        data = {
+            'apiUrl': self.api_url,
+            'remoteUuid': self.remote_uuid,
+            'files': {
+                filename: entry.serialize()
+                for filename, entry in sorted(self.entries.items())
+            },
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(data, indent=2), encoding=consts.DEFAULT_ENCODING)
+            logger.debug('Stored sync manifest %s (%s files)',
+                         self.path.as_posix(), len(self.entries))
+        except OSError as e:
+            logger.warning('Failed to store sync manifest %s: %s', self.path.as_posix(), e)
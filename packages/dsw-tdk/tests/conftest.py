@@ -18,6 +18,14 @@ vcr.default_vcr = vcr.VCR(
 vcr.use_cassette = vcr.default_vcr.use_cassette
 
 
+@pytest.fixture(autouse=True)
+def sync_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    # sync manifests must not be stored in the home directory
+    path = tmp_path / 'sync'
+    monkeypatch.setenv('DSW_TDK_SYNC_DIR', str(path))
+    return path
+
+
 @pytest.fixture(scope='session')
 def dsw_api_url():
     value = os.environ.get('DSW_API_URL', 'http://localhost:3000/wizard-api')
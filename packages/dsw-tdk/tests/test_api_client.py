@@ -0,0 +1,34 @@
+import aiohttp
+import aiohttp.client_exceptions
+import multidict
+import pytest
+import yarl
+
+from dsw.tdk.api_client import _is_retryable
+
+
+def _error(method: str, status: int) -> aiohttp.client_exceptions.ClientResponseError:
+    url = yarl.URL('http://localhost/wizard-api/document-template-drafts')
+    return aiohttp.client_exceptions.ClientResponseError(
+        request_info=aiohttp.RequestInfo(url, method, multidict.CIMultiDictProxy(
+            multidict.CIMultiDict(),
+        ), url),
+        history=(),
+        status=status,
+    )
+
+
+@pytest.mark.parametrize('method,status,expected', [
+    ('GET', 429, True),
+    ('GET', 502, True),
+    ('PUT', 504, True),
+    ('DELETE', 503, True),
+    ('GET', 500, False),
+    ('POST', 429, True),
+    ('POST', 503, True),
+    ('POST', 502, False),
+    ('POST', 504, False),
+    ('POST', 500, False),
+])
+def test_is_retryable(method: str, status: int, expected: bool):
+    assert _is_retryable(_error(method, status)) is expected
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import pathlib
+import typing
+
+from dsw.tdk.api_client import WizardAPIClient
+from dsw.tdk.core import TDKCore
+from dsw.tdk.model import Template, TemplateFile, TemplateFileType, TemplateProject
+from dsw.tdk.sync import SyncManifest, content_hash
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _remote_file(updated_at: str | None = '2025-01-01T00:00:00Z') -> TemplateFile:
+    return TemplateFile(
+        filename=pathlib.Path('src/template.html.j2'),
+        remote_id='f2a4e0e6-9d0b-4bd3-a1d5-3b5d0d3bb3a1',
+        remote_type=TemplateFileType.FILE,
+        content=b'<p>Hello</p>',
+        updated_at=updated_at,
+    )
+
+
+def test_sync_manifest_roundtrip(tmp_path: pathlib.Path):
+    remote_file = _remote_file()
+    manifest = SyncManifest(api_url='http://localhost', remote_uuid='abc', cache_dir=tmp_path)
+    manifest.record(remote_file, content_hash(remote_file.content))
+    manifest.store(LOG)
+
+    loaded = SyncManifest(api_url='http://localhost', remote_uuid='abc', cache_dir=tmp_path)
+    loaded.load(LOG)
+    entry = loaded.get('src/template.html.j2')
+    assert entry is not None
+    assert entry.matches(remote_file, content_hash(b'<p>Hello</p>'))
+    assert not entry.matches(remote_file, content_hash(b'<p>Changed</p>'))
+    assert not entry.matches(_remote_file(updated_at='2025-02-01T00:00:00Z'),
+                             content_hash(b'<p>Hello</p>'))
+
+
+def test_sync_manifest_other_draft(tmp_path: pathlib.Path):
+    remote_file = _remote_file()
+    manifest = SyncManifest(api_url='http://localhost', remote_uuid='abc', cache_dir=tmp_path)
+    manifest.record(remote_file, content_hash(remote_file.content))
+    manifest.store(LOG)
+
+    other = SyncManifest(api_url='http://localhost', remote_uuid='xyz', cache_dir=tmp_path)
+    other.load(LOG)
+    assert other.get('src/template.html.j2') is None
+
+
+def test_sync_manifest_invalid(tmp_path: pathlib.Path):
+    manifest = SyncManifest(api_url='http://localhost', remote_uuid='abc', cache_dir=tmp_path)
+    manifest.path.write_text('{invalid', encoding='utf-8')
+    manifest.load(LOG)
+    assert manifest.entries == {}
+
+
+class _DraftClient:
+    # in-memory remote template draft (files and assets) recording changes
+
+    api_url = 'http://localhost/wizard-api'
+
+    def __init__(self):
+        self.remote: dict[str, TemplateFile] = {}
+        self.calls: list[tuple[str, str]] = []
+        self._counter = 0
+
+    def _stored(self, file: TemplateFile, remote_type: TemplateFileType,
+                remote_id: str | None = None) -> TemplateFile:
+        self._counter += 1
+        result = TemplateFile(
+            filename=file.filename,
+            remote_id=remote_id or f'remote-{self._counter}',
+            remote_type=remote_type,
+            content=file.content,
+            updated_at=f'2025-01-01T00:00:{self._counter:02d}Z',
+        )
+        self.remote[file.filename.as_posix()] = result
+        return result
+
+    def _list(self, remote_type: TemplateFileType) -> list[TemplateFile]:
+        return [file for file in self.remote.values() if file.remote_type == remote_type]
+
+    def _delete(self, remote_id: str | None) -> bool:
+        for filename, file in list(self.remote.items()):
+            if file.remote_id == remote_id:
+                self.calls.append(('delete', filename))
+                del self.remote[filename]
+                return True
+        return False
+
+    async def list_template_draft_files(self, remote_uuid: str) -> list[TemplateFile]:
+        return self._list(TemplateFileType.FILE)
+
+    async def list_template_draft_assets(self, remote_uuid: str) -> list[TemplateFile]:
+        return self._list(TemplateFileType.ASSET)
+
+    async def post_template_draft_file(self, remote_uuid: str, file: TemplateFile):
+        self.calls.append(('create', file.filename.as_posix()))
+        return self._stored(file, TemplateFileType.FILE)
+
+    async def post_template_draft_asset(self, remote_uuid: str, file: TemplateFile):
+        self.calls.append(('create', file.filename.as_posix()))
+        return self._stored(file, TemplateFileType.ASSET)
+
+    async def put_template_draft_file_content(self, remote_uuid: str, file: TemplateFile):
+        self.calls.append(('update', file.filename.as_posix()))
+        return self._stored(file, TemplateFileType.FILE, file.remote_id)
+
+    async def put_template_draft_asset_content(self, remote_uuid: str, file: TemplateFile):
+        self.calls.append(('update', file.filename.as_posix()))
+        return self._stored(file, TemplateFileType.ASSET, file.remote_id)
+
+    async def delete_template_draft_file(self, remote_uuid: str, file_uuid: str | None):
+        return self._delete(file_uuid)
+
+    async def delete_template_draft_asset(self, remote_uuid: str, asset_uuid: str | None):
+        return self._delete(asset_uuid)
+
+
+def _local_file(filename: str, content: bytes) -> TemplateFile:
+    return TemplateFile(filename=pathlib.Path(filename), content=content)
+
+
+def _sync(tmp_path: pathlib.Path, client: _DraftClient, files: list[TemplateFile]):
+    project = TemplateProject(template_dir=tmp_path, logger=LOG)
+    project.template = Template()
+    for file in files:
+        project.update_template_file(file)
+
+    async def run():
+        core = TDKCore(
+            template=project.template,
+            project=project,
+            client=typing.cast(WizardAPIClient, client),
+            logger=LOG,
+        )
+        core.remote_uuid = 'abc'
+        await core.sync_remote_files()
+
+    client.calls.clear()
+    # own loop, the default one is used by CLI commands in other tests
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    return sorted(client.calls)
+
+
+def test_sync_remote_files_skips_unchanged(tmp_path: pathlib.Path):
+    client = _DraftClient()
+    files = [
+        _local_file('src/template.html.j2', b'<p>Hello</p>'),
+        _local_file('src/logo.png', b'\x89PNG'),
+    ]
+    assert _sync(tmp_path, client, files) == [
+        ('create', 'src/logo.png'),
+        ('create', 'src/template.html.j2'),
+    ]
+    assert _sync(tmp_path, client, files) == []
+
+
+def test_sync_remote_files_updates_changed(tmp_path: pathlib.Path):
+    client = _DraftClient()
+    _sync(tmp_path, client, [_local_file('src/template.html.j2', b'<p>Hello</p>')])
+    remote_id = client.remote['src/template.html.j2'].remote_id
+
+    calls = _sync(tmp_path, client, [_local_file('src/template.html.j2', b'<p>Changed</p>')])
+    assert calls == [('update', 'src/template.html.j2')]
+    assert client.remote['src/template.html.j2'].remote_id == remote_id
+    assert client.remote['src/template.html.j2'].content == b'<p>Changed</p>'
+
+
+def test_sync_remote_files_updates_changed_remotely(tmp_path: pathlib.Path):
+    client = _DraftClient()
+    files = [_local_file('src/template.html.j2', b'<p>Hello</p>')]
+    _sync(tmp_path, client, files)
+    client.remote['src/template.html.j2'].updated_at = '2025-02-01T00:00:00Z'
+
+    assert _sync(tmp_path, client, files) == [('update', 'src/template.html.j2')]
+
+
+def test_sync_remote_files_recreates_other_type(tmp_path: pathlib.Path):
+    client = _DraftClient()
+    # created remotely as a text file, locally it is an asset
+    client.remote['src/data.json'] = TemplateFile(
+        filename=pathlib.Path('src/data.json'),
+        remote_id='remote-editor',
+        remote_type=TemplateFileType.FILE,
+        content=b'{}',
+        updated_at='2025-01-01T00:00:00Z',
+    )
+
+    calls = _sync(tmp_path, client, [_local_file('src/data.json', b'{}')])
+    assert calls == [('create', 'src/data.json'), ('delete', 'src/data.json')]
+    assert client.remote['src/data.json'].remote_type == TemplateFileType.ASSET
+    assert _sync(tmp_path, client, [_local_file('src/data.json', b'{}')]) == []
+
+
+def test_sync_remote_files_deletes_removed(tmp_path: pathlib.Path):
+    client = _DraftClient()
+    _sync(tmp_path, client, [
+        _local_file('src/template.html.j2', b'<p>Hello</p>'),
+        _local_file('src/old.html.j2', b'<p>Old</p>'),
+    ])
+    # created remotely (e.g. in the editor), not by the synchronization
+    client.remote['src/editor.html.j2'] = TemplateFile(
+        filename=pathlib.Path('src/editor.html.j2'),
+        remote_id='remote-editor',
+        remote_type=TemplateFileType.FILE,
+        content=b'<p>Editor</p>',
+        updated_at='2025-01-01T00:00:00Z',
+    )
+
+    calls = _sync(tmp_path, client, [_local_file('src/template.html.j2', b'<p>Hello</p>')])
+    assert calls == [('delete', 'src/old.html.j2')]
+    assert sorted(client.remote.keys()) == ['src/editor.html.j2', 'src/template.html.j2']
+
+
+def test_sync_manifest_default_dir(sync_dir: pathlib.Path):
+    manifest = SyncManifest(api_url='http://localhost', remote_uuid='abc')
+    assert manifest.cache_dir == sync_dir